@@ -0,0 +1,9 @@
+'''
+Benchmarks of project load, save and render paths on synthetic datasets.
+
+Run from the repository root, widgets are rendered offscreen:
+
+    python -m benchmarks --videos 100 --clips 10000 --thumbnails --output report.json
+
+The report is JSON, one entry per scenario with timings in seconds, see benchmarks.run.
+'''
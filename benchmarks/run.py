@@ -0,0 +1,212 @@
+import argparse
+import json
+import os
+import pickle
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtCore import PYQT_VERSION_STR, QT_VERSION_STR
+from PyQt5.QtWidgets import QApplication, QWidget
+
+from benchmarks.synthetic import syntheticThumbnails, syntheticVideoList
+from vidcutter.data_structures.project_database import ProjectDatabase
+from vidcutter.data_structures.project_journal import ProjectJournal
+from vidcutter.data_structures.thumbnail_pack import ThumbnailPack
+from vidcutter.libs.rendercache import RoundedPixmapCache
+from vidcutter.widgets.scalable_timeline_widget import ScalableTimeLine
+from vidcutter.widgets.video_clips_list_widget import VideoClipsListWidget
+from vidcutter.widgets.video_list_widget import VideoListWidget
+
+'''
+Times project load, save and render paths on synthetic projects and writes a JSON report:
+
+    {"created": ..., "environment": {...}, "scenarios": [
+        {"videos": 100, "clips": 10000, "thumbnails": true, "results": {
+            "pickle_dump": {"repeats": 5, "min": ..., "median": ..., "mean": ..., "max": ...}, ...},
+         "counters": {"render_cache": {"hits": ..., "misses": ..., "render_seconds": ...}, ...}}]}
+
+Timings are seconds of wall time. Benchmarks:
+    pickle_dump, pickle_load    serialization of the whole video list, as done by ProjectJournal.compact and load
+    journal_compact             snapshot written with fsync, as done when a project is saved
+    journal_load                openFolder with a data.pickle project
+    sqlite_create               conversion of the project into data.sqlite
+    sqlite_load                 openFolder with a data.sqlite project, clips of every video paged in
+    render_list                 VideoListWidget.renderList and painting of the visible rows
+    render_clips                VideoClipsListWidget.renderClips of the video with most clips
+    timeline_paint              TimeLine.paintEvent of the video with most clips
+
+Counters of the render benchmarks: render_cache are hits, misses and render time of the rounded thumbnails cache,
+video_list_paint the number and total time of VideoListItemStyle.paint calls. Once rows are cached, repeats are hits.
+'''
+
+reportVersion = 1
+defaultScenarios = [(100, 0, False), (100, 0, True), (100, 10000, True), (10000, 0, False), (10000, 100000, False)]
+benchmarksNames = ['pickle_dump', 'pickle_load', 'journal_compact', 'journal_load', 'sqlite_create', 'sqlite_load',
+                   'render_list', 'render_clips', 'timeline_paint']
+
+
+class BenchmarkHost(QWidget):
+    """
+    Stands in for VideoCutter as parent of the widgets, with the attributes they read from it
+    """
+    def __init__(self, videoList, thumbnailPack: ThumbnailPack):
+        super().__init__()
+        self.theme = 'dark'
+        self.timeformat = 'hh:mm:ss.zzz'
+        self.mediaAvailable = True
+        self.inCut = False
+        self.videoList = videoList
+        self.thumbnailPack = thumbnailPack
+        self.scalableTimeline = ScalableTimeLine(self)
+        self.scalableTimeline.timeline.videoListRef = videoList
+        self.videoListWidget = VideoListWidget(self)
+        self.videoClipsList = VideoClipsListWidget(self)
+
+
+def measure(function, repeats: int) -> dict:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return {'repeats': repeats, 'min': min(timings), 'median': statistics.median(timings),
+            'mean': statistics.fmean(timings), 'max': max(timings)}
+
+
+def runScenario(videosNumber: int, clipsNumber: int, thumbnails: bool, repeats: int, selected: list[str]) -> dict:
+    app = QApplication.instance()
+    results = {}
+    counters = {}
+    with tempfile.TemporaryDirectory(prefix='vidcutter-benchmark-') as folder:
+        thumbnailPack = ThumbnailPack(folder)
+        thumbnailKeys = syntheticThumbnails(thumbnailPack) if thumbnails else []
+        videoList = syntheticVideoList(videosNumber, clipsNumber, thumbnailKeys)
+        snapshot = pickle.dumps(videoList, protocol=pickle.HIGHEST_PROTOCOL)
+
+        def compact():
+            journal = ProjectJournal(folder)
+            journal._open(videoList.journalGeneration)
+            journal.compact(videoList)
+            journal.close()
+
+        def loadJournal():
+            journal = ProjectJournal(folder)
+            journal.load()
+            journal.close()
+
+        def createDatabase():
+            for filename in os.listdir(folder):
+                if filename.startswith(ProjectDatabase.defaultFilename):
+                    os.remove(os.path.join(folder, filename))
+            ProjectDatabase.create(folder, videoList).close()
+
+        def loadDatabase():
+            database = ProjectDatabase(folder)
+            loadedList = database.load()
+            for videoIndex in range(len(loadedList.videos)):
+                database.loadClips(loadedList, videoIndex)
+            database.close()
+
+        benchmarks = {
+            'pickle_dump': lambda: pickle.dumps(videoList, protocol=pickle.HIGHEST_PROTOCOL),
+            'pickle_load': lambda: pickle.loads(snapshot),
+            'journal_compact': compact,
+            'journal_load': loadJournal,
+            'sqlite_create': createDatabase,
+            'sqlite_load': loadDatabase,
+        }
+        for name in selected:
+            if name in benchmarks:
+                results[name] = measure(benchmarks[name], repeats)
+
+        if {'render_list', 'render_clips', 'timeline_paint'} & set(selected):
+            renderCache = RoundedPixmapCache.shared()
+            renderCache.clear()
+            renderCache.resetCounters()
+            host = BenchmarkHost(videoList, thumbnailPack)
+            host.resize(1280, 720)
+            videoIndex = max(range(len(videoList.videos)), key=lambda index: len(videoList.videos[index].clips), default=0)
+            videoList.currentVideoIndex = videoIndex
+            timeline = host.scalableTimeline.timeline
+            host.scalableTimeline.setDuration(videoList.videos[videoIndex].duration / 1000 if videoList.videos else 0)
+
+            def renderList():
+                host.videoListWidget.renderList(videoList)
+                host.videoListWidget.grab()
+                app.processEvents()
+
+            def renderClips():
+                host.videoClipsList.renderClips(videoList.videos[videoIndex].clips if videoList.videos else [])
+                host.videoClipsList.grab()
+                app.processEvents()
+
+            def paintTimeline():
+                timeline.updateClips()
+                timeline.grab()
+
+            renderers = {'render_list': renderList, 'render_clips': renderClips, 'timeline_paint': paintTimeline}
+            for name in selected:
+                if name in renderers:
+                    results[name] = measure(renderers[name], repeats)
+            delegate = host.videoListWidget.itemDelegate()
+            counters['render_cache'] = renderCache.counters()
+            counters['video_list_paint'] = {'paints': delegate.paintCount, 'seconds': delegate.paintSeconds}
+            host.deleteLater()
+            app.processEvents()
+        thumbnailPack.close()
+    return {'videos': videosNumber, 'clips': clipsNumber, 'thumbnails': thumbnails, 'results': results,
+            'counters': counters}
+
+
+def environment() -> dict:
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'qt': QT_VERSION_STR,
+        'pyqt': PYQT_VERSION_STR,
+        'qpa_platform': os.environ.get('QT_QPA_PLATFORM', ''),
+    }
+
+
+def main(arguments: list[str] = None) -> dict:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='Benchmark project load, save and render '
+                                                                              'paths on synthetic datasets.')
+    parser.add_argument('--videos', type=int, help='number of videos, runs a single scenario instead of the default ones')
+    parser.add_argument('--clips', type=int, default=0, help='total number of clips of the single scenario')
+    parser.add_argument('--thumbnails', action='store_true', help='give videos and clips of the single scenario thumbnails')
+    parser.add_argument('--repeats', type=int, default=5, help='timed runs of every benchmark')
+    parser.add_argument('--benchmarks', nargs='+', choices=benchmarksNames, default=benchmarksNames)
+    parser.add_argument('--output', help='report filename, the report is printed when omitted')
+    arguments = parser.parse_args(arguments)
+
+    scenarios = [(arguments.videos, arguments.clips, arguments.thumbnails)] if arguments.videos else defaultScenarios
+    app = QApplication.instance() or QApplication(sys.argv[:1])  # noqa: F841, widgets need a living application
+    report = {
+        'version': reportVersion,
+        'created': datetime.now(timezone.utc).isoformat(),
+        'environment': environment(),
+        'scenarios': [],
+    }
+    for videosNumber, clipsNumber, thumbnails in scenarios:
+        print('videos: {}, clips: {}, thumbnails: {}'.format(videosNumber, clipsNumber, thumbnails), file=sys.stderr)
+        scenario = runScenario(videosNumber, clipsNumber, thumbnails, arguments.repeats, arguments.benchmarks)
+        for name, result in scenario['results'].items():
+            print('    {:<16} {:10.4f} s'.format(name, result['median']), file=sys.stderr)
+        report['scenarios'].append(scenario)
+
+    if arguments.output:
+        with open(arguments.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+import random
+
+from PyQt5.QtGui import QColor, QImage
+
+from vidcutter.data_structures.thumbnail_pack import ThumbnailPack
+from vidcutter.data_structures.video_clip_timestamps import VideoClipTimestamps
+from vidcutter.data_structures.video_item import VideoItem
+from vidcutter.data_structures.video_item_clip import VideoItemClip
+from vidcutter.data_structures.video_list import VideoList
+
+'''
+Synthetic projects of a given scale. Generation is seeded, the same arguments give the same project.
+'''
+
+actionClasses = ['Squat with V grip', 'Leg Press', 'Seated Cable Row', 'Barbell Bench Press', 'Rope Tricep Pushdown', 'Squats']
+issuesClasses = ['video of a bad quality', 'video is too dark', 'exercise is not performed', 'strong occlusions']
+videoDuration = 10 * 60 * 1000
+clipMaximumDuration = 5000
+thumbnailSize = 128
+thumbnailVariants = 64
+
+
+def syntheticThumbnails(pack: ThumbnailPack, count: int = thumbnailVariants) -> list[str]:
+    """
+    Distinct solid color thumbnails, the pack deduplicates equal images so keys are reused across items
+    """
+    keys = []
+    for index in range(count):
+        image = QImage(thumbnailSize, thumbnailSize, QImage.Format_RGB32)
+        image.fill(QColor.fromHsv(int(360 * index / count), 200, 200))
+        keys.append(pack.add(image))
+    return keys
+
+
+def syntheticVideoList(videosNumber: int, clipsNumber: int, thumbnailKeys: list[str] = (), seed: int = 0) -> VideoList:
+    """
+    Video list of videosNumber videos with clipsNumber clips spread evenly over them
+    """
+    generator = random.Random(seed)
+    videoList = VideoList(issuesClasses, actionClasses)
+    videoList.description = 'synthetic benchmark dataset'
+    for videoIndex in range(videosNumber):
+        video = VideoItem()
+        video.filename = 'video_{:06d}.mp4'.format(videoIndex)
+        video.duration = videoDuration
+        video.thumbnailKey = generator.choice(thumbnailKeys) if thumbnailKeys else ''
+        video.description = 'synthetic video {}'.format(videoIndex)
+        videoClipsNumber = clipsNumber // videosNumber + (1 if videoIndex < clipsNumber % videosNumber else 0)
+        video.clips.update(syntheticClip(generator, thumbnailKeys) for _ in range(videoClipsNumber))
+        videoList.videos.append(video)
+    videoList.clearDirty(range(len(videoList.videos)))
+    return videoList
+
+
+def syntheticClip(generator: random.Random, thumbnailKeys: list[str] = ()) -> VideoItemClip:
+    timeStart = generator.randrange(0, videoDuration - clipMaximumDuration)
+    timeEnd = timeStart + generator.randrange(200, clipMaximumDuration)
+    thumbnailKey = generator.choice(thumbnailKeys) if thumbnailKeys else ''
+    clip = VideoItemClip(timeStart, timeEnd, thumbnailKey, '', generator.choice((0, 2)))
+    clip.actionClassIndex = generator.randrange(-1, len(actionClasses))
+    clip.clip_timestamps.append(VideoClipTimestamps(timeStart, VideoClipTimestamps.TimestampType.LEFT))
+    return clip
@@ -60,14 +60,14 @@ for old_path in videos_list_old_path:
         video_new = VideoItem()
         video_new.issues = video_old.issues
         video_new.filename = video_old.filename
-        video_new.thumbnail = video_old.thumbnail
+        video_new.legacyThumbnail = video_old.thumbnail
         for idx in range(len(video_old.clips)):
             clip = VideoItemClip()
             clip.timeStart = video_old.clips[idx].timeStart
             clip.timeEnd = video_old.clips[idx].timeEnd
             clip.visibility = 2
             clip.name = ''
-            clip.thumbnail = QPixmapPickle(video_old.clips[idx].thumbnail)
+            clip.legacyThumbnail = QPixmapPickle(video_old.clips[idx].thumbnail)
             clip.actionClassIndex = 2
             video_new.clips.add(clip)
 
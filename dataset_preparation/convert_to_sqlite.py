@@ -0,0 +1,25 @@
+import os
+import sys
+
+from PyQt5.QtWidgets import QApplication
+
+from vidcutter.data_structures.project_database import ProjectDatabase
+from vidcutter.data_structures.project_journal import ProjectJournal
+
+'''
+Convert a data.pickle project (with its journal) into data.sqlite. The tool opens data.sqlite instead of data.pickle
+when both exist in a folder.
+'''
+
+videos_list_path = '/home/anton/work/fitMate/datasets/squats_2022/'
+data_filename = 'data.pickle'
+
+app = QApplication(sys.argv)
+
+journal = ProjectJournal(videos_list_path, data_filename)
+videoList = journal.load()
+journal.close()
+
+database = ProjectDatabase.create(videos_list_path, videoList)
+database.close()
+print('written', os.path.join(videos_list_path, ProjectDatabase.defaultFilename))
@@ -99,7 +99,7 @@ for video_file in video_files:
     videoItem = VideoItem()
     videoItem.filename = video_file
     videoItem.duration = video_item_duration
-    videoItem.thumbnail = QPixmapPickle(qt_pixmap)
+    videoItem.legacyThumbnail = QPixmapPickle(qt_pixmap)
     videoItem.youtubeId = youtube_id
 
     videos.append(videoItem)
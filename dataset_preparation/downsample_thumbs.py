@@ -9,6 +9,7 @@ from vidcutter.data_structures.video_item import VideoItem as video_item
 from vidcutter.data_structures.video_item_clip import VideoItemClip as video_item_clip
 from vidcutter.data_structures.video_item_clip import BoundingBox as bounding_box
 from vidcutter.data_structures.qpixmap_pickle import QPixmapPickle as qpixmap_pickle
+from vidcutter.data_structures.thumbnail_pack import ThumbnailPack as thumbnail_pack
 from sortedcontainers import SortedList
 
 ci_build_and_not_headless = False
@@ -35,8 +36,19 @@ app = QApplication(sys.argv)
 with open(os.path.join(videos_list_path, data_filename), 'rb') as f:
     videoList = pickle.load(f)
 
-for video in videoList:
-    video.thumbnail = qpixmap_pickle(video.thumbnail.scaled(image_size, image_size))
+# projects saved before the thumbnail pack keep pixmaps in legacyThumbnail, later ones keep keys into thumbnails.pack
+thumbnails = thumbnail_pack(videos_list_path)
+thumbnails_downsampled = thumbnail_pack(videos_list_path_timestamps)
+
+for video in videoList.videos:
+    if video.legacyThumbnail is not None:
+        video.legacyThumbnail = qpixmap_pickle(video.legacyThumbnail.scaled(image_size, image_size))
+    elif video.thumbnailKey:
+        video.thumbnailKey = thumbnails_downsampled.add(thumbnails.image(video.thumbnailKey).scaled(image_size, image_size))
+
+thumbnails_downsampled.sync()
+thumbnails_downsampled.close()
+thumbnails.close()
 
 with open(os.path.join(videos_list_path_timestamps, data_filename), 'wb') as f:
     pickle.dump(videoList, f)
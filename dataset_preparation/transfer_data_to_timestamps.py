@@ -48,7 +48,7 @@ for video in videoList:
     video_item_ = video_item()
 
     # video_item_.thumbnail = qpixmap_pickle()
-    video_item_.thumbnail = qpixmap_pickle(video.thumbnail.copy())
+    video_item_.legacyThumbnail = qpixmap_pickle(video.thumbnail.copy())
     # video_item_.thumbnail = video.thumbnail
     video_item_.duration = video.duration
     video_item_.currentCLipIndex = video._currentCLipIndex
@@ -64,7 +64,7 @@ for video in videoList:
 
         video_item_clip_.timeStart = clip.timeStart
         video_item_clip_.timeEnd = clip.timeEnd
-        video_item_clip_.thumbnail = qpixmap_pickle(clip.thumbnail.copy())
+        video_item_clip_.legacyThumbnail = qpixmap_pickle(clip.thumbnail.copy())
         # video_item_clip_.thumbnail.fromImage(clip.thumbnail.toImage())
         video_item_clip_.visibility = clip.visibility
 
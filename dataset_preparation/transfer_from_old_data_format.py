@@ -43,7 +43,7 @@ for video_new in data_new_format.videos:
                 clip.timeStart = video_old.clips[idx].timeStart
                 clip.timeEnd = video_old.clips[idx].timeEnd
                 clip.visibility = 2
-                clip.thumbnail = video_old.clips[idx].thumbnail
+                clip.legacyThumbnail = video_old.clips[idx].thumbnail
                 clip.actionClassIndex = 2
                 video_new.clips.add(clip)
 
@@ -41,6 +41,7 @@ from vidcutter.video_console import ConsoleHandler, ConsoleWidget, VideoLogger
 from vidcutter.video_labeling_tool import VideoLabelingTool
 
 from vidcutter.libs.singleapplication import SingleApplication
+from vidcutter.libs.videoservice import VideoService
 from vidcutter.libs.widgets import VCMessageBox
 
 import vidcutter
@@ -324,6 +325,14 @@ class MainWindow(QMainWindow):
         self.console.deleteLater()
         if hasattr(self, 'cutter'):
             self.save_settings()
+            self.cutter.closeProject()
+            self.cutter.thumbnailWorkers.close()
+            self.cutter.filmstrip.close()
+            self.cutter.spriteSheet.close()
+            self.cutter.mediaIndex.close()
+            if VideoService.keyframeCache is not None:
+                VideoService.keyframeCache.close()
+            self.cutter.projectSaver.close()
             try:
                 if hasattr(self.cutter, 'mpvWidget'):
                     self.cutter.mpvWidget.shutdown()
@@ -0,0 +1,433 @@
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+from vidcutter.data_structures.model_state import toMsecs
+from vidcutter.data_structures.video_item import sortedClips
+from vidcutter.data_structures.video_item_clip import BoundingBox, VideoItemClip
+
+
+class ClipTable:
+    """
+    Array backed clips list of a video, a drop-in replacement of the SortedKeyList returned by sortedClips.
+
+    Numeric clip fields live in one structured NumPy array kept sorted by start time, so bisecting, overlap checks,
+    duration sums and timeline pixel positions are vectorized. Strings and timestamps are kept per row id in a dict.
+    Indexing returns ClipTableRow proxies which read and write the row; a proxy follows its row through insertions
+    and removals by the row id. pop returns a plain VideoItemClip, proxies of the popped row keep working on it and
+    adding the popped clip or such a proxy back reuses the row id, so re-sorting a clip keeps it. Pickling converts
+    the table back to a SortedKeyList of VideoItemClip.
+    """
+    minimumClips = 1000
+    nullTime = -1
+    detachedRowsLimit = 256
+    dtype = np.dtype([('id', np.int64), ('timeStart', np.int64), ('timeEnd', np.int64), ('actionClassIndex', np.int32),
+                      ('visibility', np.int8), ('dirty', np.bool_), ('x', np.float32), ('y', np.float32),
+                      ('width', np.float32), ('height', np.float32), ('confidence', np.float32)])
+
+    def __init__(self, clips=()):
+        self._rows = np.zeros(16, dtype=self.dtype)
+        self._size = 0
+        self._nextId = 0
+        self._version = 0
+        self._extras: dict[int, list] = {}
+        self._detached: OrderedDict[int, VideoItemClip] = OrderedDict()
+        self.update(clips)
+
+    def __reduce__(self):
+        return sortedClips, (list(self.clips()),)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self):
+        for index in range(self._size):
+            yield ClipTableRow(self, int(self._rows['id'][index]), index)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._size))]
+        index = self._checkIndex(index)
+        return ClipTableRow(self, int(self._rows['id'][index]), index)
+
+    def __delitem__(self, index) -> None:
+        self.pop(index)
+
+    @property
+    def columns(self) -> np.ndarray:
+        """
+        View of the rows in sorted order, read only use
+        """
+        return self._rows[:self._size]
+
+    def clips(self):
+        for index in range(self._size):
+            yield self._materialize(index)
+
+    def bisect_left(self, clip) -> int:
+        return int(np.searchsorted(self.columns['timeStart'], toMsecs(clip.timeStart, 0), side='left'))
+
+    def bisect_right(self, clip) -> int:
+        return int(np.searchsorted(self.columns['timeStart'], toMsecs(clip.timeStart, 0), side='right'))
+
+    def index(self, clip) -> int:
+        if isinstance(clip, ClipTableRow) and clip._table is self:
+            index = clip._row()
+            if index is not None:
+                return index
+        raise ValueError('clip is not in the table')
+
+    def add(self, clip) -> None:
+        rowId = None
+        if isinstance(clip, ClipTableRow) and clip._table is self:
+            if clip._id not in self._detached:
+                raise ValueError('clip is already in the table')
+            rowId = clip._id
+            clip = self._detached.pop(rowId)
+        else:
+            rowId = next((detachedId for detachedId, detached in self._detached.items() if detached is clip), None)
+            if rowId is not None:
+                del self._detached[rowId]
+        row, extras = self._encode(clip, rowId)
+        row = np.array(row, dtype=self.dtype)
+        position = int(np.searchsorted(self.columns['timeStart'], row['timeStart'], side='right'))
+        self._reserve(self._size + 1)
+        self._rows[position + 1:self._size + 1] = self._rows[position:self._size]
+        self._rows[position] = row
+        self._size += 1
+        self._extras[int(row['id'])] = extras
+        self._version += 1
+
+    def update(self, clips) -> None:
+        encoded = [self._encode(clip) for clip in clips]
+        if not len(encoded):
+            return
+        rows = np.array([row for row, _ in encoded], dtype=self.dtype)
+        for row, extras in encoded:
+            self._extras[row[0]] = extras
+        merged = np.concatenate((self.columns, rows))
+        # stable sort keeps clips with equal start times in insertion order, as SortedKeyList.update does
+        merged = merged[np.argsort(merged['timeStart'], kind='stable')]
+        self._reserve(len(merged))
+        self._rows[:len(merged)] = merged
+        self._size = len(merged)
+        self._version += 1
+
+    def pop(self, index: int = -1) -> VideoItemClip:
+        index = self._checkIndex(index)
+        clip = self._materialize(index)
+        rowId = int(self._rows['id'][index])
+        self._rows[index:self._size - 1] = self._rows[index + 1:self._size]
+        self._size -= 1
+        del self._extras[rowId]
+        self._detached[rowId] = clip
+        if len(self._detached) > self.detachedRowsLimit:
+            self._detached.popitem(last=False)
+        self._version += 1
+        return clip
+
+    def copy(self) -> 'ClipTable':
+        """
+        Copy sharing no mutable state with the table, unlike SortedKeyList.copy. Popped rows are not copied.
+        """
+        table = ClipTable()
+        table._rows = self._rows.copy()
+        table._size = self._size
+        table._nextId = self._nextId
+        table._extras = {rowId: [thumbnailKey, name, description, list(timestamps)]
+                         for rowId, (thumbnailKey, name, description, timestamps) in self._extras.items()}
+        return table
+
+    def clear(self) -> None:
+        self._size = 0
+        self._extras.clear()
+        self._detached.clear()
+        self._version += 1
+
+    def secondsColumns(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Start and end times in seconds and visibility of all clips. A clip being cut ends at 0, like VideoItemClip.
+        """
+        columns = self.columns
+        timeEnd = np.where(columns['timeEnd'] == self.nullTime, 0, columns['timeEnd'])
+        return 1e-3 * columns['timeStart'], 1e-3 * timeEnd, columns['visibility'].astype(np.int64)
+
+    def pixelSpans(self, scale: float, offset: int) -> tuple[list[int], list[int], list[int]]:
+        """
+        Left and right timeline pixel positions and visibility of all clips, see TimeLine._secondsToPixelPosition
+        """
+        timeStart, timeEnd, visibility = self.secondsColumns()
+        left = np.rint(timeStart / scale + offset).astype(np.int64)
+        right = np.rint(timeEnd / scale + offset).astype(np.int64)
+        return left.tolist(), right.tolist(), visibility.tolist()
+
+    def overlaps(self) -> np.ndarray:
+        """
+        Indexes of finished clips which start before a previous finished clip ends
+        """
+        columns = self.columns[self.columns['timeEnd'] != self.nullTime]
+        if len(columns) < 2:
+            return np.empty(0, dtype=np.int64)
+        previousEnd = np.maximum.accumulate(columns['timeEnd'])[:-1]
+        overlapping = columns['timeStart'][1:] < previousEnd
+        finished = np.flatnonzero(self.columns['timeEnd'] != self.nullTime)
+        return finished[1:][overlapping]
+
+    def totalDuration(self, actionClassIndex: Optional[int] = None) -> int:
+        """
+        Summed duration of finished clips in milliseconds, optionally of a single action class only
+        """
+        columns = self.columns[self.columns['timeEnd'] != self.nullTime]
+        if actionClassIndex is not None:
+            columns = columns[columns['actionClassIndex'] == actionClassIndex]
+        return int(np.sum(columns['timeEnd'] - columns['timeStart']))
+
+    def anyDirty(self) -> bool:
+        return bool(self.columns['dirty'].any())
+
+    def clearDirty(self) -> None:
+        self._rows['dirty'][:self._size] = False
+
+    def setVisibility(self, visibility: Optional[int]) -> None:
+        """
+        Set the visibility of all clips, invert it when visibility is None
+        """
+        columns = self.columns
+        columns['visibility'] = 2 - columns['visibility'] if visibility is None else visibility
+        columns['dirty'] = True
+
+    def _checkIndex(self, index: int) -> int:
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError('clip index out of range')
+        return index
+
+    def _reserve(self, size: int) -> None:
+        if size <= len(self._rows):
+            return
+        rows = np.zeros(max(size, 2 * len(self._rows)), dtype=self.dtype)
+        rows[:self._size] = self._rows[:self._size]
+        self._rows = rows
+
+    def _encode(self, clip, rowId: Optional[int] = None) -> tuple[tuple, list]:
+        if rowId is None:
+            rowId = self._nextId
+            self._nextId += 1
+        timeEnd = toMsecs(clip.timeEnd)
+        boundingBox = clip.boundingBox
+        row = (rowId, toMsecs(clip.timeStart, 0), self.nullTime if timeEnd is None else timeEnd, clip.actionClassIndex,
+               clip.visibility, clip.dirty, boundingBox.x, boundingBox.y, boundingBox.width, boundingBox.height,
+               boundingBox.confidence)
+        return row, [clip.thumbnailKey, clip.name, clip.description, clip.clip_timestamps]
+
+    def _materialize(self, index: int) -> VideoItemClip:
+        row = self._rows[index]
+        thumbnailKey, name, description, clipTimestamps = self._extras[int(row['id'])]
+        timeEnd = int(row['timeEnd'])
+        clip = VideoItemClip(int(row['timeStart']), None if timeEnd == self.nullTime else timeEnd, thumbnailKey, name,
+                             int(row['visibility']))
+        clip.description = description
+        clip.actionClassIndex = int(row['actionClassIndex'])
+        clip.boundingBox = self._boundingBox(row)
+        clip.clip_timestamps = clipTimestamps
+        clip.dirty = bool(row['dirty'])
+        return clip
+
+    @staticmethod
+    def _boundingBox(row) -> BoundingBox:
+        boundingBox = BoundingBox()
+        boundingBox.x, boundingBox.y = float(row['x']), float(row['y'])
+        boundingBox.width, boundingBox.height = float(row['width']), float(row['height'])
+        boundingBox.confidence = float(row['confidence'])
+        return boundingBox
+
+
+class ClipTableRow:
+    """
+    VideoItemClip interface of a ClipTable row. boundingBox returns a copy, assign a BoundingBox to change it.
+    """
+    __slots__ = ('_table', '_id', '_index', '_version')
+    legacyThumbnail = None
+
+    def __init__(self, table: ClipTable, rowId: int, index: int):
+        self._table = table
+        self._id = rowId
+        self._index = index
+        self._version = table._version
+
+    @property
+    def rowId(self) -> int:
+        return self._id
+
+    def _row(self) -> Optional[int]:
+        """
+        Current index of the row, None if the row was popped
+        """
+        table = self._table
+        if self._version != table._version:
+            ids = table.columns['id']
+            if self._index is None or self._index >= table._size or ids[self._index] != self._id:
+                found = np.flatnonzero(ids == self._id)
+                self._index = int(found[0]) if len(found) else None
+            self._version = table._version
+        return self._index
+
+    def _get(self, column: str):
+        index = self._row()
+        if index is None:
+            return getattr(self._table._detached[self._id], column)
+        return self._table._rows[column][index]
+
+    def _set(self, column: str, value) -> None:
+        index = self._row()
+        if index is None:
+            setattr(self._table._detached[self._id], column, value)
+            return
+        self._table._rows[column][index] = value
+        self._table._rows['dirty'][index] = True
+
+    def _getExtra(self, position: int, name: str):
+        index = self._row()
+        if index is None:
+            return getattr(self._table._detached[self._id], name)
+        return self._table._extras[self._id][position]
+
+    def _setExtra(self, position: int, name: str, value) -> None:
+        index = self._row()
+        if index is None:
+            setattr(self._table._detached[self._id], name, value)
+            return
+        self._table._extras[self._id][position] = value
+        self._table._rows['dirty'][index] = True
+
+    def __lt__(self, other):
+        return self.timeStart < other.timeStart
+
+    def __le__(self, other):
+        return self.timeStart <= other.timeStart
+
+    def __gt__(self, other):
+        return self.timeStart > other.timeStart
+
+    def __ge__(self, other):
+        return self.timeStart >= other.timeStart
+
+    def __str__(self):
+        return f'start time, {self.timeStart},  time end:, {self.timeEnd}, visibility:  {self.visibility}, description:  {self.description} \n'
+
+    @property
+    def timeStart(self) -> int:
+        return int(self._get('timeStart'))
+
+    @timeStart.setter
+    def timeStart(self, time: int):
+        self._set('timeStart', toMsecs(time, 0))
+
+    @property
+    def timeEnd(self) -> Optional[int]:
+        timeEnd = self._get('timeEnd')
+        if timeEnd is None or timeEnd == ClipTable.nullTime:
+            return None
+        return int(timeEnd)
+
+    @timeEnd.setter
+    def timeEnd(self, timeEnd: Optional[int]):
+        if self._row() is None:
+            self._table._detached[self._id].timeEnd = timeEnd
+            return
+        timeEnd = toMsecs(timeEnd)
+        timeStart = self.timeStart
+        if timeEnd is not None and timeEnd < timeStart:
+            self._set('timeStart', timeEnd)
+            self._set('timeEnd', timeStart)
+        else:
+            self._set('timeEnd', ClipTable.nullTime if timeEnd is None else timeEnd)
+
+    @property
+    def timeStartSeconds(self) -> float:
+        return 1e-3 * self.timeStart
+
+    @property
+    def timeEndSeconds(self) -> float:
+        return 1e-3 * (self.timeEnd or 0)
+
+    @property
+    def visibility(self) -> int:
+        return int(self._get('visibility'))
+
+    @visibility.setter
+    def visibility(self, value: int):
+        self._set('visibility', value)
+
+    @property
+    def actionClassIndex(self) -> int:
+        return int(self._get('actionClassIndex'))
+
+    @actionClassIndex.setter
+    def actionClassIndex(self, value: int):
+        self._set('actionClassIndex', value)
+
+    @property
+    def boundingBox(self) -> BoundingBox:
+        index = self._row()
+        if index is None:
+            return self._table._detached[self._id].boundingBox
+        return ClipTable._boundingBox(self._table._rows[index])
+
+    @boundingBox.setter
+    def boundingBox(self, boundingBox: BoundingBox):
+        index = self._row()
+        if index is None:
+            self._table._detached[self._id].boundingBox = boundingBox
+            return
+        for column in ('x', 'y', 'width', 'height', 'confidence'):
+            self._set(column, getattr(boundingBox, column))
+
+    @property
+    def thumbnailKey(self) -> str:
+        return self._getExtra(0, 'thumbnailKey')
+
+    @thumbnailKey.setter
+    def thumbnailKey(self, key: str):
+        self._setExtra(0, 'thumbnailKey', key)
+
+    @property
+    def name(self) -> str:
+        return self._getExtra(1, 'name')
+
+    @name.setter
+    def name(self, name: str):
+        self._setExtra(1, 'name', name)
+
+    @property
+    def description(self) -> str:
+        return self._getExtra(2, 'description')
+
+    @description.setter
+    def description(self, description: str):
+        self._setExtra(2, 'description', description)
+
+    @property
+    def clip_timestamps(self) -> list:
+        return self._getExtra(3, 'clip_timestamps')
+
+    @clip_timestamps.setter
+    def clip_timestamps(self, timestamps: list):
+        self._setExtra(3, 'clip_timestamps', timestamps)
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self._get('dirty'))
+
+    @dirty.setter
+    def dirty(self, value: bool):
+        index = self._row()
+        if index is None:
+            self._table._detached[self._id].dirty = value
+            return
+        self._table._rows['dirty'][index] = value
+
+    def markDirty(self) -> None:
+        self.dirty = True
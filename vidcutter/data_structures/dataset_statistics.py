@@ -0,0 +1,172 @@
+import numpy as np
+
+from vidcutter.data_structures.video_list import VideoList
+
+
+class DatasetStatistics:
+    """
+    Annotation statistics of a dataset: clips count and annotated time per action class, videos count per issue
+    class and the share of every video covered by clips. Only finished clips count, times are milliseconds.
+
+    Aggregates are held per video in arrays, dataset totals are column sums. The first read computes every video at
+    once over the clip columns of the project store, vectorized; afterwards the store reports clip edits by
+    clipsChanged and only the reported videos are computed again, on the next read. Issues and durations are read
+    from the video list as they are. Action class 0 of the arrays is the unknown class, clips of an action class
+    index outside the labels count as unknown.
+    """
+    def __init__(self, videoList: VideoList, store=None):
+        self.videoList = videoList
+        self.store = store
+        self._clipCounts = np.zeros((0, 0), dtype=np.int64)
+        self._annotated = np.zeros((0, 0), dtype=np.int64)
+        self._covered = np.zeros(0, dtype=np.int64)
+        self._staleClips: set[int] = set()
+        self._computed = False
+
+    @classmethod
+    def load(cls, folder: str) -> 'DatasetStatistics':
+        """
+        Statistics of the project in folder, read without Qt, e.g. by dataset scripts
+        """
+        from vidcutter.data_structures.project_database import ProjectDatabase
+        from vidcutter.data_structures.project_journal import ProjectJournal
+        store = ProjectDatabase(folder) if ProjectDatabase.exists(folder) else ProjectJournal(folder)
+        statistics = cls(store.load(), store)
+        statistics.refresh()
+        store.close()
+        statistics.store = None
+        return statistics
+
+    @property
+    def actionLabels(self) -> list[str]:
+        return [self.videoList.actionClassUnknownLabel, *self.videoList.actionClassesLabels]
+
+    @property
+    def issueLabels(self) -> list[str]:
+        return list(self.videoList.video_issues_classes)
+
+    def clipsChanged(self, videoIndex: int) -> None:
+        self._staleClips.add(videoIndex)
+
+    def refresh(self) -> None:
+        """
+        Compute what changed since the last read, everything on the first one
+        """
+        if not self._computed or len(self._covered) != len(self.videoList.videos):
+            self._computeAll()
+        elif self._staleClips:
+            for videoIndex in sorted(self._staleClips):
+                if videoIndex < len(self.videoList.videos):
+                    self._computeVideo(videoIndex)
+        self._staleClips.clear()
+
+    def clipCounts(self) -> dict[str, int]:
+        self.refresh()
+        return dict(zip(self.actionLabels, self._clipCounts.sum(axis=0).tolist()))
+
+    def annotatedSeconds(self) -> dict[str, float]:
+        self.refresh()
+        return dict(zip(self.actionLabels, (1e-3 * self._annotated.sum(axis=0)).tolist()))
+
+    def issueCounts(self) -> dict[str, int]:
+        """
+        Videos count of every issue class. Issues are stored as indexes of the issue classes, older projects hold
+        their labels.
+        """
+        labels = self.issueLabels
+        counts = [0] * len(labels)
+        for video in self.videoList.videos:
+            for issue in set(video.issues):
+                index = issue if isinstance(issue, int) else labels.index(issue) if issue in labels else -1
+                if 0 <= index < len(labels):
+                    counts[index] += 1
+        return dict(zip(labels, counts))
+
+    def videoClipCounts(self) -> np.ndarray:
+        self.refresh()
+        return self._clipCounts.sum(axis=1)
+
+    def videoAnnotatedSeconds(self) -> np.ndarray:
+        self.refresh()
+        return 1e-3 * self._annotated.sum(axis=1)
+
+    def coverage(self) -> np.ndarray:
+        """
+        Share of every video covered by clips, overlapping clips count once. 0 for videos of unknown duration.
+        """
+        self.refresh()
+        durations = np.fromiter((video.duration for video in self.videoList.videos), dtype=np.int64,
+                                count=len(self.videoList.videos))
+        return np.divide(self._covered, durations, out=np.zeros(len(durations)), where=durations > 0).clip(0, 1)
+
+    def summary(self) -> dict:
+        """
+        All statistics in plain Python types, suitable for JSON
+        """
+        coverage = self.coverage()
+        return {
+            'videos': len(self.videoList.videos),
+            'clips': int(self._clipCounts.sum()),
+            'annotated_seconds': float(1e-3 * self._annotated.sum()),
+            'action_classes': {label: {'clips': count, 'seconds': seconds} for (label, count), seconds
+                               in zip(self.clipCounts().items(), self.annotatedSeconds().values())},
+            'issues': self.issueCounts(),
+            'coverage': {video.filename: share for video, share in zip(self.videoList.videos, coverage.tolist())},
+        }
+
+    def _computeAll(self) -> None:
+        videosCount = len(self.videoList.videos)
+        rows = self.store.clipRows() if hasattr(self.store, 'clipRows') else None
+        if rows is not None:
+            columns = np.array(rows, dtype=np.int64).reshape(-1, 4)
+            videoIndexes, timeStart, timeEnd, actionClass = columns.T
+        else:
+            columns = [self._clipColumns(videoIndex) for videoIndex in range(videosCount)]
+            videoIndexes = np.repeat(np.arange(videosCount, dtype=np.int64), [len(column[0]) for column in columns])
+            timeStart, timeEnd, actionClass = (np.concatenate([column[field] for column in columns])
+                                               if columns else np.empty(0, dtype=np.int64) for field in range(3))
+        self._clipCounts, self._annotated, self._covered = self._aggregate(
+            videoIndexes, timeStart, timeEnd, actionClass, videosCount, len(self.actionLabels))
+        self._computed = True
+
+    def _computeVideo(self, videoIndex: int) -> None:
+        timeStart, timeEnd, actionClass = self._clipColumns(videoIndex)
+        clipCounts, annotated, covered = self._aggregate(np.zeros(len(timeStart), dtype=np.int64), timeStart, timeEnd,
+                                                         actionClass, 1, self._clipCounts.shape[1])
+        self._clipCounts[videoIndex] = clipCounts[0]
+        self._annotated[videoIndex] = annotated[0]
+        self._covered[videoIndex] = covered[0]
+
+    def _clipColumns(self, videoIndex: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Start, end and action class of the finished clips of a video held in memory, sorted by start time
+        """
+        clips = self.videoList.videos[videoIndex].clips
+        columns = getattr(clips, 'columns', None)
+        if columns is not None:
+            columns = columns[columns['timeEnd'] != clips.nullTime]
+            return (columns['timeStart'].astype(np.int64), columns['timeEnd'].astype(np.int64),
+                    columns['actionClassIndex'].astype(np.int64))
+        finished = [(clip.timeStart, clip.timeEnd, clip.actionClassIndex) for clip in clips if clip.timeEnd is not None]
+        columns = np.array(finished, dtype=np.int64).reshape(-1, 3)
+        return columns[:, 0], columns[:, 1], columns[:, 2]
+
+    @staticmethod
+    def _aggregate(videoIndexes: np.ndarray, timeStart: np.ndarray, timeEnd: np.ndarray, actionClass: np.ndarray,
+                   videosCount: int, classesCount: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Per video clips count and annotated time of every action class, and covered time. Clips must be sorted by
+        video and start time.
+        """
+        actionClass = np.where((actionClass >= 0) & (actionClass < classesCount - 1), actionClass + 1, 0)
+        cells = videoIndexes * classesCount + actionClass
+        size = videosCount * classesCount
+        clipCounts = np.bincount(cells, minlength=size).reshape(videosCount, classesCount)
+        annotated = np.bincount(cells, weights=timeEnd - timeStart, minlength=size)
+        annotated = np.rint(annotated).astype(np.int64).reshape(videosCount, classesCount)
+        # shifting every video past the end of the previous one lets a single running maximum stay within videos
+        shift = videoIndexes * (int(timeEnd.max(initial=0)) + 1)
+        previousEnd = np.concatenate(([0], np.maximum.accumulate(timeEnd + shift)[:-1])) - shift
+        covered = np.clip(timeEnd - np.maximum(timeStart, previousEnd), 0, None)
+        covered = np.bincount(videoIndexes, weights=covered, minlength=videosCount)
+        return clipCounts, annotated, np.rint(covered).astype(np.int64)
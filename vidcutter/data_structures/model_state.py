@@ -0,0 +1,28 @@
+"""
+Helpers shared by the annotation model classes. The model is plain Python, times are integer milliseconds and no Qt
+objects are stored, so a project can be loaded without Qt. Projects saved before hold QTime objects, those are
+converted when unpickled; it is done by duck typing, this module does not import Qt.
+"""
+from typing import Optional
+
+
+def toMsecs(value, default: Optional[int] = None) -> Optional[int]:
+    """
+    Milliseconds of an int or a QTime, default for None and null QTime
+    """
+    if value is None:
+        return default
+    if isinstance(value, (int, float)):
+        return int(value)
+    if value.isNull():
+        return default
+    return value.msecsSinceStartOfDay()
+
+
+def slotsState(instance, exclude: tuple = ()) -> dict:
+    state = {}
+    for cls in type(instance).__mro__:
+        for name in getattr(cls, '__slots__', ()):
+            if name not in exclude and hasattr(instance, name):
+                state[name] = getattr(instance, name)
+    return state
@@ -0,0 +1,367 @@
+import json
+import logging
+import os
+import sqlite3
+from bisect import bisect_right
+from typing import Optional
+
+from vidcutter.data_structures.model_state import toMsecs
+from vidcutter.data_structures.video_clip_timestamps import VideoClipTimestamps
+from vidcutter.data_structures.video_item import VideoItem
+from vidcutter.data_structures.video_item_clip import BoundingBox, VideoItemClip
+from vidcutter.data_structures.video_list import VideoList
+
+
+class ProjectDatabase:
+    """
+    SQLite project store, an alternative to data.pickle with its journal.
+
+    Opening a project reads only the videos table, clips of a video are paged in by loadClips when the video is
+    loaded into the player. Edits are reported with the same calls as ProjectJournal and every call is a single
+    transaction touching only the rows of the changed clip or video.
+
+    Clip rows are addressed by clip index in the sorted clips list, the database keeps (timeStart, row id) of loaded
+    videos in the same order as VideoItem.clips and re-sorts them the same way SortedList does.
+    """
+    defaultFilename = 'data.sqlite'
+    schema = """
+        CREATE TABLE IF NOT EXISTS project (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+        CREATE TABLE IF NOT EXISTS videos (
+            id INTEGER PRIMARY KEY,
+            position INTEGER NOT NULL,
+            filename TEXT NOT NULL DEFAULT '',
+            duration INTEGER,
+            description TEXT NOT NULL DEFAULT '',
+            youtube_id TEXT NOT NULL DEFAULT '',
+            issues TEXT NOT NULL DEFAULT '[]',
+            thumbnail_key TEXT NOT NULL DEFAULT ''
+        );
+        CREATE TABLE IF NOT EXISTS clips (
+            id INTEGER PRIMARY KEY,
+            video_id INTEGER NOT NULL REFERENCES videos(id) ON DELETE CASCADE,
+            time_start INTEGER,
+            time_end INTEGER,
+            thumbnail_key TEXT NOT NULL DEFAULT '',
+            name TEXT NOT NULL DEFAULT '',
+            description TEXT NOT NULL DEFAULT '',
+            visibility INTEGER NOT NULL DEFAULT 2,
+            action_class_index INTEGER NOT NULL DEFAULT -1
+        );
+        CREATE INDEX IF NOT EXISTS clips_video ON clips(video_id, time_start);
+        CREATE TABLE IF NOT EXISTS timestamps (
+            id INTEGER PRIMARY KEY,
+            clip_id INTEGER NOT NULL REFERENCES clips(id) ON DELETE CASCADE,
+            position INTEGER NOT NULL,
+            timestamp INTEGER,
+            timestamp_type INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS timestamps_clip ON timestamps(clip_id, position);
+        CREATE TABLE IF NOT EXISTS bounding_boxes (
+            clip_id INTEGER PRIMARY KEY REFERENCES clips(id) ON DELETE CASCADE,
+            x REAL NOT NULL,
+            y REAL NOT NULL,
+            width REAL NOT NULL,
+            height REAL NOT NULL,
+            confidence REAL NOT NULL
+        );
+    """
+    clipColumns = {
+        'thumbnailKey': 'thumbnail_key',
+        'name': 'name',
+        'description': 'description',
+        'visibility': 'visibility',
+        'actionClassIndex': 'action_class_index',
+    }
+    videoColumns = {
+        'filename': 'filename',
+        'description': 'description',
+        'youtubeId': 'youtube_id',
+        'thumbnailKey': 'thumbnail_key',
+    }
+
+    def __init__(self, folder: str, filename: str = defaultFilename):
+        self.logger = logging.getLogger(__name__)
+        self.filepath = os.path.join(folder, filename)
+        self._connection = sqlite3.connect(self.filepath)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.execute('PRAGMA foreign_keys=ON')
+        self._connection.executescript(self.schema)
+        self.videoList = None
+        self._videoIds: list[int] = []
+        self._clipKeys: dict[int, list[int]] = {}
+        self._clipIds: dict[int, list[int]] = {}
+        # DatasetStatistics told about clip edits, if any
+        self.statistics = None
+
+    @staticmethod
+    def exists(folder: str, filename: str = defaultFilename) -> bool:
+        return os.path.isfile(os.path.join(folder, filename))
+
+    @classmethod
+    def create(cls, folder: str, videoList: VideoList, filename: str = defaultFilename) -> 'ProjectDatabase':
+        """
+        Write a whole video list, e.g. one loaded from data.pickle, into a new project database.
+        """
+        database = cls(folder, filename)
+        with database._connection:
+            database._connection.execute('DELETE FROM videos')
+            database._connection.execute('DELETE FROM project')
+            database._writeProject(videoList)
+            for position, video in enumerate(videoList.videos):
+                videoId = database._insertVideo(position, video)
+                for clip in video.clips:
+                    database._insertClip(videoId, clip)
+        return database
+
+    def load(self) -> VideoList:
+        """
+        Read project settings and the videos table. Clips of every video stay empty until loadClips.
+        """
+        project = dict(self._connection.execute('SELECT key, value FROM project'))
+        videoList = VideoList(json.loads(project.get('video_issues_classes', '[]')),
+                              json.loads(project.get('action_classes_labels', '[]')))
+        videoList.description = project.get('description', '')
+        videoList.actionClassUnknownLabel = project.get('action_class_unknown_label', videoList.actionClassUnknownLabel)
+        self._videoIds.clear()
+        self._clipKeys.clear()
+        self._clipIds.clear()
+        rows = self._connection.execute('SELECT id, filename, duration, description, youtube_id, issues, thumbnail_key '
+                                        'FROM videos ORDER BY position')
+        for videoId, filename, duration, description, youtubeId, issues, thumbnailKey in rows:
+            video = VideoItem()
+            video.filename = filename
+            video.duration = duration
+            video.description = description
+            video.youtubeId = youtubeId
+            video.issues = json.loads(issues)
+            video.thumbnailKey = thumbnailKey
+            video.clearDirty()
+            videoList.videos.append(video)
+            self._videoIds.append(videoId)
+        self.videoList = videoList
+        return videoList
+
+    def loadClips(self, videoList: VideoList, videoIndex: int) -> None:
+        if videoIndex in self._clipIds:
+            return
+        videoId = self._videoIds[videoIndex]
+        video = videoList.videos[videoIndex]
+        boundingBoxes = {row[0]: row[1:] for row in self._connection.execute(
+            'SELECT b.clip_id, b.x, b.y, b.width, b.height, b.confidence FROM bounding_boxes b '
+            'JOIN clips c ON c.id = b.clip_id WHERE c.video_id = ?', (videoId,))}
+        timestamps: dict[int, list[VideoClipTimestamps]] = {}
+        for clipId, timestamp, timestampType in self._connection.execute(
+                'SELECT t.clip_id, t.timestamp, t.timestamp_type FROM timestamps t '
+                'JOIN clips c ON c.id = t.clip_id WHERE c.video_id = ? ORDER BY t.clip_id, t.position', (videoId,)):
+            timestamps.setdefault(clipId, []).append(
+                VideoClipTimestamps(timestamp, VideoClipTimestamps.TimestampType(timestampType)))
+        video.clips.clear()
+        keys, ids = [], []
+        rows = self._connection.execute('SELECT id, time_start, time_end, thumbnail_key, name, description, visibility, '
+                                        'action_class_index FROM clips WHERE video_id = ? ORDER BY time_start, id',
+                                        (videoId,))
+        for clipId, timeStart, timeEnd, thumbnailKey, name, description, visibility, actionClassIndex in rows:
+            clip = VideoItemClip(timeStart, timeEnd, thumbnailKey, name, visibility)
+            clip.description = description
+            clip.actionClassIndex = actionClassIndex
+            if clipId in boundingBoxes:
+                # assigned directly, the BoundingBox setters clamp values which are already stored clamped
+                boundingBox = BoundingBox()
+                boundingBox._x, boundingBox._y, boundingBox._width, boundingBox._height, boundingBox._confidence = boundingBoxes[clipId]
+                clip.boundingBox = boundingBox
+            clip.clip_timestamps = timestamps.get(clipId, [])
+            clip.dirty = False
+            video.clips.add(clip)
+            position = bisect_right(keys, self._clipKey(clip))
+            keys.insert(position, self._clipKey(clip))
+            ids.insert(position, clipId)
+        self._clipKeys[videoIndex] = keys
+        self._clipIds[videoIndex] = ids
+
+    def clipAdded(self, videoIndex: int, clip) -> None:
+        self._ensureClips(videoIndex)
+        with self._connection:
+            clipId = self._insertClip(self._videoIds[videoIndex], clip)
+        keys = self._clipKeys[videoIndex]
+        position = bisect_right(keys, self._clipKey(clip))
+        keys.insert(position, self._clipKey(clip))
+        self._clipIds[videoIndex].insert(position, clipId)
+        self._clipsChanged(videoIndex)
+
+    def clipRemoved(self, videoIndex: int, clipIndex: int) -> None:
+        self._ensureClips(videoIndex)
+        self._clipKeys[videoIndex].pop(clipIndex)
+        clipId = self._clipIds[videoIndex].pop(clipIndex)
+        with self._connection:
+            self._connection.execute('DELETE FROM clips WHERE id = ?', (clipId,))
+        self._clipsChanged(videoIndex)
+
+    def clipUpdated(self, videoIndex: int, clipIndex: int, **fields) -> None:
+        """
+        Update the row of a changed clip. clipIndex is the index before the change, as for ProjectJournal; if
+        timeStart changed, the clip has been re-added to the sorted clips list and is looked up at its new index.
+        """
+        self._ensureClips(videoIndex)
+        keys, ids = self._clipKeys[videoIndex], self._clipIds[videoIndex]
+        if 'timeStart' in fields:
+            keys.pop(clipIndex)
+            clipId = ids.pop(clipIndex)
+            timeStart = toMsecs(fields['timeStart'], 0)
+            clipIndex = bisect_right(keys, timeStart)
+            keys.insert(clipIndex, timeStart)
+            ids.insert(clipIndex, clipId)
+        clipId = ids[clipIndex]
+        clip = self.videoList.videos[videoIndex].clips[clipIndex]
+        assignments, values = [], []
+        if 'timeStart' in fields or 'timeEnd' in fields:
+            # the timeEnd setter swaps start and end times, store both as they are in the clip
+            assignments += ['time_start = ?', 'time_end = ?']
+            values += [clip.timeStart, clip.timeEnd]
+        for name, column in self.clipColumns.items():
+            if name in fields:
+                assignments.append('{} = ?'.format(column))
+                values.append(getattr(clip, name))
+        with self._connection:
+            if assignments:
+                self._connection.execute('UPDATE clips SET {} WHERE id = ?'.format(', '.join(assignments)), values + [clipId])
+            if 'boundingBox' in fields:
+                self._writeBoundingBox(clipId, clip.boundingBox)
+            if 'clip_timestamps' in fields:
+                self._writeTimestamps(clipId, clip.clip_timestamps)
+        self._clipsChanged(videoIndex)
+
+    def clipsCleared(self, videoIndex: int) -> None:
+        with self._connection:
+            self._connection.execute('DELETE FROM clips WHERE video_id = ?', (self._videoIds[videoIndex],))
+        self._clipKeys[videoIndex] = []
+        self._clipIds[videoIndex] = []
+        self._clipsChanged(videoIndex)
+
+    def clipsVisibilityChanged(self, videoIndex: int, visibility: Optional[int]) -> None:
+        with self._connection:
+            if visibility is None:
+                self._connection.execute('UPDATE clips SET visibility = 2 - visibility WHERE video_id = ?',
+                                         (self._videoIds[videoIndex],))
+            else:
+                self._connection.execute('UPDATE clips SET visibility = ? WHERE video_id = ?',
+                                         (visibility, self._videoIds[videoIndex]))
+        self._clipsChanged(videoIndex)
+
+    def videoUpdated(self, videoIndex: int, **fields) -> None:
+        video = self.videoList.videos[videoIndex]
+        assignments, values = [], []
+        for name, column in self.videoColumns.items():
+            if name in fields:
+                assignments.append('{} = ?'.format(column))
+                values.append(getattr(video, name))
+        if 'duration' in fields:
+            assignments.append('duration = ?')
+            values.append(video.duration)
+        if 'issues' in fields:
+            assignments.append('issues = ?')
+            values.append(json.dumps(list(video.issues)))
+        if not assignments:
+            return
+        with self._connection:
+            self._connection.execute('UPDATE videos SET {} WHERE id = ?'.format(', '.join(assignments)),
+                                     values + [self._videoIds[videoIndex]])
+
+    def saveVideos(self, videoList: VideoList, videoIndexes: list[int]) -> None:
+        """
+        Rewrite the rows of dirty videos and of their dirty clips in one transaction. Edits are already written one by
+        one, this brings the rows in line with the model should a change have bypassed the edit calls.
+        """
+        with self._connection:
+            for videoIndex in videoIndexes:
+                video = videoList.videos[videoIndex]
+                self._connection.execute(
+                    'UPDATE videos SET filename = ?, duration = ?, description = ?, youtube_id = ?, issues = ?, '
+                    'thumbnail_key = ? WHERE id = ?',
+                    (video.filename, video.duration, video.description, video.youtubeId,
+                     json.dumps(list(video.issues)), video.thumbnailKey, self._videoIds[videoIndex]))
+                if videoIndex not in self._clipIds:
+                    continue
+                for clip, clipId in zip(video.clips, self._clipIds[videoIndex]):
+                    if not clip.dirty:
+                        continue
+                    self._connection.execute(
+                        'UPDATE clips SET time_start = ?, time_end = ?, thumbnail_key = ?, name = ?, description = ?, '
+                        'visibility = ?, action_class_index = ? WHERE id = ?',
+                        (clip.timeStart, clip.timeEnd, clip.thumbnailKey,
+                         clip.name, clip.description, clip.visibility, clip.actionClassIndex, clipId))
+
+    def clipRows(self) -> list[tuple[int, int, int, int]]:
+        """
+        (video index, time start, time end, action class index) of the finished clips of every video, whether its
+        clips are loaded or not, sorted by video and time start
+        """
+        return self._connection.execute('SELECT v.position, c.time_start, c.time_end, c.action_class_index FROM clips c '
+                                        'JOIN videos v ON v.id = c.video_id WHERE c.time_end IS NOT NULL '
+                                        'ORDER BY v.position, c.time_start').fetchall()
+
+    def needsCompaction(self) -> bool:
+        return False
+
+    def compact(self, videoList: VideoList) -> bool:
+        # rows are written in place, there is nothing to fold
+        return False
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def _ensureClips(self, videoIndex: int) -> None:
+        if videoIndex not in self._clipIds:
+            self.loadClips(self.videoList, videoIndex)
+
+    def _clipsChanged(self, videoIndex: int) -> None:
+        # clip edits mark their video, so autosave finds dirty videos without looking at clips
+        self.videoList.videos[videoIndex].markDirty()
+        if self.statistics is not None:
+            self.statistics.clipsChanged(videoIndex)
+
+    def _clipKey(self, clip) -> int:
+        return clip.timeStart
+
+    def _writeProject(self, videoList: VideoList) -> None:
+        values = {
+            'description': videoList.description,
+            'video_issues_classes': json.dumps(list(videoList.video_issues_classes)),
+            'action_classes_labels': json.dumps(list(videoList.actionClassesLabels)),
+            'action_class_unknown_label': videoList.actionClassUnknownLabel,
+        }
+        self._connection.executemany('INSERT OR REPLACE INTO project (key, value) VALUES (?, ?)', values.items())
+
+    def _insertVideo(self, position: int, video: VideoItem) -> int:
+        cursor = self._connection.execute(
+            'INSERT INTO videos (position, filename, duration, description, youtube_id, issues, thumbnail_key) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (position, video.filename, video.duration, video.description, video.youtubeId,
+             json.dumps(list(video.issues)), video.thumbnailKey))
+        return cursor.lastrowid
+
+    def _insertClip(self, videoId: int, clip) -> int:
+        cursor = self._connection.execute(
+            'INSERT INTO clips (video_id, time_start, time_end, thumbnail_key, name, description, visibility, '
+            'action_class_index) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (videoId, clip.timeStart, clip.timeEnd, clip.thumbnailKey,
+             clip.name, clip.description, clip.visibility, clip.actionClassIndex))
+        clipId = cursor.lastrowid
+        self._writeBoundingBox(clipId, clip.boundingBox)
+        self._writeTimestamps(clipId, clip.clip_timestamps)
+        return clipId
+
+    def _writeBoundingBox(self, clipId: int, boundingBox: BoundingBox) -> None:
+        self._connection.execute(
+            'INSERT OR REPLACE INTO bounding_boxes (clip_id, x, y, width, height, confidence) VALUES (?, ?, ?, ?, ?, ?)',
+            (clipId, boundingBox.x, boundingBox.y, boundingBox.width, boundingBox.height, boundingBox.confidence))
+
+    def _writeTimestamps(self, clipId: int, timestamps: list[VideoClipTimestamps]) -> None:
+        self._connection.execute('DELETE FROM timestamps WHERE clip_id = ?', (clipId,))
+        self._connection.executemany(
+            'INSERT INTO timestamps (clip_id, position, timestamp, timestamp_type) VALUES (?, ?, ?, ?)',
+            [(clipId, position, timestamp.timestamp, timestamp.timestamp_type.value)
+             for position, timestamp in enumerate(timestamps)])
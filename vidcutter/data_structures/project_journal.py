@@ -0,0 +1,287 @@
+import copy
+import logging
+import os
+import pickle
+import re
+import struct
+import zlib
+from functools import partial
+from typing import Optional
+
+from vidcutter.data_structures.video_item import VideoItem
+from vidcutter.data_structures.video_list import VideoList
+
+
+class ProjectJournal:
+    """
+    Append-only change journal for a project folder.
+
+    Every edit of the video list is appended to the active journal file as a small record, so saving costs time
+    proportional to the edit and not to the dataset. Records reach the OS right away and survive a crash of the
+    application; saveVideos, called by autosave, syncs the file. The journal is replayed on top of the data.pickle
+    snapshot when the folder is opened and periodically folded into a new snapshot (compaction). Snapshots are built and written by the given ProjectSaver on its worker thread, or
+    synchronously when there is none.
+
+    Journal files are named data.journal.<generation>. A snapshot stores the generation of the first journal which
+    is NOT folded into it (VideoList.journalGeneration), so a crash at any point of the compaction leaves the folder
+    in a state which replays to the same video list.
+    """
+    recordHeader = struct.Struct('<II')  # payload length, crc32 of payload
+    journalPrefix = 'data.journal'
+    compactThreshold = 2000
+
+    def __init__(self, folder: str, snapshotFilename: str = 'data.pickle', saver=None):
+        self.logger = logging.getLogger(__name__)
+        self.folder = folder
+        self.snapshotFilename = snapshotFilename
+        self.generation = 0
+        self.recordsCount = 0
+        self._file = None
+        self.saver = saver
+        self.videoList = None
+        # indexes of videos changed since the last compaction, and copies of all videos changed since the folder was
+        # opened as they were at the last compaction; other videos are read back from the previous snapshot
+        self._changed: set[int] = set()
+        self._frozen: dict[int, VideoItem] = {}
+        # DatasetStatistics told about clip edits, if any
+        self.statistics = None
+
+    @property
+    def snapshotPath(self) -> str:
+        return os.path.join(self.folder, self.snapshotFilename)
+
+    def journalPath(self, generation: int) -> str:
+        return os.path.join(self.folder, '{0}.{1:06d}'.format(self.journalPrefix, generation))
+
+    def journalGenerations(self) -> list[int]:
+        pattern = re.compile(r'^{}\.(\d+)$'.format(re.escape(self.journalPrefix)))
+        generations = []
+        for filename in os.listdir(self.folder):
+            match = pattern.match(filename)
+            if match:
+                generations.append(int(match.group(1)))
+        return sorted(generations)
+
+    def load(self) -> VideoList:
+        """
+        Load snapshot, replay all journals which are not folded into it and open the newest journal for appending.
+        """
+        with open(self.snapshotPath, 'rb') as f:
+            videoList = pickle.load(f)
+        snapshotGeneration = getattr(videoList, 'journalGeneration', 0)
+        self.generation = snapshotGeneration
+        self.recordsCount = 0
+        self._changed.clear()
+        self._frozen.clear()
+        for generation in self.journalGenerations():
+            if generation < snapshotGeneration:
+                self._remove(self.journalPath(generation))
+                continue
+            self.recordsCount += self.replay(videoList, self.journalPath(generation))
+            self.generation = generation
+        videoList.journalGeneration = snapshotGeneration
+        for video in videoList.videos:
+            video.clearDirty()
+        self._open(self.generation)
+        self.videoList = videoList
+        return videoList
+
+    def loadClips(self, videoList: VideoList, videoIndex: int) -> None:
+        # the snapshot holds clips of all videos, nothing to page in
+        pass
+
+    def replay(self, videoList: VideoList, filepath: str) -> int:
+        """
+        Apply all complete records of a journal file to the video list. A torn record at the end of the file (crash
+        during an append) is dropped and the file is truncated to the last complete record.
+        """
+        applied = 0
+        validLength = 0
+        with open(filepath, 'rb') as f:
+            data = f.read()
+        offset = 0
+        while offset + self.recordHeader.size <= len(data):
+            length, crc = self.recordHeader.unpack_from(data, offset)
+            payload = data[offset + self.recordHeader.size:offset + self.recordHeader.size + length]
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                break
+            try:
+                record = pickle.loads(payload)
+                ProjectJournal.applyRecord(videoList, record)
+                self._changed.add(record[1])
+            except (IndexError, AttributeError, pickle.UnpicklingError):
+                self.logger.exception('Could not apply journal record #{0} of {1}'.format(applied, filepath))
+            offset += self.recordHeader.size + length
+            validLength = offset
+            applied += 1
+        if validLength < len(data):
+            self.logger.warning('Dropping incomplete journal record at the end of {}'.format(filepath))
+            with open(filepath, 'r+b') as f:
+                f.truncate(validLength)
+        return applied
+
+    @staticmethod
+    def applyRecord(videoList: VideoList, record: tuple) -> None:
+        operation, videoIndex = record[0], record[1]
+        video = videoList.videos[videoIndex]
+        if operation == 'clip_add':
+            video.clips.add(record[2])
+        elif operation == 'clip_remove':
+            video.clips.pop(record[2])
+        elif operation == 'clip_update':
+            clipIndex, fields = record[2], record[3]
+            clip = video.clips[clipIndex]
+            resort = any(name == 'timeStart' for name, _ in fields)
+            if resort:
+                video.clips.pop(clipIndex)
+            for name, value in fields:
+                setattr(clip, name, value)
+            if resort:
+                video.clips.add(clip)
+        elif operation == 'clips_clear':
+            video.clips.clear()
+        elif operation == 'clips_visibility':
+            video.setClipsVisibility(record[2])
+        elif operation == 'video_update':
+            for name, value in record[2]:
+                setattr(video, name, value)
+        elif operation == 'video_save':
+            videoList.videos[videoIndex] = record[2]
+
+    def append(self, record: tuple) -> None:
+        if self._file is None:
+            return
+        payload = pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL)
+        self._file.write(self.recordHeader.pack(len(payload), zlib.crc32(payload)) + payload)
+        self._file.flush()
+        self.recordsCount += 1
+        self._changed.add(record[1])
+
+    def sync(self) -> None:
+        if self._file is not None:
+            os.fsync(self._file.fileno())
+
+    def clipAdded(self, videoIndex: int, clip) -> None:
+        self.append(('clip_add', videoIndex, clip))
+        self._clipsChanged(videoIndex)
+
+    def clipRemoved(self, videoIndex: int, clipIndex: int) -> None:
+        self.append(('clip_remove', videoIndex, clipIndex))
+        self._clipsChanged(videoIndex)
+
+    def clipUpdated(self, videoIndex: int, clipIndex: int, **fields) -> None:
+        """
+        Record changed clip attributes. Changing timeStart re-sorts the clip on replay, the same way the tool pops and
+        re-adds a clip to the sorted clips list, so fields must be given in the order they were assigned.
+        """
+        self.append(('clip_update', videoIndex, clipIndex, list(fields.items())))
+        self._clipsChanged(videoIndex)
+
+    def clipsCleared(self, videoIndex: int) -> None:
+        self.append(('clips_clear', videoIndex))
+        self._clipsChanged(videoIndex)
+
+    def clipsVisibilityChanged(self, videoIndex: int, visibility: Optional[int]) -> None:
+        """
+        Record a visibility change of all clips of a video, None when their visibility was inverted
+        """
+        self.append(('clips_visibility', videoIndex, visibility))
+        self._clipsChanged(videoIndex)
+
+    def videoUpdated(self, videoIndex: int, **fields) -> None:
+        self.append(('video_update', videoIndex, list(fields.items())))
+
+    def saveVideos(self, videoList: VideoList, videoIndexes: list[int]) -> None:
+        # edits of dirty videos are journaled already, only make them durable; video_save records of older journals
+        # are still replayed
+        self.sync()
+
+    def needsCompaction(self) -> bool:
+        return self.recordsCount >= self.compactThreshold
+
+    def compact(self, videoList: VideoList) -> bool:
+        """
+        Fold all journals into a new snapshot. Only videos changed since the last compaction, or dirty ones, are copied
+        here in the caller's thread, so the snapshot is consistent with the journal generation it starts. The saver
+        builds the snapshot from these copies and the previous snapshot, writes it and removes folded journals. A
+        compaction requested while the previous one is still being written supersedes it.
+        """
+        if self._file is None:
+            return False
+        nextGeneration = self.generation + 1
+        videoList.journalGeneration = nextGeneration
+        changed = self._changed.union(videoList.dirtyVideosIndexes())
+        if videoList is not self.videoList or not os.path.isfile(self.snapshotPath):
+            # no snapshot of this video list to read unchanged videos back from, write all of them
+            changed = range(len(videoList.videos))
+            self._frozen.clear()
+            self.videoList = videoList
+        for videoIndex in changed:
+            if videoIndex < len(videoList.videos):
+                self._frozen[videoIndex] = videoList.videos[videoIndex].copy()
+        self._changed.clear()
+        state = copy.deepcopy({name: getattr(videoList, name) for name in VideoList.__slots__ if name != 'videos'})
+        build = partial(self._buildSnapshot, state, dict(self._frozen), len(videoList.videos))
+        self._open(nextGeneration)
+        self.recordsCount = 0
+        if self.saver is not None:
+            self.saver.save(self.snapshotPath, build, lambda: self._removeFolded(nextGeneration))
+        else:
+            self._writeSnapshot(build())
+            self._removeFolded(nextGeneration)
+        return True
+
+    def _buildSnapshot(self, state: dict, frozen: dict, videosCount: int) -> bytes:
+        """
+        Serialized video list of state, whose videos are the frozen copies and those of the previous snapshot
+        """
+        videoList = VideoList()
+        if len(frozen) < videosCount:
+            with open(self.snapshotPath, 'rb') as f:
+                videoList = pickle.load(f)
+            if len(videoList.videos) != videosCount:
+                raise pickle.UnpicklingError('{} does not hold the videos of the project'.format(self.snapshotPath))
+        for name, value in state.items():
+            setattr(videoList, name, value)
+        videoList.videos = [frozen[videoIndex] if videoIndex in frozen else videoList.videos[videoIndex]
+                            for videoIndex in range(videosCount)]
+        return pickle.dumps(videoList, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def _writeSnapshot(self, snapshot: bytes) -> None:
+        temporaryPath = self.snapshotPath + '.tmp'
+        with open(temporaryPath, 'wb') as f:
+            f.write(snapshot)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporaryPath, self.snapshotPath)
+
+    def _removeFolded(self, generation: int) -> None:
+        for folded in self.journalGenerations():
+            if folded < generation:
+                self._remove(self.journalPath(folded))
+
+    def close(self) -> None:
+        if self.saver is not None:
+            self.saver.wait()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _clipsChanged(self, videoIndex: int) -> None:
+        # clip edits mark their video, so autosave finds dirty videos without looking at clips
+        if self.videoList is not None and videoIndex < len(self.videoList.videos):
+            self.videoList.videos[videoIndex].markDirty()
+        if self.statistics is not None:
+            self.statistics.clipsChanged(videoIndex)
+
+    def _open(self, generation: int) -> None:
+        if self._file is not None:
+            self._file.close()
+        self.generation = generation
+        self._file = open(self.journalPath(generation), 'ab')
+
+    def _remove(self, filepath: str) -> None:
+        try:
+            os.remove(filepath)
+        except FileNotFoundError:
+            pass
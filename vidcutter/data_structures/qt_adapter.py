@@ -0,0 +1,19 @@
+"""
+Conversions between the Qt-free annotation model and Qt widgets. The model keeps times as integer milliseconds, None
+for a clip end which is not set yet; widgets such as QTimeEdit and VideoService work with QTime.
+"""
+from typing import Optional
+
+from PyQt5.QtCore import QTime
+
+
+def msecsToQTime(msecs: Optional[int]) -> QTime:
+    if msecs is None:
+        return QTime()
+    return QTime.fromMSecsSinceStartOfDay(int(msecs))
+
+
+def qtimeToMsecs(time: QTime) -> Optional[int]:
+    if time.isNull():
+        return None
+    return time.msecsSinceStartOfDay()
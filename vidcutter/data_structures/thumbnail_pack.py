@@ -0,0 +1,155 @@
+import hashlib
+import logging
+import mmap
+import os
+import struct
+from collections import OrderedDict
+
+from PyQt5.QtCore import QBuffer, QByteArray, QIODevice
+from PyQt5.QtGui import QImage, QPixmap
+
+
+class ThumbnailPack:
+    """
+    Content-addressed store of JPEG thumbnails kept next to data.pickle, so the project itself holds only keys.
+
+    The pack is append-only: a file header followed by records of [sha1 digest][blob length][JPEG blob]. The offset
+    index is rebuilt on open by walking the record headers of the memory-mapped file, pixel data is decoded only when
+    a thumbnail is actually requested.
+    """
+    magic = b'VLTPACK1'
+    recordHeader = struct.Struct('<20sI')
+    imageFormat = 'JPG'
+    imageQuality = 90
+    decodedCacheSize = 512
+
+    def __init__(self, folder: str, filename: str = 'thumbnails.pack'):
+        self.logger = logging.getLogger(__name__)
+        self.filepath = os.path.join(folder, filename)
+        self._index: dict[str, tuple[int, int]] = {}
+        self._decoded: OrderedDict[str, QPixmap] = OrderedDict()
+        self._map = None
+        self._file = open(self.filepath, 'a+b')
+        if os.path.getsize(self.filepath) == 0:
+            self._file.write(self.magic)
+            self._file.flush()
+        self._buildIndex()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def _buildIndex(self) -> None:
+        self._remap()
+        size = len(self._map)
+        if self._map[:len(self.magic)] != self.magic:
+            raise ValueError('{} is not a thumbnail pack file'.format(self.filepath))
+        offset = len(self.magic)
+        while offset + self.recordHeader.size <= size:
+            digest, length = self.recordHeader.unpack_from(self._map, offset)
+            blobOffset = offset + self.recordHeader.size
+            if blobOffset + length > size:
+                break
+            self._index[digest.hex()] = (blobOffset, length)
+            offset = blobOffset + length
+        if offset < size:
+            # torn append, drop it so the next record starts at a header boundary
+            self.logger.warning('Dropping incomplete record at the end of {}'.format(self.filepath))
+            self._map.close()
+            self._map = None
+            self._file.truncate(offset)
+            self._remap()
+
+    def _remap(self) -> None:
+        if self._map is not None:
+            self._map.close()
+        self._file.flush()
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def addBytes(self, blob: bytes) -> str:
+        key = hashlib.sha1(blob).hexdigest()
+        if key in self._index:
+            return key
+        self._file.seek(0, os.SEEK_END)
+        offset = self._file.tell()
+        self._file.write(self.recordHeader.pack(bytes.fromhex(key), len(blob)))
+        self._file.write(blob)
+        self._file.flush()
+        self._index[key] = (offset + self.recordHeader.size, len(blob))
+        return key
+
+    def add(self, image) -> str:
+        """
+        Encode and store a QPixmap or QImage. Returns the key of the thumbnail or an empty key for null images.
+        """
+        if image is None or image.isNull():
+            return ''
+        data = QByteArray()
+        buffer = QBuffer(data)
+        buffer.open(QIODevice.WriteOnly)
+        image.save(buffer, self.imageFormat, self.imageQuality)
+        buffer.close()
+        return self.addBytes(data.data())
+
+    def blob(self, key: str) -> bytes:
+        offset, length = self._index[key]
+        if offset + length > len(self._map):
+            self._remap()
+        return self._map[offset:offset + length]
+
+    def image(self, key: str) -> QImage:
+        if not key or key not in self._index:
+            return QImage()
+        return QImage.fromData(self.blob(key), self.imageFormat)
+
+    def pixmap(self, key: str) -> QPixmap:
+        if not key or key not in self._index:
+            return QPixmap()
+        pixmap = self._decoded.get(key)
+        if pixmap is not None:
+            self._decoded.move_to_end(key)
+            return pixmap
+        pixmap = QPixmap()
+        pixmap.loadFromData(self.blob(key), self.imageFormat)
+        self._decoded[key] = pixmap
+        if len(self._decoded) > self.decodedCacheSize:
+            self._decoded.popitem(last=False)
+        return pixmap
+
+    def migrate(self, videoList) -> bool:
+        """
+        Move pixel data of projects saved before the pack file existed out of the video list and into the pack.
+        Returns True when anything was migrated, the project snapshot should be rewritten then. Every video is marked
+        dirty in that case, so the new snapshot is written from memory without reading pixmaps of the old one back.
+        """
+        migrated = False
+        for video in videoList.videos:
+            migrated |= self._migrateItem(video)
+            for clip in video.clips:
+                migrated |= self._migrateItem(clip)
+        if migrated:
+            for video in videoList.videos:
+                video.markDirty()
+            os.fsync(self._file.fileno())
+        return migrated
+
+    def _migrateItem(self, item) -> bool:
+        if item.legacyThumbnail is None:
+            return False
+        item.thumbnailKey = self.add(item.legacyThumbnail)
+        item.legacyThumbnail = None
+        return True
+
+    def sync(self) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        self._decoded.clear()
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if not self._file.closed:
+            self._file.close()
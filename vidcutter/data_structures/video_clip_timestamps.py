@@ -1,24 +1,34 @@
 from enum import Enum
-from PyQt5.QtCore import QTime
+
+from vidcutter.data_structures.model_state import slotsState, toMsecs
 
 
 class VideoClipTimestamps:
+    __slots__ = ('timestamp_', 'timestamp_type_')
+
     class TimestampType(Enum):
         LEFT = 1
         RIGHT = 2
         DOUBLE_SIDED = 3
 
-    def __init__(self, timestamp: QTime, timestamp_type: TimestampType):
-        self.timestamp_ = timestamp
+    def __init__(self, timestamp: int, timestamp_type: TimestampType):
+        self.timestamp_ = toMsecs(timestamp)
         self.timestamp_type_ = timestamp_type
 
+    def __getstate__(self):
+        return slotsState(self)
+
+    def __setstate__(self, state):
+        self.timestamp_ = toMsecs(state.get('timestamp_'))
+        self.timestamp_type_ = state.get('timestamp_type_')
+
     @property
-    def timestamp(self):
+    def timestamp(self) -> int:
         return self.timestamp_
 
     @timestamp.setter
-    def timestamp(self, timestamp: QTime):
-        self.timestamp_ = timestamp
+    def timestamp(self, timestamp: int):
+        self.timestamp_ = toMsecs(timestamp)
 
     @property
     def timestamp_type(self):
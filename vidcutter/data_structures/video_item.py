@@ -1,23 +1,74 @@
-# from operator import itemgetter
+from operator import attrgetter
+from typing import Optional
 
-from PyQt5.QtGui import QPixmap
-from PyQt5.QtCore import QTime
-from sortedcontainers import SortedList
+from sortedcontainers import SortedKeyList
 
+from vidcutter.data_structures.model_state import slotsState, toMsecs
 from vidcutter.data_structures.video_item_clip import VideoItemClip
-from vidcutter.data_structures.qpixmap_pickle import QPixmapPickle
+
+
+def sortedClips(clips=()) -> SortedKeyList:
+    """
+    Clips list sorted by start time. The key reads the slot directly, so sorting compares plain ints.
+    """
+    return SortedKeyList(clips, key=attrgetter('_timeStart'))
 
 
 class VideoItem:
+    """
+    Video of a dataset, duration is in milliseconds
+    """
+    __slots__ = ('_thumbnailKey', '_duration', '_currentCLipIndex', '_filename', 'description', 'youtubeId', 'issues',
+                 'clips', 'bisect_index', 'legacyThumbnail', '_dirty')
+
     def __init__(self):
-        self._thumbnail = QPixmapPickle()
-        self._duration = QTime()
+        self._thumbnailKey = ''
+        self._duration = 0
         self._currentCLipIndex = 0
         self._filename = ''
         self.description = ''
         self.youtubeId = ''
         self.issues: list[str] = []
-        self.clips: SortedList[VideoItemClip] = SortedList()
+        self.clips: SortedKeyList[VideoItemClip] = sortedClips()
+        self.bisect_index = 0
+        # pixel data of projects saved before the thumbnail pack, see ThumbnailPack.migrate
+        self.legacyThumbnail = None
+        # unsaved changes flag of the video and of its clips, not pickled. Clip edits reported to the project store
+        # mark it (see ProjectJournal._clipsChanged), clips keep flags of their own for stores saving single rows.
+        self._dirty = False
+
+    def __getstate__(self):
+        exclude = ('_dirty',) if self.legacyThumbnail is not None else ('_dirty', 'legacyThumbnail')
+        return slotsState(self, exclude)
+
+    def __setstate__(self, state):
+        self.__init__()
+        self._thumbnailKey = state.get('_thumbnailKey', '')
+        self._duration = toMsecs(state.get('_duration'), 0)
+        self._currentCLipIndex = state.get('_currentCLipIndex', 0)
+        self._filename = state.get('_filename', '')
+        self.description = state.get('description', '')
+        self.youtubeId = state.get('youtubeId', '')
+        self.issues = state.get('issues', [])
+        self.clips = sortedClips(state.get('clips', ()))
+        self.bisect_index = state.get('bisect_index', 0)
+        self.legacyThumbnail = state.get('legacyThumbnail', state.get('_thumbnail', state.get('thumbnail')))
+
+    def copy(self) -> 'VideoItem':
+        """
+        Copy sharing no mutable state with the video, e.g. for a project snapshot serialized while the video is edited
+        """
+        video = VideoItem()
+        video._thumbnailKey, video._duration, video._filename = self._thumbnailKey, self._duration, self._filename
+        video._currentCLipIndex, video.bisect_index = self._currentCLipIndex, self.bisect_index
+        video.description, video.youtubeId, video.issues = self.description, self.youtubeId, list(self.issues)
+        video.legacyThumbnail, video._dirty = self.legacyThumbnail, self._dirty
+        # a ClipTable copies its arrays, see DatasetStatistics for the same duck typing
+        if hasattr(self.clips, 'columns'):
+            video.clips = self.clips.copy()
+        else:
+            video.clips = sortedClips(clip.copy() for clip in self.clips)
+        return video
 
     def __str__(self):
         return_string = f'filename:  {self._filename} \n  description: {self.description} \n youtube id: {self.youtubeId} \n issues classes: {self.issues} \n clips:\n'
@@ -44,6 +95,31 @@ class VideoItem:
     def clipsLength(self):
         return len(self.clips)
 
+    @property
+    def dirty(self) -> bool:
+        return self._dirty
+
+    def markDirty(self) -> None:
+        self._dirty = True
+
+    def clearDirty(self) -> None:
+        self._dirty = False
+        if hasattr(self.clips, 'columns'):
+            self.clips.clearDirty()
+            return
+        for clip in self.clips:
+            clip.dirty = False
+
+    def setClipsVisibility(self, visibility: Optional[int]) -> None:
+        """
+        Set the visibility of all clips, invert it (2 - visibility) when visibility is None
+        """
+        if hasattr(self.clips, 'columns'):
+            self.clips.setVisibility(visibility)
+            return
+        for clip in self.clips:
+            clip.visibility = 2 - clip.visibility if visibility is None else visibility
+
     @property
     def filename(self) -> str:
         return self._filename
@@ -51,14 +127,16 @@ class VideoItem:
     @filename.setter
     def filename(self, filename: str):
         self._filename = filename
+        self._dirty = True
 
     @property
-    def thumbnail(self) -> QPixmap:
-        return self._thumbnail
+    def thumbnailKey(self) -> str:
+        return self._thumbnailKey
 
-    @thumbnail.setter
-    def thumbnail(self, thumb: QPixmap):
-        self._thumbnail = thumb
+    @thumbnailKey.setter
+    def thumbnailKey(self, key: str):
+        self._thumbnailKey = key
+        self._dirty = True
 
     @property
     def currentClipIndex(self) -> int:
@@ -71,9 +149,10 @@ class VideoItem:
         self._currentCLipIndex = index
 
     @property
-    def duration(self):
+    def duration(self) -> int:
         return self._duration
 
     @duration.setter
-    def duration(self, time: QTime):
-        self._duration = time
+    def duration(self, time: int):
+        self._duration = toMsecs(time, 0)
+        self._dirty = True
@@ -1,6 +1,6 @@
-from PyQt5.QtGui import QPixmap
-from PyQt5.QtCore import QTime
-from vidcutter.data_structures.qpixmap_pickle import QPixmapPickle
+from typing import Optional
+
+from vidcutter.data_structures.model_state import slotsState, toMsecs
 from vidcutter.data_structures.video_clip_timestamps import VideoClipTimestamps
 
 
@@ -8,6 +8,8 @@ class BoundingBox:
     """
     Image bounding box in normalized coordinates
     """
+    __slots__ = ('_x', '_y', '_width', '_height', '_confidence')
+
     def __init__(self):
         self._x = 0.0
         self._y = 0.0
@@ -15,8 +17,21 @@ class BoundingBox:
         self._height = 1.0
         self._confidence = 1.0
 
+    def __getstate__(self):
+        return slotsState(self)
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
+    def copy(self) -> 'BoundingBox':
+        boundingBox = BoundingBox.__new__(BoundingBox)
+        boundingBox._x, boundingBox._y, boundingBox._width = self._x, self._y, self._width
+        boundingBox._height, boundingBox._confidence = self._height, self._confidence
+        return boundingBox
+
     @staticmethod
-    def clamp_(self, value, minimum, maximum):
+    def clamp_(value, minimum, maximum):
         if value < minimum:
             return minimum
         elif value > maximum:
@@ -66,16 +81,22 @@ class BoundingBox:
 
 
 class VideoItemClip:
+    """
+    Clip of a video. Times are milliseconds from the start of the video, timeEnd is None while the clip is being cut.
+    """
+    __slots__ = ('_timeStart', '_timeEnd', '_thumbnailKey', '_name', '_visibility', '_description', 'actionClassIndex',
+                 'boundingBox', 'clip_timestamps', 'legacyThumbnail', '_dirty')
+
     def __init__(self, *args):
-        if not len(args):
-            self._timeStart = QTime()
-            self._timeEnd = QTime()
-            self._thumbnail = QPixmapPickle()
-            self._visibility = 2
-        elif len(args) == 5:
-            self._timeStart = args[0]
-            self._timeEnd = args[1]
-            self._thumbnail = args[2]
+        self._timeStart = 0
+        self._timeEnd = None
+        self._thumbnailKey = ''
+        self._name = ''
+        self._visibility = 2
+        if len(args) == 5:
+            self._timeStart = toMsecs(args[0], 0)
+            self._timeEnd = toMsecs(args[1])
+            self._thumbnailKey = args[2]
             self._name = args[3]
             self._visibility = args[4]
 
@@ -83,34 +104,87 @@ class VideoItemClip:
         self.actionClassIndex = -1
         self.boundingBox = BoundingBox()
         self.clip_timestamps: list[VideoClipTimestamps] = []
+        # pixel data of projects saved before the thumbnail pack, see ThumbnailPack.migrate
+        self.legacyThumbnail = None
+        # unsaved changes flag, not pickled; objects loaded from a project are clean
+        self._dirty = False
+
+    def __getstate__(self):
+        exclude = ('_dirty',) if self.legacyThumbnail is not None else ('_dirty', 'legacyThumbnail')
+        return slotsState(self, exclude)
+
+    def __setstate__(self, state):
+        self.__init__()
+        self._timeStart = toMsecs(state.get('_timeStart'), 0)
+        self._timeEnd = toMsecs(state.get('_timeEnd'))
+        self._thumbnailKey = state.get('_thumbnailKey', '')
+        self._name = state.get('_name', '')
+        self._visibility = state.get('_visibility', 2)
+        self._description = state.get('_description', '')
+        self.actionClassIndex = state.get('actionClassIndex', -1)
+        self.boundingBox = state.get('boundingBox', self.boundingBox)
+        self.clip_timestamps = state.get('clip_timestamps', [])
+        self.legacyThumbnail = state.get('legacyThumbnail', state.get('_thumbnail', state.get('thumbnail')))
+
+    def copy(self) -> 'VideoItemClip':
+        """
+        Copy sharing no mutable state with the clip, made field by field as it is taken for every clip of a snapshot
+        """
+        clip = VideoItemClip.__new__(VideoItemClip)
+        clip._timeStart, clip._timeEnd, clip._thumbnailKey = self._timeStart, self._timeEnd, self._thumbnailKey
+        clip._name, clip._visibility, clip._description = self._name, self._visibility, self._description
+        clip.actionClassIndex, clip.boundingBox = self.actionClassIndex, self.boundingBox.copy()
+        clip.clip_timestamps, clip.legacyThumbnail = list(self.clip_timestamps), self.legacyThumbnail
+        clip._dirty = self._dirty
+        return clip
 
     def __str__(self):
         return f'start time, {self._timeStart},  time end:, {self._timeEnd}, visibility:  {self._visibility}, description:  {self._description} \n'
         # return f'name:  {self._name}, start time, {self._timeStart},  time end:, {self._timeEnd}, visibility:  {self._visibility}, description:  {self._description} \n'
 
     def __lt__(self, other):
-        return self.timeStart < other.timeStart
+        return self._timeStart < other._timeStart
 
     def __le__(self, other):
-        return self.timeStart <= other.timeStart
+        return self._timeStart <= other._timeStart
 
     def __gt__(self, other):
-        return self.timeStart > other.timeStart
+        return self._timeStart > other._timeStart
 
     def __ge__(self, other):
-        return self.timeStart >= other.timeStart
+        return self._timeStart >= other._timeStart
 
     @property
-    def timeStart(self) -> QTime:
+    def dirty(self) -> bool:
+        return self._dirty
+
+    @dirty.setter
+    def dirty(self, value: bool):
+        self._dirty = value
+
+    def markDirty(self) -> None:
+        self._dirty = True
+
+    @property
+    def timeStart(self) -> int:
         return self._timeStart
 
     @property
-    def timeEnd(self) -> QTime:
+    def timeEnd(self) -> Optional[int]:
         return self._timeEnd
 
     @property
-    def thumbnail(self) -> QPixmapPickle:
-        return self._thumbnail
+    def timeStartSeconds(self) -> float:
+        return 1e-3 * self._timeStart
+
+    @property
+    def timeEndSeconds(self) -> float:
+        # a clip being cut ends at the start of the video, as a null QTime did
+        return 1e-3 * (self._timeEnd or 0)
+
+    @property
+    def thumbnailKey(self) -> str:
+        return self._thumbnailKey
 
     @property
     def visibility(self) -> int:
@@ -125,29 +199,36 @@ class VideoItemClip:
         return self._description
 
     @timeStart.setter
-    def timeStart(self, time: QTime):
-        self._timeStart = time
+    def timeStart(self, time: int):
+        self._timeStart = toMsecs(time, 0)
+        self._dirty = True
 
     @timeEnd.setter
-    def timeEnd(self, timeEnd: QTime):
-        if not timeEnd.isNull() and timeEnd.__lt__(self._timeStart):
+    def timeEnd(self, timeEnd: Optional[int]):
+        timeEnd = toMsecs(timeEnd)
+        if timeEnd is not None and timeEnd < self._timeStart:
             self._timeEnd = self._timeStart
             self._timeStart = timeEnd
         else:
             self._timeEnd = timeEnd
+        self._dirty = True
 
-    @thumbnail.setter
-    def thumbnail(self, thumb: QPixmap):
-        self._thumbnail = thumb
+    @thumbnailKey.setter
+    def thumbnailKey(self, key: str):
+        self._thumbnailKey = key
+        self._dirty = True
 
     @visibility.setter
     def visibility(self, value: int):
         self._visibility = value
+        self._dirty = True
 
     @name.setter
     def name(self, name: str):
         self._name = name
+        self._dirty = True
 
     @description.setter
     def description(self, description: str):
         self._description = description
+        self._dirty = True
@@ -1,12 +1,13 @@
 import os
-from PyQt5.QtCore import QTime
-from PyQt5.QtGui import QPixmap
 
-from vidcutter.data_structures.qpixmap_pickle import QPixmapPickle
+from vidcutter.data_structures.model_state import slotsState
 from vidcutter.data_structures.video_item import VideoItem
 
 
 class VideoList:
+    __slots__ = ('_description', 'videos', '_currentVideoIndex', '_videoIssuesClasses', 'actionClassesLabels',
+                 'actionClassUnknownLabel', 'journalGeneration')
+
     def __init__(self, video_issues: list[str] = (), actionLabels: list[str] = ()):
         self._description: str = ''
         self.videos: list[VideoItem] = []
@@ -14,6 +15,16 @@ class VideoList:
         self._videoIssuesClasses = video_issues
         self.actionClassesLabels: list[str] = actionLabels
         self.actionClassUnknownLabel = 'Other'
+        self.journalGeneration: int = 0
+
+    def __getstate__(self):
+        return slotsState(self)
+
+    def __setstate__(self, state):
+        self.__init__()
+        for name, value in state.items():
+            if name in VideoList.__slots__:
+                setattr(self, name, value)
 
     def __str__(self):
         print('description:', self._description)
@@ -30,9 +41,17 @@ class VideoList:
     def deleteCurrentVideoClipsThumbs(self):
         clips = self.videos[self._currentVideoIndex].clips
         for clip in clips:
-            clip.thumbnail = QPixmapPickle()
+            clip.thumbnailKey = ''
+        self.videos[self._currentVideoIndex].markDirty()
 
-    def currentVideoClipTimeStart(self, clip_index: int) -> QTime:
+    def dirtyVideosIndexes(self) -> list[int]:
+        return [index for index, video in enumerate(self.videos) if video.dirty]
+
+    def clearDirty(self, indexes: list[int]) -> None:
+        for index in indexes:
+            self.videos[index].clearDirty()
+
+    def currentVideoClipTimeStart(self, clip_index: int) -> int:
         return self.videos[self._currentVideoIndex].clips[clip_index].timeStart
 
     @staticmethod
@@ -70,17 +89,22 @@ class VideoList:
         if len(self.videos):
             self.videos[self._currentVideoIndex].currentClipIndex = index
 
-    def setCurrentVideoClipStartTime(self, time: QTime):
-        currentClipIndex = self.videos[self._currentVideoIndex].currentClipIndex
-        self.videos[self._currentVideoIndex].clips[currentClipIndex].timeStart = time
+    def setCurrentVideoClipStartTime(self, time: int):
+        # clips are sorted by start time, re-add the clip and follow it to its new index
+        video = self.videos[self._currentVideoIndex]
+        clip = video.clips.pop(video.currentClipIndex)
+        clip.timeStart = time
+        video.clips.add(clip)
+        video.currentClipIndex = video.clips.bisect_right(clip) - 1
+        video.markDirty()
 
-    def setCurrentVideoClipEndTime(self, time: QTime):
+    def setCurrentVideoClipEndTime(self, time: int):
         currentClipIndex = self.videos[self._currentVideoIndex].currentClipIndex
         self.videos[self._currentVideoIndex].clips[currentClipIndex].timeEnd = time
 
-    def setCurrentVideoClipThumbnail(self, thumbnail: QPixmap):
+    def setCurrentVideoClipThumbnailKey(self, thumbnailKey: str):
         currentClipIndex = self.videos[self._currentVideoIndex].currentClipIndex
-        self.videos[self._currentVideoIndex].clips[currentClipIndex].thumbnail = thumbnail
+        self.videos[self._currentVideoIndex].clips[currentClipIndex].thumbnailKey = thumbnailKey
 
     def setCurrentVideoClipName(self, name: str):
         currentClipIndex = self.videos[self._currentVideoIndex].currentClipIndex
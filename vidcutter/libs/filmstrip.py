@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#######################################################################
+#
+# VidCutter - media cutter & joiner
+#
+# copyright © 2018 Pete Alexandrou
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#######################################################################
+
+
+
+import hashlib
+import logging
+import math
+import os
+from collections import OrderedDict
+from typing import List, Optional
+
+from PyQt5.QtCore import pyqtSignal, pyqtSlot, QObject, QRunnable, QSettings, QSize, QStandardPaths, QThreadPool
+from PyQt5.QtGui import QColor, QImage, QPainter, QPixmap
+
+from vidcutter.libs.mediacache import fileIdentity, ThumbnailCache
+from vidcutter.libs.videoservice import VideoService
+
+
+class FilmstripJob(QRunnable):
+    def __init__(self, filmstrip: 'Filmstrip', generation: int, tile: tuple, frametimes: List[str]):
+        super(FilmstripJob, self).__init__()
+        self.filmstrip = filmstrip
+        self.generation = generation
+        self.tile = tile
+        self.frametimes = frametimes
+        self.ffmpeg = filmstrip._backends.ffmpeg
+        self.source = filmstrip.source
+        self.sourceKey = filmstrip._sourceKey
+        self.cache = filmstrip._cache
+
+    def run(self) -> None:
+        # tiles scrolled out of view while queued are never decoded
+        if self.generation != self.filmstrip._generation or self.tile not in self.filmstrip._wanted:
+            self.filmstrip._skipped.emit(self.generation, self.tile)
+            return
+        name = Filmstrip.tileName(self.sourceKey, *self.tile)
+        image = self.cache.get(name)
+        if image.isNull():
+            image = self.render()
+            self.cache.put(name, image)
+        self.filmstrip._rendered.emit(self.generation, self.tile, image)
+
+    def render(self) -> QImage:
+        frameSize = QSize(Filmstrip.frameWidth, Filmstrip.laneHeight)
+        frames = VideoService.captureFrameImages(self.ffmpeg, self.source, self.frametimes, frameSize, cached=False)
+        if all(frame.isNull() for frame in frames):
+            # not cached, so a failed decode is not remembered across sessions
+            return QImage()
+        image = QImage(Filmstrip.tileWidth, Filmstrip.laneHeight, QImage.Format_RGB32)
+        image.fill(QColor(Filmstrip.backgroundColor))
+        painter = QPainter(image)
+        for index, frame in enumerate(frames):
+            if not frame.isNull():
+                painter.drawImage(index * Filmstrip.frameWidth, 0, frame)
+        painter.end()
+        return image
+
+
+class Filmstrip(QObject):
+    """
+    Thumbnail filmstrip of the current video, shown as a lane of the timeline.
+
+    The lane of a timeline zoom level is cut into tiles of tileWidth pixels, a tile holds one frame per frameWidth
+    pixels, captured at the time of the middle of its slot. A tile set is kept per zoom factor and lane width, tiles
+    are JPEG files in the filmstrip cache folder, so a video opened again shows its filmstrip at once. The folder is
+    shared by all videos and held under a single size budget, tiles of the least recently shown videos go first.
+
+    Tiles are only decoded when asked for by request, which the timeline calls with the tiles in the visible part of
+    its scroll area; each call replaces the wanted set, queued tiles which are no longer wanted are skipped. Tiles are
+    decoded one at a time in the background, tileReady is emitted on the GUI thread when a tile can be painted.
+    """
+    tileReady = pyqtSignal(int, int)
+    _rendered = pyqtSignal(int, tuple, QImage)
+    _skipped = pyqtSignal(int, tuple)
+
+    tileWidth = 256
+    frameWidth = 64
+    laneHeight = 36
+    backgroundColor = '#101010'
+    maxThreads = 1
+    memoryTiles = 256
+    cacheBudget = 512 << 20
+
+    def __init__(self, settings: QSettings, parent: QObject = None):
+        super(Filmstrip, self).__init__(parent)
+        self.logger = logging.getLogger(__name__)
+        self.settings = settings
+        self.source = None
+        self.duration = 0.0
+        self._backends = None
+        self._cache = ThumbnailCache(os.path.join(QStandardPaths.writableLocation(QStandardPaths.CacheLocation),
+                                                  'filmstrip'), self.cacheBudget)
+        self._sourceKey = None
+        self._generation = 0
+        self._tiles: OrderedDict[tuple, QPixmap] = OrderedDict()
+        self._pending: set[tuple] = set()
+        self._failed: set[tuple] = set()
+        self._wanted: frozenset[tuple] = frozenset()
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(self.maxThreads)
+        self._rendered.connect(self._on_rendered)
+        self._skipped.connect(self._on_skipped)
+
+    @staticmethod
+    def sourceKey(source: str) -> Optional[str]:
+        identity = fileIdentity(source)
+        if identity is None:
+            return None
+        text = '{0}\0{1}\0{2}'.format(*identity)
+        return hashlib.sha1(text.encode('utf-8', 'surrogateescape')).hexdigest()
+
+    @staticmethod
+    def tileName(sourceKey: str, factor: int, width: int, index: int) -> str:
+        return '{0}-{1:02d}-{2:d}-{3:d}x{4:d}-{5:05d}'.format(sourceKey, factor, width, Filmstrip.frameWidth,
+                                                              Filmstrip.laneHeight, index)
+
+    @staticmethod
+    def tilesCount(width: int) -> int:
+        return math.ceil(width / Filmstrip.tileWidth)
+
+    def setSource(self, source: Optional[str], duration: float = 0.0) -> None:
+        """
+        Show the filmstrip of source, of duration seconds, None or a zero duration shows nothing
+        """
+        self.clear()
+        sourceKey = self.sourceKey(source) if source else None
+        if sourceKey is None or duration <= 0:
+            return
+        if self._backends is None:
+            self._backends = VideoService.findBackends(self.settings)
+        self.source = source
+        self.duration = duration
+        self._sourceKey = sourceKey
+
+    def clear(self) -> None:
+        self._generation += 1
+        self.source = None
+        self.duration = 0.0
+        self._sourceKey = None
+        self._tiles.clear()
+        self._pending.clear()
+        self._failed.clear()
+        self._wanted = frozenset()
+        self._pool.clear()
+
+    def tile(self, factor: int, width: int, index: int) -> Optional[QPixmap]:
+        pixmap = self._tiles.get((factor, width, index))
+        if pixmap is not None:
+            self._tiles.move_to_end((factor, width, index))
+        return pixmap
+
+    def request(self, factor: int, width: int, indexes: range) -> None:
+        """
+        Make tiles indexes of the factor zoom level, whose lane is width pixels wide, the wanted ones and queue those
+        not decoded yet
+        """
+        if self.source is None:
+            return
+        wanted = [(factor, width, index) for index in indexes if 0 <= index < self.tilesCount(width)]
+        self._wanted = frozenset(wanted)
+        scale = self.duration / width
+        for tile in wanted:
+            if tile in self._tiles or tile in self._pending or tile in self._failed:
+                continue
+            start = tile[2] * self.tileWidth
+            slots = range(start + self.frameWidth // 2, min(start + self.tileWidth, width), self.frameWidth)
+            frametimes = ['{0:.3f}'.format(position * scale) for position in slots]
+            self._pending.add(tile)
+            self._pool.start(FilmstripJob(self, self._generation, tile, frametimes))
+
+    def close(self) -> None:
+        self.clear()
+        self._pool.waitForDone()
+
+    @pyqtSlot(int, tuple)
+    def _on_skipped(self, generation: int, tile: tuple) -> None:
+        if generation == self._generation:
+            self._pending.discard(tile)
+
+    @pyqtSlot(int, tuple, QImage)
+    def _on_rendered(self, generation: int, tile: tuple, image: QImage) -> None:
+        if generation != self._generation:
+            return
+        self._pending.discard(tile)
+        if image.isNull():
+            self.logger.info('Could not render filmstrip tile {}'.format(tile))
+            self._failed.add(tile)
+            return
+        self._tiles[tile] = QPixmap.fromImage(image)
+        if len(self._tiles) > self.memoryTiles:
+            self._tiles.popitem(last=False)
+        self.tileReady.emit(tile[0], tile[2])
@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#######################################################################
+#
+# VidCutter - media cutter & joiner
+#
+# copyright © 2018 Pete Alexandrou
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#######################################################################
+
+
+import hashlib
+import logging
+import os
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import numpy as np
+from PyQt5.QtCore import QProcess, QProcessEnvironment, QRunnable, QStandardPaths, QThread, QThreadPool
+
+from vidcutter.libs.mediacache import fileIdentity
+
+
+class KeyframeIndexJob(QRunnable):
+    def __init__(self, index: 'KeyframeIndex', ffprobe: str, source: str, duration: float):
+        super(KeyframeIndexJob, self).__init__()
+        self.index = index
+        self.ffprobe = ffprobe
+        self.source = source
+        self.duration = duration
+
+    def run(self) -> None:
+        self.index.times(self.ffprobe, self.source, self.duration)
+
+
+class KeyframeSegmentJob(QRunnable):
+    def __init__(self, index: 'KeyframeIndex', scan: 'KeyframeScan', segment: int, ffprobe: str, source: str):
+        super(KeyframeSegmentJob, self).__init__()
+        self.index = index
+        self.scan = scan
+        self.segment = segment
+        self.ffprobe = ffprobe
+        self.source = source
+
+    def run(self) -> None:
+        if self.scan.failed:
+            return
+        start, end = self.scan.ranges[self.segment]
+        interval = '{0:.3f}%{1}'.format(start, '' if end is None else '{:.3f}'.format(end))
+        self.scan.add(self.segment, self.index.listKeyframes(self.ffprobe, self.source, interval))
+
+
+class KeyframeScan:
+    """
+    Progress of a keyframe listing split in time ranges, listed concurrently and done in any order. A range end of
+    None is the end of the file.
+    """
+    def __init__(self, ranges: List[Tuple[float, Optional[float]]]):
+        self.ranges = ranges
+        self.results: List[Optional[np.ndarray]] = [None] * len(ranges)
+        self.failed = False
+        self._condition = threading.Condition()
+
+    def add(self, segment: int, keyframes: Optional[np.ndarray]) -> None:
+        with self._condition:
+            if keyframes is None:
+                self.failed = True
+            else:
+                self.results[segment] = keyframes
+            self._condition.notify_all()
+
+    def wait(self, segments: range = None) -> Optional[np.ndarray]:
+        """
+        Merged keyframes of segments, all of them by default, once they are listed. None when a range failed.
+        """
+        segments = range(len(self.ranges)) if segments is None else segments
+        with self._condition:
+            self._condition.wait_for(lambda: self.failed or all(self.results[segment] is not None
+                                                                for segment in segments))
+            if self.failed:
+                return None
+            keyframes = [self.results[segment] for segment in segments]
+        # ranges are read from the keyframe before their start, keyframes at the boundaries are listed twice
+        return np.unique(np.round(np.concatenate(keyframes), 6))
+
+    def around(self, start: float, end: float) -> Optional[np.ndarray]:
+        """
+        Keyframes near start and end, waiting only for the ranges holding them and their neighbours. Keyframes far
+        from both may be missing.
+        """
+        starts = [rangeStart for rangeStart, _ in self.ranges]
+        first = max(bisect_right(starts, start) - 2, 0)
+        last = min(bisect_right(starts, end) + 1, len(self.ranges))
+        if last - first > 6:
+            segments = sorted({*range(first, first + 3), *range(last - 3, last)})
+        else:
+            segments = range(first, last)
+        return self.wait(segments)
+
+
+class KeyframeIndex:
+    """
+    Persistent index of the keyframe times of media files, in the user cache directory.
+
+    The sorted keyframe times of the first video stream, in seconds, are stored as one float64 NumPy .npy file per
+    media file, named by the hash of its identity, so an index goes stale when the file is replaced or edited. Indexes
+    are memory-mapped when loaded and the most recently used ones stay mapped. A file is listed by ffprobe at most
+    once at a time, a caller asking for an index being built waits for it. The directory is held under a size budget,
+    least recently used indexes are removed first. Safe to use from several threads.
+    """
+    defaultBudget = 64 << 20
+    memoryItems = 16
+    segmentMinimum = 300
+    maxSegments = max(1, QThread.idealThreadCount())
+
+    def __init__(self, folder: str = None, budget: int = defaultBudget):
+        self.logger = logging.getLogger(__name__)
+        if folder is None:
+            folder = os.path.join(QStandardPaths.writableLocation(QStandardPaths.CacheLocation), 'keyframes')
+        self.folder = folder
+        self.budget = budget
+        self._lock = threading.Lock()
+        self._building: dict[str, threading.Lock] = {}
+        self._memory: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._procs = set()
+        self._closed = False
+        self._scans: dict[str, KeyframeScan] = {}
+        self._pool = QThreadPool()
+        self._pool.setMaxThreadCount(1)
+        self._segmentsPool = QThreadPool()
+        self._segmentsPool.setMaxThreadCount(self.maxSegments)
+
+    @staticmethod
+    def key(source: str) -> Optional[str]:
+        identity = fileIdentity(source)
+        if identity is None:
+            return None
+        text = '{0}\0{1}\0{2}'.format(*identity)
+        return hashlib.sha1(text.encode('utf-8', 'surrogateescape')).hexdigest()
+
+    def get(self, source: str) -> Optional[np.ndarray]:
+        """
+        Keyframe times of source, None when they are not indexed yet
+        """
+        key = self.key(source)
+        return None if key is None else self._load(key)
+
+    def times(self, ffprobe: str, source: str, duration: float = 0.0) -> np.ndarray:
+        """
+        Keyframe times of source, listed by ffprobe when they are not indexed yet. Empty when listing failed.
+
+        When the duration of source in seconds is given and covers at least two segmentMinimum ranges, the listing
+        is split in up to maxSegments ranges of equal length, one ffprobe process each.
+        """
+        key = self.key(source)
+        if key is None:
+            return np.empty(0)
+        keyframes = self._load(key)
+        if keyframes is not None:
+            return keyframes
+        with self._lock:
+            building = self._building.setdefault(key, threading.Lock())
+        with building:
+            keyframes = self._load(key)
+            if keyframes is None:
+                scan = self._scan(key, duration)
+                if scan is not None:
+                    keyframes = self._listSegments(ffprobe, source, scan)
+                if keyframes is None:
+                    keyframes = self.listKeyframes(ffprobe, source)
+                if keyframes is None:
+                    keyframes = np.empty(0)
+                else:
+                    self._save(key, keyframes)
+            with self._lock:
+                self._building.pop(key, None)
+                scan = self._scans.pop(key, None)
+            if scan is not None:
+                # wakes callers of around still waiting, they read the index
+                scan.add(0, None)
+        return keyframes
+
+    def around(self, source: str, start: float, end: float) -> Optional[np.ndarray]:
+        """
+        Keyframe times of source near start and end seconds, before the whole file is listed when it is being listed
+        in ranges. None when source is neither indexed nor being listed in ranges.
+        """
+        key = self.key(source)
+        if key is None:
+            return None
+        keyframes = self._load(key)
+        if keyframes is not None:
+            return keyframes
+        with self._lock:
+            scan = self._scans.get(key)
+        return None if scan is None else scan.around(start, end)
+
+    def prefetch(self, ffprobe: str, source: str, duration: float = 0.0) -> None:
+        """
+        Index source in the background unless it is indexed already
+        """
+        key = self.key(source)
+        if key is not None and self._load(key) is None:
+            # registered right away, so around waits for the ranges instead of listing the whole file
+            self._scan(key, duration)
+            self._pool.start(KeyframeIndexJob(self, ffprobe, source, duration))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            for filepath, _, _ in self._entries():
+                self._remove(filepath)
+
+    def close(self) -> None:
+        """
+        Drop queued indexing and stop ffprobe processes still listing keyframes
+        """
+        self._pool.clear()
+        self._segmentsPool.clear()
+        with self._lock:
+            self._closed = True
+            for scan in self._scans.values():
+                scan.add(0, None)
+            for proc in self._procs:
+                proc.kill()
+        self._pool.waitForDone()
+        self._segmentsPool.waitForDone()
+
+    def listKeyframes(self, ffprobe: str, source: str, interval: str = None) -> Optional[np.ndarray]:
+        """
+        Sorted keyframe times of the first video stream listed by ffprobe, None when ffprobe failed or the index is
+        closing. Packets without a presentation time fall back to their decoding time. interval is a -read_intervals
+        range of ffprobe, the whole file when omitted.
+        """
+        proc = QProcess()
+        proc.setProcessEnvironment(QProcessEnvironment.systemEnvironment())
+        proc.setProcessChannelMode(QProcess.SeparateChannels)
+        with self._lock:
+            if self._closed:
+                return None
+            self._procs.add(proc)
+        proc.start(ffprobe, ['-v', 'error', '-select_streams', 'v:0', *(['-read_intervals', interval] if interval else []),
+                             '-show_entries', 'packet=pts_time,dts_time,flags', '-of', 'csv=print_section=0', source])
+        proc.waitForFinished(-1)
+        with self._lock:
+            self._procs.discard(proc)
+        if proc.exitStatus() != QProcess.NormalExit or proc.exitCode() != 0:
+            logging.getLogger(__name__).error('ffprobe could not list keyframes of {0}: {1}'.format(
+                source, proc.readAllStandardError().data().decode(errors='replace').strip()))
+            return None
+        keyframes = []
+        for line in proc.readAllStandardOutput().data().split(b'\n'):
+            fields = line.split(b',')
+            if len(fields) < 3 or not fields[2].startswith(b'K'):
+                continue
+            timecode = fields[0] if fields[0] != b'N/A' else fields[1]
+            if timecode != b'N/A':
+                keyframes.append(float(timecode))
+        return np.sort(np.array(keyframes, dtype=np.float64))
+
+    def _scan(self, key: str, duration: float) -> Optional[KeyframeScan]:
+        """
+        Ranges listing of key, registered for around, None when duration is too short to be split
+        """
+        segments = min(self.maxSegments, int(duration // self.segmentMinimum))
+        bounds = np.linspace(0.0, duration, segments + 1).tolist()
+        with self._lock:
+            if key not in self._scans and segments > 1:
+                self._scans[key] = KeyframeScan([(start, end) for start, end in zip(bounds[:-1], bounds[1:-1] + [None])])
+            return self._scans.get(key)
+
+    def _listSegments(self, ffprobe: str, source: str, scan: KeyframeScan) -> Optional[np.ndarray]:
+        for segment in range(len(scan.ranges)):
+            self._segmentsPool.start(KeyframeSegmentJob(self, scan, segment, ffprobe, source))
+        keyframes = scan.wait()
+        if keyframes is None:
+            self.logger.warning('Listing keyframes of {} in ranges failed, listing the whole file'.format(source))
+        return keyframes
+
+    def _filepath(self, key: str) -> str:
+        return os.path.join(self.folder, key + '.npy')
+
+    def _load(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            keyframes = self._memory.get(key)
+            if keyframes is not None:
+                self._memory.move_to_end(key)
+                return keyframes
+        filepath = self._filepath(key)
+        try:
+            keyframes = np.load(filepath, mmap_mode='r')
+            os.utime(filepath)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            self.logger.exception('Could not load keyframe index {}'.format(filepath))
+            return None
+        with self._lock:
+            self._remember(key, keyframes)
+        return keyframes
+
+    def _save(self, key: str, keyframes: np.ndarray) -> None:
+        filepath = self._filepath(key)
+        try:
+            os.makedirs(self.folder, exist_ok=True)
+            temporaryPath = '{0}.{1}.tmp'.format(filepath, threading.get_ident())
+            with open(temporaryPath, 'wb') as f:
+                np.save(f, keyframes)
+            os.replace(temporaryPath, filepath)
+        except OSError:
+            self.logger.exception('Could not write keyframe index {}'.format(filepath))
+            return
+        with self._lock:
+            self._remember(key, keyframes)
+            self._evict(filepath)
+
+    def _remember(self, key: str, keyframes: np.ndarray) -> None:
+        self._memory[key] = keyframes
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.memoryItems:
+            self._memory.popitem(last=False)
+
+    def _entries(self) -> list:
+        entries = []
+        try:
+            with os.scandir(self.folder) as iterator:
+                for entry in iterator:
+                    if entry.name.endswith('.npy') and entry.is_file():
+                        stat = entry.stat()
+                        entries.append((entry.path, stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            pass
+        return entries
+
+    def _remove(self, filepath: str) -> None:
+        try:
+            os.remove(filepath)
+        except OSError:
+            # still mapped by another instance on Windows
+            pass
+
+    def _evict(self, keep: str) -> None:
+        entries = self._entries()
+        totalSize = sum(size for _, _, size in entries)
+        for filepath, _, size in sorted(entries, key=lambda entry: entry[1]):
+            if totalSize <= self.budget:
+                break
+            if filepath != keep:
+                self._remove(filepath)
+                totalSize -= size
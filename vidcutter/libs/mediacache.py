@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#######################################################################
+#
+# VidCutter - media cutter & joiner
+#
+# copyright © 2018 Pete Alexandrou
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#######################################################################
+
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from PyQt5.QtCore import QByteArray, QBuffer, QIODevice, QSize, QStandardPaths
+from PyQt5.QtGui import QImage
+
+
+def fileIdentity(filepath: str) -> Optional[tuple[str, int, int]]:
+    """
+    (real path, size, modification time in ns) of a file, None when it does not exist. Cached results derived from
+    a media file are keyed on it, so they go stale when the file is replaced or edited.
+    """
+    try:
+        realpath = os.path.realpath(filepath)
+        stat = os.stat(realpath)
+    except (OSError, ValueError):
+        return None
+    return realpath, stat.st_size, stat.st_mtime_ns
+
+
+class ThumbnailCache:
+    """
+    Persistent cache of captured video frames in the user cache directory.
+
+    Entries are JPEG files named by the hash of (source identity, frame time, thumbnail size). The most recently used
+    images are also kept decoded in memory. The directory is held under a size budget, least recently used entries
+    are evicted first; a hit touches the file, so recency survives restarts. Safe to use from several threads.
+    """
+    imageFormat = 'JPG'
+    imageQuality = 90
+    defaultBudget = 256 << 20
+    memoryItems = 256
+
+    def __init__(self, folder: str = None, budget: int = defaultBudget):
+        self.logger = logging.getLogger(__name__)
+        if folder is None:
+            folder = os.path.join(QStandardPaths.writableLocation(QStandardPaths.CacheLocation), 'thumbnails')
+        self.folder = folder
+        self.budget = budget
+        self._lock = threading.Lock()
+        self._memory: OrderedDict[str, QImage] = OrderedDict()
+        self._entries: Optional[OrderedDict[str, int]] = None
+        self._totalSize = 0
+
+    @staticmethod
+    def key(source: str, frametime: str, thumbsize: QSize) -> Optional[str]:
+        identity = fileIdentity(source)
+        if identity is None:
+            return None
+        text = '{0}\0{1}\0{2}\0{3}\0{4}x{5}'.format(*identity, frametime, thumbsize.width(), thumbsize.height())
+        return hashlib.sha1(text.encode('utf-8', 'surrogateescape')).hexdigest()
+
+    def get(self, key: Optional[str]) -> QImage:
+        """
+        Cached image or a null QImage on a miss
+        """
+        if key is None:
+            return QImage()
+        with self._lock:
+            image = self._memory.get(key)
+            if image is not None:
+                self._memory.move_to_end(key)
+                return image
+            self._loadEntries()
+            if key not in self._entries:
+                return QImage()
+            self._entries.move_to_end(key)
+        filepath = self._filepath(key)
+        image = QImage(filepath, self.imageFormat)
+        if image.isNull():
+            with self._lock:
+                self._forget(key)
+            return image
+        try:
+            os.utime(filepath)
+        except OSError:
+            pass
+        with self._lock:
+            self._remember(key, image)
+        return image
+
+    def put(self, key: Optional[str], image: QImage) -> None:
+        if key is None or image.isNull():
+            return
+        data = QByteArray()
+        buffer = QBuffer(data)
+        buffer.open(QIODevice.WriteOnly)
+        image.save(buffer, self.imageFormat, self.imageQuality)
+        buffer.close()
+        filepath = self._filepath(key)
+        try:
+            os.makedirs(self.folder, exist_ok=True)
+            temporaryPath = '{0}.{1}.tmp'.format(filepath, threading.get_ident())
+            with open(temporaryPath, 'wb') as f:
+                f.write(data.data())
+            os.replace(temporaryPath, filepath)
+        except OSError:
+            self.logger.exception('Could not write thumbnail cache entry {}'.format(filepath))
+            return
+        with self._lock:
+            self._remember(key, image)
+            self._loadEntries()
+            self._forget(key)
+            self._entries[key] = data.size()
+            self._totalSize += data.size()
+            self._evict()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._loadEntries()
+            for key in list(self._entries):
+                self._remove(key)
+            self._memory.clear()
+
+    def _filepath(self, key: str) -> str:
+        return os.path.join(self.folder, key + '.jpg')
+
+    def _loadEntries(self) -> None:
+        if self._entries is not None:
+            return
+        entries = []
+        try:
+            with os.scandir(self.folder) as iterator:
+                for entry in iterator:
+                    if entry.name.endswith('.jpg') and entry.is_file():
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime_ns, entry.name[:-4], stat.st_size))
+        except FileNotFoundError:
+            pass
+        self._entries = OrderedDict((key, size) for _, key, size in sorted(entries))
+        self._totalSize = sum(self._entries.values())
+        self._evict()
+
+    def _remember(self, key: str, image: QImage) -> None:
+        self._memory[key] = image
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.memoryItems:
+            self._memory.popitem(last=False)
+
+    def _forget(self, key: str) -> None:
+        size = self._entries.pop(key, None)
+        if size is not None:
+            self._totalSize -= size
+
+    def _remove(self, key: str) -> None:
+        self._forget(key)
+        self._memory.pop(key, None)
+        try:
+            os.remove(self._filepath(key))
+        except FileNotFoundError:
+            pass
+        except OSError:
+            self.logger.exception('Could not remove thumbnail cache entry {}'.format(key))
+
+    def _evict(self) -> None:
+        while self._totalSize > self.budget and self._entries:
+            self._remove(next(iter(self._entries)))
+
+
+class MetadataCache:
+    """
+    Persistent cache of what the media tools print about a file, e.g. the JSON of ffprobe, in an SQLite database in
+    the user cache directory.
+
+    Entries are keyed by kind and real path, and hold the size and modification time of the file they were made
+    from; an entry of a file which has changed since is a miss and is replaced by the next put. Safe to use from
+    several threads, several application instances share the database.
+    """
+    defaultFilename = 'metadata.sqlite'
+    schema = """
+        CREATE TABLE IF NOT EXISTS metadata (
+            kind TEXT NOT NULL,
+            path TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            mtime INTEGER NOT NULL,
+            value TEXT NOT NULL,
+            PRIMARY KEY (kind, path)
+        );
+    """
+
+    def __init__(self, filepath: str = None):
+        self.logger = logging.getLogger(__name__)
+        if filepath is None:
+            filepath = os.path.join(QStandardPaths.writableLocation(QStandardPaths.CacheLocation), self.defaultFilename)
+        self.filepath = filepath
+        self._lock = threading.Lock()
+        self._connection = None
+
+    def get(self, kind: str, source: str) -> Optional[str]:
+        identity = fileIdentity(source)
+        if identity is None:
+            return None
+        realpath, size, mtime = identity
+        try:
+            with self._lock:
+                row = self._connect().execute('SELECT size, mtime, value FROM metadata WHERE kind = ? AND path = ?',
+                                              (kind, realpath)).fetchone()
+        except sqlite3.Error:
+            self.logger.exception('Could not read media metadata cache {}'.format(self.filepath))
+            return None
+        if row is None or row[0] != size or row[1] != mtime:
+            return None
+        return row[2]
+
+    def put(self, kind: str, source: str, value: str) -> None:
+        identity = fileIdentity(source)
+        if identity is None:
+            return
+        try:
+            with self._lock:
+                connection = self._connect()
+                with connection:
+                    connection.execute('INSERT OR REPLACE INTO metadata (kind, path, size, mtime, value) '
+                                       'VALUES (?, ?, ?, ?, ?)', (kind, *identity, value))
+        except sqlite3.Error:
+            self.logger.exception('Could not write media metadata cache {}'.format(self.filepath))
+
+    def clear(self) -> None:
+        try:
+            with self._lock:
+                connection = self._connect()
+                with connection:
+                    connection.execute('DELETE FROM metadata')
+        except sqlite3.Error:
+            self.logger.exception('Could not clear media metadata cache {}'.format(self.filepath))
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            os.makedirs(os.path.dirname(self.filepath), exist_ok=True)
+            connection = sqlite3.connect(self.filepath, timeout=5, check_same_thread=False)
+            connection.executescript(self.schema)
+            self._connection = connection
+        return self._connection
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#######################################################################
+#
+# VidCutter - media cutter & joiner
+#
+# copyright © 2018 Pete Alexandrou
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#######################################################################
+
+
+
+import logging
+import os
+from statistics import median
+from typing import Optional
+
+from PyQt5.QtCore import (pyqtSignal, pyqtSlot, QFileSystemWatcher, QObject, QProcess, QRunnable, QSettings, QThread,
+                          QThreadPool, QTimer)
+
+from vidcutter.libs.mediacache import fileIdentity
+from vidcutter.libs.videoservice import VideoService
+
+try:
+    # noinspection PyPackageRequirements
+    from simplejson import dumps, loads, JSONDecodeError
+except ImportError:
+    from json import dumps, loads, JSONDecodeError
+
+
+class MediaRecord:
+    """
+    What the media index knows about a video file. duration is in milliseconds, keyframeInterval in seconds; values
+    ffprobe does not report are None.
+    """
+    __slots__ = ('size', 'mtime', 'duration', 'fps', 'width', 'height', 'videoCodec', 'audioCodec', 'bitrate',
+                 'keyframeInterval')
+
+    def __init__(self, size: int = 0, mtime: int = 0):
+        self.size = size
+        self.mtime = mtime
+        self.duration: Optional[int] = None
+        self.fps: Optional[float] = None
+        self.width: Optional[int] = None
+        self.height: Optional[int] = None
+        self.videoCodec: Optional[str] = None
+        self.audioCodec: Optional[str] = None
+        self.bitrate: Optional[int] = None
+        self.keyframeInterval: Optional[float] = None
+
+    @classmethod
+    def fromProbe(cls, data: dict, size: int, mtime: int) -> 'MediaRecord':
+        record = cls(size, mtime)
+        streams = data.get('streams', [])
+        video = next((stream for stream in streams if stream.get('codec_type') == 'video'), {})
+        audio = next((stream for stream in streams if stream.get('codec_type') == 'audio'), {})
+        mediaFormat = data.get('format', {})
+        record.duration = cls._number(mediaFormat.get('duration'), lambda value: round(float(value) * 1000))
+        record.fps = cls._rate(video.get('avg_frame_rate')) or cls._rate(video.get('r_frame_rate'))
+        record.width = cls._number(video.get('width'), int)
+        record.height = cls._number(video.get('height'), int)
+        record.videoCodec = video.get('codec_name')
+        record.audioCodec = audio.get('codec_name')
+        record.bitrate = cls._number(mediaFormat.get('bit_rate'), int)
+        keyframes = [float(packet['pts_time']) for packet in data.get('packets', [])
+                     if packet.get('stream_index') == video.get('index') and 'K' in packet.get('flags', '')
+                     and cls._number(packet.get('pts_time'), float) is not None]
+        keyframes.sort()
+        if len(keyframes) > 1:
+            record.keyframeInterval = median(end - start for start, end in zip(keyframes, keyframes[1:]))
+        return record
+
+    @classmethod
+    def fromDict(cls, state: dict) -> 'MediaRecord':
+        record = cls()
+        for name in cls.__slots__:
+            setattr(record, name, state.get(name))
+        return record
+
+    def toDict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @property
+    def resolution(self) -> str:
+        return '{0}x{1}'.format(self.width, self.height) if self.width and self.height else ''
+
+    @staticmethod
+    def _number(value, convert):
+        try:
+            return convert(value) if value is not None else None
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _rate(value: Optional[str]) -> Optional[float]:
+        try:
+            numerator, denominator = (float(part) for part in value.split('/'))
+            return numerator / denominator if numerator and denominator else None
+        except (AttributeError, ValueError):
+            return None
+
+
+class MediaIndexJob(QRunnable):
+    def __init__(self, index: 'MediaIndex', generation: int, ffprobe: str, filepath: str, filename: str):
+        super(MediaIndexJob, self).__init__()
+        self.index = index
+        self.generation = generation
+        self.ffprobe = ffprobe
+        self.filepath = filepath
+        self.filename = filename
+
+    def run(self) -> None:
+        if self.generation != self.index._generation:
+            return
+        identity = fileIdentity(self.filepath)
+        if identity is None:
+            self.index._indexed.emit(self.generation, self.filename, None)
+            return
+        _, size, mtime = identity
+        cache = VideoService.metadataStore()
+        cached = cache.get(MediaIndex.cacheKind, self.filepath)
+        if cached is not None:
+            try:
+                self.index._indexed.emit(self.generation, self.filename, MediaRecord.fromDict(loads(cached)))
+                return
+            except (JSONDecodeError, AttributeError):
+                pass
+        data = self.probe()
+        record = MediaRecord.fromProbe(data, size, mtime) if data is not None else None
+        if record is not None:
+            cache.put(MediaIndex.cacheKind, self.filepath, dumps(record.toDict(), separators=(',', ':')))
+        self.index._indexed.emit(self.generation, self.filename, record)
+
+    def probe(self) -> Optional[dict]:
+        proc = VideoService.initProc()
+        proc.setProcessChannelMode(QProcess.SeparateChannels)
+        proc.start(self.ffprobe, ['-hide_banner', '-v', 'error', '-read_intervals', '%+#{}'.format(MediaIndex.keyframePackets),
+                                  '-show_entries', 'packet=stream_index,pts_time,flags', '-show_streams', '-show_format',
+                                  '-of', 'json', self.filepath])
+        proc.waitForFinished(-1)
+        if proc.exitStatus() != QProcess.NormalExit or proc.exitCode() != 0:
+            logging.getLogger(__name__).error('ffprobe could not index {0}: {1}'.format(
+                self.filepath, proc.readAllStandardError().data().decode(errors='replace').strip()))
+            return None
+        try:
+            return loads(proc.readAllStandardOutput().data().decode(errors='replace'))
+        except JSONDecodeError:
+            logging.getLogger(__name__).exception('ffprobe JSON decoding error for {}'.format(self.filepath))
+            return None
+
+
+class MediaIndex(QObject):
+    """
+    Media metadata of every video of the dataset folder, built in the background when a folder is opened.
+
+    Files are probed in parallel on a thread pool of at most maxProcesses threads, each waiting for its own ffprobe,
+    so at most maxProcesses ffprobe processes run at once. The keyframe interval is the median distance of the
+    keyframes among the first keyframePackets packets. Records are persisted in the media metadata cache, keyed on
+    the size and modification time of the file; files added, replaced or removed in the folder are indexed again.
+
+    recordChanged is emitted on the GUI thread with the filename whenever a record is added, updated or removed.
+    """
+    recordChanged = pyqtSignal(str)
+    progress = pyqtSignal(int, int)
+    _indexed = pyqtSignal(int, str, object)
+
+    cacheKind = 'mediaindex'
+    keyframePackets = 600
+    maxProcesses = max(1, min(4, QThread.idealThreadCount()))
+    rescanDelay = 1000
+
+    def __init__(self, settings: QSettings, parent: QObject = None):
+        super(MediaIndex, self).__init__(parent)
+        self.settings = settings
+        self.folder = None
+        self.filenames: list[str] = []
+        self.records: dict[str, MediaRecord] = {}
+        self._backends = None
+        self._generation = 0
+        self._pending: set[str] = set()
+        self._done = 0
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(self.maxProcesses)
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.directoryChanged.connect(self._on_directoryChanged)
+        self._rescanTimer = QTimer(self)
+        self._rescanTimer.setSingleShot(True)
+        self._rescanTimer.setInterval(self.rescanDelay)
+        self._rescanTimer.timeout.connect(self.rescan)
+        self._indexed.connect(self._on_indexed)
+
+    def open(self, folder: str, filenames: list[str]) -> None:
+        self.clear()
+        self.folder = folder
+        self.filenames = list(filenames)
+        if self._backends is None:
+            self._backends = VideoService.findBackends(self.settings)
+        if os.path.isdir(folder):
+            self._watcher.addPath(folder)
+        for filename in self.filenames:
+            self._index(filename)
+
+    def record(self, filename: str) -> Optional[MediaRecord]:
+        return self.records.get(filename)
+
+    def refresh(self, filename: str) -> None:
+        """
+        Index filename again if it has changed since it was indexed, changes of a file's contents do not touch its
+        folder so they are only noticed here
+        """
+        if self.folder is None or filename in self._pending:
+            return
+        record = self.records.get(filename)
+        identity = fileIdentity(os.path.join(self.folder, filename))
+        if identity is None:
+            if self.records.pop(filename, None) is not None:
+                self.recordChanged.emit(filename)
+        elif record is None or (record.size, record.mtime) != identity[1:]:
+            self._index(filename)
+
+    @pyqtSlot()
+    def rescan(self) -> None:
+        for filename in self.filenames:
+            self.refresh(filename)
+
+    def clear(self) -> None:
+        self._generation += 1
+        self._pool.clear()
+        self._rescanTimer.stop()
+        if len(self._watcher.directories()):
+            self._watcher.removePaths(self._watcher.directories())
+        self.folder = None
+        self.filenames = []
+        self.records.clear()
+        self._pending.clear()
+        self._done = 0
+
+    def close(self) -> None:
+        self.clear()
+        self._pool.waitForDone()
+
+    def _index(self, filename: str) -> None:
+        self._pending.add(filename)
+        self._pool.start(MediaIndexJob(self, self._generation, self._backends.ffprobe,
+                                       os.path.join(self.folder, filename), filename))
+
+    @pyqtSlot(str)
+    def _on_directoryChanged(self, path: str) -> None:
+        self._rescanTimer.start()
+
+    @pyqtSlot(int, str, object)
+    def _on_indexed(self, generation: int, filename: str, record: Optional[MediaRecord]) -> None:
+        if generation != self._generation:
+            return
+        self._pending.discard(filename)
+        self._done += 1
+        if record is None:
+            self.records.pop(filename, None)
+        else:
+            self.records[filename] = record
+        self.recordChanged.emit(filename)
+        self.progress.emit(self._done, self._done + len(self._pending))
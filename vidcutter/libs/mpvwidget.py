@@ -56,8 +56,8 @@ else:
     from OpenGL.platform import PLATFORM
     from ctypes import c_char_p, c_void_p
 
-from PyQt5.QtCore import pyqtSignal, pyqtSlot, Qt, QEvent, QTimer
-from PyQt5.QtGui import QKeyEvent, QMouseEvent, QWheelEvent
+from PyQt5.QtCore import pyqtSignal, pyqtSlot, Qt, QEvent, QSize, QTimer
+from PyQt5.QtGui import QImage, QKeyEvent, QMouseEvent, QWheelEvent
 from PyQt5.QtWidgets import QOpenGLWidget
 
 import vidcutter.libs.mpv as mpv
@@ -265,6 +265,25 @@ class mpvWidget(QOpenGLWidget):
                 val = 'yes' if val else 'no'
             return self.mpv.set_property(prop, val)
 
+    def grabFrame(self, size: QSize=None) -> QImage:
+        """
+        Copy of the video frame mpv currently shows, without OSD and scaled to size like ffmpeg -s does. The frame is
+        already decoded, so this costs a memory copy instead of a seek and decode from disk. Returns a null QImage
+        when mpv has no frame or the mpv module is built without byte array support.
+        """
+        try:
+            frame = self.mpv.command('screenshot-raw', 'video')
+        except mpv.MPVError:
+            self.logger.info('screenshot-raw failed', exc_info=True)
+            return QImage()
+        if not isinstance(frame, dict) or not isinstance(frame.get('data'), bytes) or frame.get('format') != 'bgr0':
+            return QImage()
+        # bgr0 is B, G, R, padding in memory, i.e. 0xffRRGGBB words on little endian machines
+        image = QImage(frame['data'], frame['w'], frame['h'], frame['stride'], QImage.Format_RGB32)
+        if size is not None:
+            return image.scaled(size, Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+        return image.copy()
+
     def changeEvent(self, event: QEvent) -> None:
         if event.type() == QEvent.WindowStateChange and self.isFullScreen():
             self.option('osd-align-x', 'center')
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#######################################################################
+#
+# VidCutter - media cutter & joiner
+#
+# copyright © 2018 Pete Alexandrou
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#######################################################################
+
+
+
+import logging
+import threading
+import time
+from concurrent.futures import CancelledError, Future
+from typing import Callable, List, Optional
+
+from PyQt5.QtCore import pyqtSignal, QObject, QProcess, QProcessEnvironment, QRunnable, QThreadPool
+
+
+class ProcessResult:
+    """
+    Outcome of a ProcessJob. error is the QProcess.ProcessError of a process which failed to start, crashed or was
+    killed, None otherwise.
+    """
+    __slots__ = ('exitCode', 'normalExit', 'output', 'errorOutput', 'error', 'errorString', 'timedOut', 'cancelled')
+
+    def __init__(self):
+        self.exitCode = -1
+        self.normalExit = False
+        self.output = b''
+        self.errorOutput = b''
+        self.error: Optional[QProcess.ProcessError] = None
+        self.errorString = ''
+        self.timedOut = False
+        self.cancelled = False
+
+    @property
+    def ok(self) -> bool:
+        return self.normalExit and self.exitCode == 0 and not self.timedOut and not self.cancelled
+
+    def text(self) -> str:
+        return self.output.decode(errors='replace').strip()
+
+
+class ProcessJob(QRunnable):
+    """
+    One external command run by ProcessRunner on a thread of its pool, in a process of its own.
+
+    Output is read while the process runs and passed, decoded, to the onStdout and onStderr callbacks as it arrives;
+    callbacks are called on the pool thread. The process is killed on cancel and when it runs longer than timeout
+    seconds. The result is set on future once the process has ended, then ProcessRunner.jobFinished is emitted.
+    """
+    pollInterval = 50
+
+    def __init__(self, runner: 'ProcessRunner', program: str, arguments: List[str], workdir: str = None,
+                 timeout: float = None, mergeChannels: bool = False, onStdout: Callable[[str], None] = None,
+                 onStderr: Callable[[str], None] = None):
+        super(ProcessJob, self).__init__()
+        self.setAutoDelete(False)
+        self.runner = runner
+        self.program = program
+        self.arguments = arguments
+        self.workdir = workdir
+        self.timeout = timeout
+        self.mergeChannels = mergeChannels
+        self.onStdout = onStdout
+        self.onStderr = onStderr
+        self.future = Future()
+        self._cancelled = threading.Event()
+
+    def cancel(self) -> None:
+        """
+        Drop the job if it has not started yet, kill its process otherwise
+        """
+        self._cancelled.set()
+        self.future.cancel()
+
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def done(self) -> bool:
+        return self.future.done()
+
+    def result(self, timeout: float = None) -> ProcessResult:
+        """
+        Wait for the process to end, a job cancelled before it started gives a cancelled result
+        """
+        try:
+            return self.future.result(timeout)
+        except CancelledError:
+            result = ProcessResult()
+            result.cancelled = True
+            return result
+
+    def run(self) -> None:
+        if not self.future.set_running_or_notify_cancel():
+            self.runner._finished.emit(self)
+            return
+        result = ProcessResult()
+        try:
+            self._execute(result)
+        except Exception as e:
+            logging.getLogger(__name__).exception('Process job {} failed'.format(self.program))
+            result.errorString = str(e)
+        self.future.set_result(result)
+        self.runner._finished.emit(self)
+
+    def _execute(self, result: ProcessResult) -> None:
+        proc = QProcess()
+        proc.setProcessEnvironment(QProcessEnvironment.systemEnvironment())
+        proc.setProcessChannelMode(QProcess.MergedChannels if self.mergeChannels else QProcess.SeparateChannels)
+        if self.workdir is not None:
+            proc.setWorkingDirectory(self.workdir)
+        proc.start(self.program, self.arguments)
+        if not proc.waitForStarted(-1):
+            result.error, result.errorString = proc.error(), proc.errorString()
+            return
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        output, errorOutput = [], []
+        while proc.state() != QProcess.NotRunning:
+            proc.waitForReadyRead(self.pollInterval)
+            self._read(proc, output, errorOutput)
+            if self._cancelled.is_set():
+                result.cancelled = True
+            elif deadline is not None and time.monotonic() > deadline:
+                result.timedOut = True
+            else:
+                continue
+            proc.kill()
+            proc.waitForFinished(-1)
+            break
+        proc.waitForFinished(-1)
+        self._read(proc, output, errorOutput)
+        result.output, result.errorOutput = b''.join(output), b''.join(errorOutput)
+        result.normalExit = proc.exitStatus() == QProcess.NormalExit
+        result.exitCode = proc.exitCode()
+        # waitForReadyRead timing out while polling leaves Timedout as the last error
+        if proc.error() not in {QProcess.UnknownError, QProcess.Timedout}:
+            result.error, result.errorString = proc.error(), proc.errorString()
+
+    def _read(self, proc: QProcess, output: list, errorOutput: list) -> None:
+        data = proc.readAllStandardOutput().data()
+        if len(data):
+            output.append(data)
+            if self.onStdout is not None:
+                self.onStdout(data.decode(errors='replace'))
+        data = proc.readAllStandardError().data()
+        if len(data):
+            errorOutput.append(data)
+            if self.onStderr is not None:
+                self.onStderr(data.decode(errors='replace'))
+
+
+class ProcessRunner(QObject):
+    """
+    Runs external commands concurrently, every job in its own process, at most maxConcurrency at once; more jobs
+    are queued. submit returns the job at once, its future gives the result and jobFinished is emitted on the thread
+    of the runner when it ends; run submits and waits, for callers which need the result right away.
+    """
+    jobFinished = pyqtSignal(object)
+    _finished = pyqtSignal(object)
+
+    defaultConcurrency = 4
+
+    def __init__(self, maxConcurrency: int = defaultConcurrency, parent: QObject = None):
+        super(ProcessRunner, self).__init__(parent)
+        self._lock = threading.Lock()
+        self._jobs: set[ProcessJob] = set()
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(maxConcurrency)
+        self._finished.connect(self._on_finished)
+
+    @property
+    def maxConcurrency(self) -> int:
+        return self._pool.maxThreadCount()
+
+    def setMaxConcurrency(self, value: int) -> None:
+        self._pool.setMaxThreadCount(max(1, value))
+
+    def submit(self, program: str, arguments: List[str], workdir: str = None, timeout: float = None,
+               mergeChannels: bool = False, onStdout: Callable[[str], None] = None,
+               onStderr: Callable[[str], None] = None) -> ProcessJob:
+        job = ProcessJob(self, program, arguments, workdir, timeout, mergeChannels, onStdout, onStderr)
+        with self._lock:
+            self._jobs.add(job)
+        self._pool.start(job)
+        return job
+
+    def run(self, program: str, arguments: List[str], **kwargs) -> ProcessResult:
+        return self.submit(program, arguments, **kwargs).result()
+
+    def cancelAll(self) -> None:
+        with self._lock:
+            jobs = list(self._jobs)
+        for job in jobs:
+            job.cancel()
+
+    def close(self) -> None:
+        self.cancelAll()
+        self._pool.waitForDone()
+
+    def _on_finished(self, job: ProcessJob) -> None:
+        # the pool does not own jobs, they are referenced here until they have run
+        with self._lock:
+            self._jobs.discard(job)
+        self.jobFinished.emit(job)
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#######################################################################
+#
+# VidCutter - media cutter & joiner
+#
+# copyright © 2018 Pete Alexandrou
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#######################################################################
+
+import logging
+import os
+import pickle
+import threading
+from typing import Callable, Optional, Union
+
+from PyQt5.QtCore import pyqtSignal, pyqtSlot, QObject, QThread
+
+
+class ProjectSaver(QObject):
+    """
+    Writes project snapshots on a worker thread.
+
+    The caller hands over the serialized snapshot, or a callable building it on the worker thread from data the caller
+    has copied, so the snapshot is consistent while the model keeps changing. The snapshot is written to a temporary
+    file, synced and moved over the project file with os.replace. Snapshots requested while a write is in progress
+    coalesce, only the newest one is written.
+    """
+    progress = pyqtSignal(int)
+    finished = pyqtSignal(bool, str)
+    _requested = pyqtSignal()
+
+    chunkSize = 1 << 20
+
+    def __init__(self):
+        super(ProjectSaver, self).__init__()
+        self.logger = logging.getLogger(__name__)
+        self._pending: Optional[tuple[str, Union[bytes, Callable[[], bytes]], Optional[Callable]]] = None
+        self._busy = False
+        self._condition = threading.Condition()
+        self._thread = QThread()
+        self._thread.setObjectName('ProjectSaver')
+        self.moveToThread(self._thread)
+        self._requested.connect(self._write)
+        self._thread.start()
+
+    def save(self, filepath: str, snapshot: Union[bytes, Callable[[], bytes]],
+             onWritten: Optional[Callable] = None) -> None:
+        """
+        Queue a snapshot for writing. onWritten is called on the worker thread after the project file was replaced.
+        """
+        with self._condition:
+            if self._pending is not None:
+                self.logger.info('Project save of {} superseded by a newer one'.format(self._pending[0]))
+            self._pending = (filepath, snapshot, onWritten)
+            if self._busy:
+                return
+            self._busy = True
+        self._requested.emit()
+
+    def isBusy(self) -> bool:
+        with self._condition:
+            return self._busy
+
+    def wait(self) -> None:
+        with self._condition:
+            while self._busy:
+                self._condition.wait()
+
+    def close(self) -> None:
+        self.wait()
+        self._thread.quit()
+        self._thread.wait()
+
+    @pyqtSlot()
+    def _write(self) -> None:
+        while True:
+            with self._condition:
+                job, self._pending = self._pending, None
+                if job is None:
+                    self._busy = False
+                    self._condition.notify_all()
+                    return
+            filepath, snapshot, onWritten = job
+            try:
+                if callable(snapshot):
+                    snapshot = snapshot()
+                self._writeFile(filepath, snapshot)
+                if onWritten is not None:
+                    onWritten()
+            except (OSError, EOFError, pickle.PickleError) as e:
+                self.logger.exception('Could not save project file {}'.format(filepath))
+                self.finished.emit(False, str(e))
+            else:
+                self.finished.emit(True, filepath)
+
+    def _writeFile(self, filepath: str, snapshot: bytes) -> None:
+        temporaryPath = filepath + '.tmp'
+        self.progress.emit(0)
+        with open(temporaryPath, 'wb') as f:
+            view = memoryview(snapshot)
+            for offset in range(0, len(view), self.chunkSize):
+                f.write(view[offset:offset + self.chunkSize])
+                self.progress.emit(int(100 * min(offset + self.chunkSize, len(view)) / len(view)))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporaryPath, filepath)
+        if hasattr(os, 'O_DIRECTORY'):
+            # make the rename itself durable
+            directory = os.open(os.path.dirname(filepath) or '.', os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(directory)
+            finally:
+                os.close(directory)
+        self.progress.emit(100)
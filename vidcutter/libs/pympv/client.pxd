@@ -128,6 +128,7 @@ cdef extern from "mpv/client.h":
         MPV_FORMAT_NODE
         MPV_FORMAT_NODE_ARRAY
         MPV_FORMAT_NODE_MAP
+        MPV_FORMAT_BYTE_ARRAY
 
     cdef struct ____mpv_node_u_mpv_node_list:
         pass
@@ -140,6 +141,7 @@ cdef extern from "mpv/client.h":
         int64_t int64
         double double_
         mpv_node_list *list
+        mpv_byte_array *ba
 
     ctypedef __mpv_node_u __mpv_node_u_t
 
@@ -207,6 +207,8 @@ cdef _convert_node_value(mpv_node node):
         return _convert_value(node.u.list, node.format)
     elif node.format == MPV_FORMAT_NODE_ARRAY:
         return _convert_value(node.u.list, node.format)
+    elif node.format == MPV_FORMAT_BYTE_ARRAY:
+        return (<char*>node.u.ba.data)[:node.u.ba.size]
     return None
 
 
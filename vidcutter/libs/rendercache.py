@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#######################################################################
+#
+# VidCutter - media cutter & joiner
+#
+# copyright © 2018 Pete Alexandrou
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#######################################################################
+
+
+
+import time
+from collections import OrderedDict
+from typing import Callable
+
+from PyQt5.QtCore import QSize, Qt
+from PyQt5.QtGui import QPainter, QPainterPath, QPixmap
+
+
+class RoundedPixmapCache:
+    """
+    Scaled thumbnails with rounded corners as drawn by the video and clip list rows, rendered once and then only blit.
+
+    Entries are keyed on (thumbnail key, size, radius, theme); thumbnail keys are content hashes of the thumbnail
+    pack, so an entry never goes stale. The cache is held under a memory budget, least recently used entries are
+    dropped first. Hits, misses and time spent rendering are counted, see counters. GUI thread only.
+    """
+    defaultBudget = 32 << 20
+    _shared = None
+
+    def __init__(self, budget: int = defaultBudget):
+        self.budget = budget
+        self._pixmaps: OrderedDict[tuple, QPixmap] = OrderedDict()
+        self._totalSize = 0
+        self.hits = 0
+        self.misses = 0
+        self.renderSeconds = 0.0
+
+    @staticmethod
+    def shared() -> 'RoundedPixmapCache':
+        if RoundedPixmapCache._shared is None:
+            RoundedPixmapCache._shared = RoundedPixmapCache()
+        return RoundedPixmapCache._shared
+
+    def pixmap(self, thumbnailKey: str, size: QSize, radius: int, theme: str,
+               load: Callable[[], QPixmap]) -> QPixmap:
+        """
+        Thumbnail scaled into size keeping its aspect ratio, with corners rounded by radius. load is only called on a
+        miss; a null pixmap from it gives a transparent placeholder of size.
+        """
+        key = (thumbnailKey, size.width(), size.height(), radius, theme)
+        pixmap = self._pixmaps.get(key)
+        if pixmap is not None:
+            self._pixmaps.move_to_end(key)
+            self.hits += 1
+            return pixmap
+        self.misses += 1
+        start = time.perf_counter()
+        source = load()
+        if source.isNull():
+            pixmap = QPixmap(size)
+            pixmap.fill(Qt.transparent)
+        else:
+            pixmap = self.roundedPixmap(source.scaled(size, Qt.KeepAspectRatio), radius)
+        self.renderSeconds += time.perf_counter() - start
+        self._pixmaps[key] = pixmap
+        self._totalSize += self._cost(pixmap)
+        while self._totalSize > self.budget and len(self._pixmaps) > 1:
+            _, dropped = self._pixmaps.popitem(last=False)
+            self._totalSize -= self._cost(dropped)
+        return pixmap
+
+    @staticmethod
+    def roundedPixmap(pixmap: QPixmap, radius: int = 20) -> QPixmap:
+        target = QPixmap(pixmap.size())
+        target.fill(Qt.transparent)
+        painter = QPainter(target)
+
+        painter.setRenderHint(QPainter.Antialiasing, True)
+        painter.setRenderHint(QPainter.HighQualityAntialiasing, True)
+        painter.setRenderHint(QPainter.SmoothPixmapTransform, True)
+
+        path = QPainterPath()
+        path.addRoundedRect(0, 0, pixmap.width(), pixmap.height(), radius, radius)
+
+        painter.setClipPath(path)
+        painter.drawPixmap(0, 0, pixmap)
+        painter.end()
+
+        return target
+
+    def counters(self) -> dict:
+        return {'entries': len(self._pixmaps), 'bytes': self._totalSize, 'hits': self.hits, 'misses': self.misses,
+                'render_seconds': self.renderSeconds}
+
+    def resetCounters(self) -> None:
+        self.hits, self.misses, self.renderSeconds = 0, 0, 0.0
+
+    def clear(self) -> None:
+        self._pixmaps.clear()
+        self._totalSize = 0
+
+    @staticmethod
+    def _cost(pixmap: QPixmap) -> int:
+        return pixmap.width() * pixmap.height() * max(pixmap.depth(), 8) // 8
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#######################################################################
+#
+# VidCutter - media cutter & joiner
+#
+# copyright © 2018 Pete Alexandrou
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#######################################################################
+
+
+
+import hashlib
+import logging
+import mmap
+import os
+import threading
+from typing import Optional
+
+from PyQt5.QtCore import pyqtSignal, pyqtSlot, QObject, QProcess, QRunnable, QSettings, QSize, QStandardPaths, QThreadPool
+from PyQt5.QtGui import QImage
+
+from vidcutter.libs.mediacache import fileIdentity
+from vidcutter.libs.videoservice import VideoService
+
+
+class SpriteSheetJob(QRunnable):
+    def __init__(self, spriteSheet: 'SpriteSheet', generation: int, ffmpeg: str, source: str, interval: float,
+                 filepath: str):
+        super(SpriteSheetJob, self).__init__()
+        self.spriteSheet = spriteSheet
+        self.generation = generation
+        self.ffmpeg = ffmpeg
+        self.source = source
+        self.interval = interval
+        self.filepath = filepath
+
+    def run(self) -> None:
+        width, height = SpriteSheet.frameSize.width(), SpriteSheet.frameSize.height()
+        filters = 'fps=1/{0:.3f},scale={1:d}:{2:d}:force_original_aspect_ratio=decrease,' \
+                  'pad={1:d}:{2:d}:(ow-iw)/2:(oh-ih)/2,setsar=1'.format(self.interval, width, height)
+        temporaryPath = '{0}.{1}.tmp'.format(self.filepath, threading.get_ident())
+        proc = VideoService.initProc()
+        proc.setProcessChannelMode(QProcess.SeparateChannels)
+        proc.start(self.ffmpeg, ['-hide_banner', '-loglevel', 'error', '-i', self.source, '-an', '-sn', '-vf', filters,
+                                 '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-y', temporaryPath])
+        proc.waitForFinished(-1)
+        filepath = ''
+        try:
+            if proc.exitStatus() == QProcess.NormalExit and proc.exitCode() == 0:
+                os.replace(temporaryPath, self.filepath)
+                filepath = self.filepath
+            else:
+                logging.getLogger(__name__).error('ffmpeg sprite sheet failed: {}'.format(
+                    proc.readAllStandardError().data().decode(errors='replace').strip()))
+                os.remove(temporaryPath)
+        except OSError:
+            logging.getLogger(__name__).exception('Could not write sprite sheet {}'.format(self.filepath))
+        self.spriteSheet._generated.emit(self.generation, filepath)
+
+
+class SpriteSheet(QObject):
+    """
+    Low resolution frames of the current video, one per interval seconds, for the hover preview of the timeline.
+
+    The frames are written once per video by a single ffmpeg pass in the background, as uncompressed rgb24 frames
+    one after the other in a file of the user cache directory. The file is memory-mapped, so a lookup is one slice of
+    the mapping, no decoding and no seek of the player. The interval is one second, or longer for videos of more than
+    maximumFrames seconds. Sprite files are held under a size budget, least recently opened files are removed first.
+    """
+    ready = pyqtSignal()
+    _generated = pyqtSignal(int, str)
+
+    frameSize = QSize(160, 90)
+    maximumFrames = 3600
+    cacheBudget = 1 << 30
+
+    def __init__(self, settings: QSettings, parent: QObject = None):
+        super(SpriteSheet, self).__init__(parent)
+        self.logger = logging.getLogger(__name__)
+        self.settings = settings
+        self.folder = os.path.join(QStandardPaths.writableLocation(QStandardPaths.CacheLocation), 'sprites')
+        self.interval = 1.0
+        self.count = 0
+        self._backends = None
+        self._generation = 0
+        self._file = None
+        self._map = None
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(1)
+        self._generated.connect(self._on_generated)
+
+    @property
+    def frameBytes(self) -> int:
+        return 3 * self.frameSize.width() * self.frameSize.height()
+
+    def filepath(self, source: str, interval: float) -> Optional[str]:
+        identity = fileIdentity(source)
+        if identity is None:
+            return None
+        text = '{0}\0{1}\0{2}\0{3:.3f}\0{4:d}x{5:d}'.format(*identity, interval, self.frameSize.width(),
+                                                            self.frameSize.height())
+        return os.path.join(self.folder, hashlib.sha1(text.encode('utf-8', 'surrogateescape')).hexdigest() + '.rgb')
+
+    def setSource(self, source: Optional[str], duration: float = 0.0) -> None:
+        """
+        Map the sprite file of source, of duration seconds, or generate it in the background when it is not cached
+        """
+        self.clear()
+        if not source or duration <= 0:
+            return
+        interval = max(1.0, duration / self.maximumFrames)
+        filepath = self.filepath(source, interval)
+        if filepath is None:
+            return
+        self.interval = interval
+        if os.path.isfile(filepath):
+            self._open(filepath)
+            return
+        if self._backends is None:
+            self._backends = VideoService.findBackends(self.settings)
+        try:
+            os.makedirs(self.folder, exist_ok=True)
+        except OSError:
+            self.logger.exception('Could not create sprite sheet folder {}'.format(self.folder))
+            return
+        self._pool.start(SpriteSheetJob(self, self._generation, self._backends.ffmpeg, source, interval, filepath))
+
+    def isReady(self) -> bool:
+        return self.count > 0
+
+    def frame(self, seconds: float) -> QImage:
+        """
+        Frame nearest to seconds, a null image while the sprite file is not ready
+        """
+        if not self.count:
+            return QImage()
+        index = min(max(int(seconds / self.interval + 0.5), 0), self.count - 1)
+        offset = index * self.frameBytes
+        width, height = self.frameSize.width(), self.frameSize.height()
+        return QImage(self._map[offset:offset + self.frameBytes], width, height, 3 * width, QImage.Format_RGB888)
+
+    def clear(self) -> None:
+        self._generation += 1
+        self.count = 0
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def close(self) -> None:
+        self.clear()
+        self._pool.clear()
+        self._pool.waitForDone()
+
+    def _open(self, filepath: str) -> None:
+        try:
+            self._file = open(filepath, 'rb')
+            size = os.fstat(self._file.fileno()).st_size
+            if size < self.frameBytes:
+                self._file.close()
+                self._file = None
+                return
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            os.utime(filepath)
+        except OSError:
+            self.logger.exception('Could not map sprite sheet {}'.format(filepath))
+            self.clear()
+            return
+        self.count = size // self.frameBytes
+        self.ready.emit()
+
+    def _evict(self, keep: str) -> None:
+        entries = []
+        try:
+            with os.scandir(self.folder) as iterator:
+                for entry in iterator:
+                    if entry.name.endswith('.rgb') and entry.is_file() and entry.path != keep:
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime_ns, entry.path, stat.st_size))
+        except OSError:
+            return
+        totalSize = sum(size for _, _, size in entries) + os.path.getsize(keep)
+        for _, filepath, size in sorted(entries):
+            if totalSize <= self.cacheBudget:
+                break
+            try:
+                os.remove(filepath)
+                totalSize -= size
+            except OSError:
+                # still mapped by another instance on Windows
+                pass
+
+    @pyqtSlot(int, str)
+    def _on_generated(self, generation: int, filepath: str) -> None:
+        if filepath:
+            self._evict(filepath)
+        if generation == self._generation and filepath:
+            self._open(filepath)
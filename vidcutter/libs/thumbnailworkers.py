@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#######################################################################
+#
+# VidCutter - media cutter & joiner
+#
+# copyright © 2018 Pete Alexandrou
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#######################################################################
+
+
+import logging
+from bisect import bisect_left
+from typing import Optional
+
+from PyQt5.QtCore import pyqtSignal, pyqtSlot, QObject, QRunnable, QSettings, QSize, QThreadPool
+from PyQt5.QtGui import QImage
+
+from vidcutter.libs.videoservice import VideoService
+
+
+class ThumbnailRequest:
+    """
+    Pending capture of a thumbnail for target, e.g. a VideoItemClip, at msecs. Doubles as the cancel token.
+    """
+    __slots__ = ('target', 'videoIndex', 'msecs', 'cancelled', 'key')
+
+    def __init__(self, target, videoIndex: int, msecs: int):
+        self.target = target
+        self.videoIndex = videoIndex
+        self.msecs = msecs
+        self.cancelled = False
+        self.key = self.targetKey(target, videoIndex)
+
+    @staticmethod
+    def targetKey(target, videoIndex: int) -> tuple:
+        """
+        Identity of target in the video. ClipTable rows are proxies made on every access, they are told apart by their
+        row id, other targets by the object itself.
+        """
+        rowId = getattr(target, 'rowId', None)
+        if rowId is not None:
+            return videoIndex, 'row', rowId
+        return videoIndex, 'object', id(target)
+
+
+class ThumbnailJob(QRunnable):
+    def __init__(self, workers: 'ThumbnailWorkers', request: ThumbnailRequest, ffmpeg: str, source: str, frametime: str,
+                 thumbsize: QSize, exact: bool = True):
+        super(ThumbnailJob, self).__init__()
+        self.workers = workers
+        self.request = request
+        self.ffmpeg = ffmpeg
+        self.source = source
+        self.frametime = frametime
+        self.thumbsize = thumbsize
+        self.exact = exact
+
+    def run(self) -> None:
+        # requests cancelled while queued never start ffmpeg
+        if self.request.cancelled:
+            return
+        image = VideoService.captureFrameImage(self.ffmpeg, self.source, self.frametime, self.thumbsize)
+        self.workers._captured.emit(self.request, image, self.exact)
+
+
+class KeyframesJob(QRunnable):
+    def __init__(self, workers: 'ThumbnailWorkers', ffprobe: str, source: str):
+        super(KeyframesJob, self).__init__()
+        self.workers = workers
+        self.ffprobe = ffprobe
+        self.source = source
+
+    def run(self) -> None:
+        self.workers._keyframesLoaded.emit(self.source, VideoService.keyframeTimes(self.ffprobe, self.source))
+
+
+class ThumbnailWorkers(QObject):
+    """
+    Captures thumbnails on a bounded thread pool so the GUI thread never waits for ffmpeg.
+
+    The caller shows a placeholder and gets the image by the thumbnailReady signal, on the GUI thread. A target has at
+    most one pending request, requesting again cancels the previous one, see ThumbnailRequest.targetKey; cancelled requests are skipped if they have
+    not started yet and their result is dropped otherwise.
+
+    Once the keyframes of a source are known (they are listed in the background on its first request), a time between
+    keyframes is captured in two phases: the frame of the nearest keyframe first, which needs a single frame decoded,
+    then the exact frame, which has to be decoded from the previous keyframe. The exact flag of thumbnailReady tells
+    them apart; previews are queued ahead of all exact captures.
+    """
+    thumbnailReady = pyqtSignal(ThumbnailRequest, QImage, bool)
+    _captured = pyqtSignal(ThumbnailRequest, QImage, bool)
+    _keyframesLoaded = pyqtSignal(str, list)
+
+    maxThreads = 2
+    previewPriority = 1
+
+    def __init__(self, settings: QSettings, parent: QObject = None):
+        super(ThumbnailWorkers, self).__init__(parent)
+        self.logger = logging.getLogger(__name__)
+        self.settings = settings
+        self._backends = None
+        self._pending: dict[tuple, ThumbnailRequest] = {}
+        self._keyframes: dict[str, Optional[list[float]]] = {}
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(self.maxThreads)
+        self._captured.connect(self._on_captured)
+        self._keyframesLoaded.connect(self._on_keyframesLoaded)
+
+    def request(self, target, videoIndex: int, msecs: int, source: str, frametime: str,
+                thumbsize: QSize = None) -> ThumbnailRequest:
+        self.cancel(target, videoIndex)
+        if self._backends is None:
+            self._backends = VideoService.findBackends(self.settings)
+        request = ThumbnailRequest(target, videoIndex, msecs)
+        self._pending[request.key] = request
+        keyframe = self.nearestKeyframe(source, msecs)
+        if keyframe is not None and abs(round(keyframe * 1000) - msecs) > 1:
+            self._pool.start(ThumbnailJob(self, request, self._backends.ffmpeg, source, '{0:.6f}'.format(keyframe),
+                                          thumbsize, False), self.previewPriority)
+        self._pool.start(ThumbnailJob(self, request, self._backends.ffmpeg, source, frametime, thumbsize))
+        return request
+
+    def nearestKeyframe(self, source: str, msecs: int) -> Optional[float]:
+        """
+        Time in seconds of the keyframe nearest to msecs, None while keyframes of source are not known
+        """
+        if source not in self._keyframes:
+            self._keyframes[source] = None
+            self._pool.start(KeyframesJob(self, self._backends.ffprobe, source), -1)
+        keyframes = self._keyframes[source]
+        if not keyframes:
+            return None
+        seconds = msecs / 1000
+        index = bisect_left(keyframes, seconds)
+        candidates = keyframes[max(index - 1, 0):index + 1]
+        return min(candidates, key=lambda keyframe: abs(keyframe - seconds))
+
+    def cancel(self, target, videoIndex: int) -> None:
+        request = self._pending.pop(ThumbnailRequest.targetKey(target, videoIndex), None)
+        if request is not None:
+            request.cancelled = True
+
+    def cancelAll(self) -> None:
+        for request in self._pending.values():
+            request.cancelled = True
+        self._pending.clear()
+
+    def close(self) -> None:
+        self.cancelAll()
+        self._pool.clear()
+        self._pool.waitForDone()
+
+    @pyqtSlot(str, list)
+    def _on_keyframesLoaded(self, source: str, keyframes: list) -> None:
+        self._keyframes[source] = keyframes
+
+    @pyqtSlot(ThumbnailRequest, QImage, bool)
+    def _on_captured(self, request: ThumbnailRequest, image: QImage, exact: bool) -> None:
+        if request.cancelled:
+            return
+        if self._pending.get(request.key) is not request:
+            # a preview finishing after the exact image is stale
+            return
+        if exact:
+            del self._pending[request.key]
+        if image.isNull():
+            self.logger.info('Could not capture thumbnail at {} ms'.format(request.msecs))
+            return
+        self.thumbnailReady.emit(request, image, exact)
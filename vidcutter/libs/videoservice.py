@@ -28,25 +28,30 @@ import os
 import re
 import shlex
 import sys
-from bisect import bisect_left
+import threading
+from concurrent.futures import Future
 from functools import partial
 from typing import List, Optional, Union
 
+import numpy as np
 from PyQt5.QtCore import (pyqtSignal, pyqtSlot, QDir, QFileInfo, QObject, QProcess, QProcessEnvironment, QSettings,
                           QSize, QStandardPaths, QStorageInfo, QTemporaryFile, QTime)
-from PyQt5.QtGui import QPainter, QPixmap
+from PyQt5.QtGui import QImage, QPainter, QPixmap
 from PyQt5.QtWidgets import QMessageBox, QWidget
 
 from vidcutter.libs.config import Config, InvalidMediaException, Streams, ToolNotFoundException
 from vidcutter.libs.ffmetadata import FFMetadata
+from vidcutter.libs.keyframeindex import KeyframeIndex
+from vidcutter.libs.mediacache import fileIdentity, MetadataCache, ThumbnailCache
 from vidcutter.libs.munch import Munch
+from vidcutter.libs.processrunner import ProcessRunner
 from vidcutter.libs.widgets import VCMessageBox
 
 try:
     # noinspection PyPackageRequirements
-    from simplejson import loads, JSONDecodeError
+    from simplejson import dumps, loads, JSONDecodeError
 except ImportError:
-    from json import loads, JSONDecodeError
+    from json import dumps, loads, JSONDecodeError
 
 
 class VideoService(QObject):
@@ -61,6 +66,14 @@ class VideoService(QObject):
     smartcutError = False
 
     config = Config()
+    thumbnailCache = None
+    cachesLock = threading.Lock()
+    metadataCache = None
+    keyframeCache = None
+    runner = None
+    queryTimeout = 120
+    mediainfoOutputs = ('HTML', 'JSON')
+    captureBatchSize = 32
 
     def __init__(self, settings: QSettings, parent: QWidget):
         super(VideoService, self).__init__(parent)
@@ -69,15 +82,17 @@ class VideoService(QObject):
         self.logger = logging.getLogger(__name__)
         try:
             self.backends = VideoService.findBackends(self.settings)
-            self.proc = VideoService.initProc()
-            if hasattr(self.proc, 'errorOccurred'):
-                self.proc.errorOccurred.connect(self.cmdError)
+            self.runner = VideoService.processRunner()
+            self.runner.setMaxConcurrency(self.settings.value('processConcurrency', ProcessRunner.defaultConcurrency,
+                                                              type=int))
             self.lastError = ''
             self.media, self.source = None, None
             self.chapter_metadata = None
-            self.keyframes = []
+            self.keyframes = np.empty(0)
             self.streams = Munch()
             self.mappings = []
+            self.probes = {}
+            self.reports = {}
         except ToolNotFoundException as e:
             self.logger.exception(e.msg, exc_info=True)
             QMessageBox.critical(getattr(self, 'parent', None), 'Missing libraries', e.msg)
@@ -85,6 +100,7 @@ class VideoService(QObject):
     def setMedia(self, source: str) -> None:
         try:
             self.source = QDir.toNativeSeparators(source)
+            self.keyframes = np.empty(0)
             self.media = self.probe(source)
             if self.media is not None:
                 if getattr(self.parent, 'verboseLogs', False):
@@ -99,6 +115,9 @@ class VideoService(QObject):
                 self.mappings.clear()
                 # noinspection PyUnusedLocal
                 [self.mappings.append(True) for i in range(int(self.media.format.nb_streams))]
+                VideoService.keyframeIndex().prefetch(self.backends.ffprobe, self.source,
+                                                      float(self.media.format.get('duration', 0)))
+                self.prefetchMediainfo(self.source)
         except OSError as e:
             if e.errno == errno.ENOENT:
                 errormsg = '{0}: {1}'.format(os.strerror(errno.ENOENT), source)
@@ -164,29 +183,132 @@ class VideoService(QObject):
             spacewarn.exec_()
             self.spaceWarningDelivered = True
 
+    @staticmethod
+    def frameCache() -> ThumbnailCache:
+        with VideoService.cachesLock:
+            if VideoService.thumbnailCache is None:
+                VideoService.thumbnailCache = ThumbnailCache()
+        return VideoService.thumbnailCache
+
+    @staticmethod
+    def metadataStore() -> MetadataCache:
+        with VideoService.cachesLock:
+            if VideoService.metadataCache is None:
+                VideoService.metadataCache = MetadataCache()
+        return VideoService.metadataCache
+
+    @staticmethod
+    def keyframeIndex() -> KeyframeIndex:
+        with VideoService.cachesLock:
+            if VideoService.keyframeCache is None:
+                VideoService.keyframeCache = KeyframeIndex()
+        return VideoService.keyframeCache
+
+    @staticmethod
+    def processRunner() -> ProcessRunner:
+        with VideoService.cachesLock:
+            if VideoService.runner is None:
+                VideoService.runner = ProcessRunner()
+        return VideoService.runner
+
     @staticmethod
     def captureFrame(settings: QSettings, source: str, frametime: str, thumbsize: QSize=None, external: bool=False) -> QPixmap:
+        capres = QPixmap.fromImage(VideoService.captureFrameImage(VideoService.findBackends(settings).ffmpeg, source,
+                                                                  frametime, thumbsize))
+        if external and not capres.isNull():
+            painter = QPainter(capres)
+            painter.drawPixmap(0, 0, QPixmap(':/images/external.png', 'PNG'))
+            painter.end()
+        return capres
+
+    @staticmethod
+    def captureFrameImage(ffmpeg: str, source: str, frametime: str, thumbsize: QSize=None) -> QImage:
+        """
+        captureFrame without pixmaps and settings access, it can run on worker threads
+        """
         if thumbsize is None:
             thumbsize = VideoService.config.thumbnails['INDEX']
-        capres = QPixmap()
-        img = QTemporaryFile(os.path.join(QDir.tempPath(), 'XXXXXX.jpg'))
-        if img.open():
-            imagecap = img.fileName()
-            cmd = VideoService.findBackends(settings).ffmpeg
-            tsize = '{0:d}x{1:d}'.format(thumbsize.width(), thumbsize.height())
-            args = '-hide_banner -ss {frametime} -i "{source}" -vframes 1 -s {tsize} -y "{imagecap}"'.format(**locals())
-            proc = VideoService.initProc()
-            if proc.state() == QProcess.NotRunning:
-                proc.start(cmd, shlex.split(args))
-                proc.waitForFinished(-1)
-                if proc.exitStatus() == QProcess.NormalExit and proc.exitCode() == 0:
-                    capres = QPixmap(imagecap, 'JPG')
-                if external:
-                    painter = QPainter(capres)
-                    painter.drawPixmap(0, 0, QPixmap(':/images/external.png', 'PNG'))
-                    painter.end()
-        img.remove()
-        return capres
+        cache = VideoService.frameCache()
+        cacheKey = cache.key(source, frametime, thumbsize)
+        capimage = cache.get(cacheKey)
+        if capimage.isNull():
+            frames = VideoService.readRawFrames(ffmpeg, ['-ss', frametime, '-i', source], thumbsize, 1)
+            if len(frames):
+                capimage = frames[0]
+                cache.put(cacheKey, capimage)
+        return capimage
+
+    @staticmethod
+    def captureFrames(settings: QSettings, source: str, frametimes: List[str], thumbsize: QSize=None) -> List[QPixmap]:
+        """
+        Capture frames at many times with one ffmpeg process per captureBatchSize frames instead of one per frame,
+        see captureFrameImages. Frames which could not be captured are null pixmaps.
+        """
+        images = VideoService.captureFrameImages(VideoService.findBackends(settings).ffmpeg, source, frametimes, thumbsize)
+        return [QPixmap.fromImage(image) for image in images]
+
+    @staticmethod
+    def captureFrameImages(ffmpeg: str, source: str, frametimes: List[str], thumbsize: QSize=None,
+                           cached: bool=True) -> List[QImage]:
+        """
+        Every frame time is a separate input seeked with -ss, so the file is opened and probed once per batch and
+        each frame is decoded from its nearest keyframe; the first frame of every input is concatenated into one raw
+        stream. Frames which could not be captured are null images. Runs on worker threads; with cached False the
+        frame cache is neither read nor filled, for callers keeping their own cache of composed images.
+        """
+        if thumbsize is None:
+            thumbsize = VideoService.config.thumbnails['INDEX']
+        cache = VideoService.frameCache() if cached else None
+        cacheKeys = [cache.key(source, frametime, thumbsize) if cached else None for frametime in frametimes]
+        images = [cache.get(cacheKey) if cached else QImage() for cacheKey in cacheKeys]
+        missing = [index for index, image in enumerate(images) if image.isNull()]
+        tsize = '{0:d}x{1:d}'.format(thumbsize.width(), thumbsize.height())
+        for start in range(0, len(missing), VideoService.captureBatchSize):
+            batch = missing[start:start + VideoService.captureBatchSize]
+            args = []
+            for index in batch:
+                args += ['-ss', frametimes[index], '-i', source]
+            filters = ['[{0:d}:v:0]trim=end_frame=1,setpts=PTS-STARTPTS,scale={1},setsar=1[v{0:d}]'.format(input_index, tsize)
+                       for input_index in range(len(batch))]
+            inputs = ''.join('[v{0:d}]'.format(input_index) for input_index in range(len(batch)))
+            filters.append('{0}concat=n={1:d}:v=1:a=0[frames]'.format(inputs, len(batch)))
+            args += ['-filter_complex', ';'.join(filters), '-map', '[frames]']
+            frames = VideoService.readRawFrames(ffmpeg, args, thumbsize, len(batch))
+            if len(frames) != len(batch):
+                # a frame time past the end of the media gives no frame, the rest cannot be matched to their times
+                frames = [(VideoService.readRawFrames(ffmpeg, ['-ss', frametimes[index], '-i', source], thumbsize, 1)
+                           or [QImage()])[0] for index in batch]
+            for index, frame in zip(batch, frames):
+                images[index] = frame
+                if cached:
+                    cache.put(cacheKeys[index], frame)
+        return images
+
+    @staticmethod
+    def readRawFrames(ffmpeg: str, args: List[str], framesize: QSize, frames: int) -> List[QImage]:
+        """
+        Run ffmpeg with args selecting inputs and filters, and read up to frames frames of framesize from its stdout
+        as rgb24 rawvideo. No temporary files and no lossy encoding, each QImage is copied out of the bytes read from
+        the pipe, as QImage does not keep a buffer it was built on alive.
+        """
+        width, height = framesize.width(), framesize.height()
+        proc = VideoService.initProc()
+        proc.setProcessChannelMode(QProcess.SeparateChannels)
+        proc.start(ffmpeg, ['-hide_banner', '-loglevel', 'error'] + args +
+                   ['-frames:v', str(frames), '-s', '{0:d}x{1:d}'.format(width, height), '-f', 'rawvideo',
+                    '-pix_fmt', 'rgb24', 'pipe:1'])
+        proc.waitForFinished(-1)
+        if proc.exitStatus() != QProcess.NormalExit or proc.exitCode() != 0:
+            logging.getLogger(__name__).error('ffmpeg frame capture failed: {}'.format(
+                proc.readAllStandardError().data().decode(errors='replace').strip()))
+            return []
+        data = proc.readAllStandardOutput().data()
+        frameBytes = 3 * width * height
+        images = []
+        for offset in range(0, len(data) - frameBytes + 1, frameBytes):
+            images.append(QImage(data[offset:offset + frameBytes], width, height, 3 * width,
+                                 QImage.Format_RGB888).copy())
+        return images
 
     # noinspection PyBroadException
     def testJoin(self, file1: str, file2: str) -> bool:
@@ -237,35 +359,54 @@ class VideoService(QObject):
         return result
 
     def framesize(self, source: str = None) -> QSize:
-        if source is None and hasattr(self.streams, 'video'):
-            return QSize(int(self.streams.video.width), int(self.streams.video.height))
-        else:
-            args = '-i "{}"'.format(source)
-            result = self.cmdExec(self.backends.ffmpeg, args, True)
-            matches = re.search(r'Stream.*Video:.*[,\s](?P<width>\d+?)x(?P<height>\d+?)[,\s]',
-                                result, re.DOTALL).groupdict()
-            return QSize(int(matches['width']), int(matches['height']))
+        video = self.videoStream(self.probed(source))
+        return QSize(int(video.width), int(video.height))
 
     def duration(self, source: str = None) -> QTime:
-        if source is None and hasattr(self.media, 'format') and self.parent is not None:
-            return self.parent.delta2QTime(float(self.media.format.video_duration))
-        else:
-            args = '-i "{}"'.format(source)
-            result = self.cmdExec(self.backends.ffmpeg, args, True)
-            matches = re.search(r'Duration:\s(?P<hrs>\d+?):(?P<mins>\d+?):(?P<secs>\d+\.\d+?),',
-                                result, re.DOTALL).groupdict()
-            secs, msecs = matches['secs'].split('.')
-            return QTime(int(matches['hrs']), int(matches['mins']), int(secs), int(msecs))
+        return QTime(0, 0).addMSecs(self.durationMSecs(source))
+
+    def durationMSecs(self, source: str = None) -> int:
+        """
+        Duration of source in milliseconds, unlike duration it does not wrap around for media of 24 hours or more.
+        Falls back to the video stream duration when the container has none, 0 when neither is known.
+        """
+        media = self.probed(source)
+        durations = [getattr(media, 'format', Munch()).get('duration')]
+        durations += [stream.get('duration') for stream in getattr(media, 'streams', [])
+                      if stream.get('codec_type') == 'video']
+        for duration in durations:
+            try:
+                return round(float(duration) * 1000)
+            except (TypeError, ValueError):
+                continue
+        self.logger.error('no duration known for {}'.format(source or self.source))
+        return 0
 
     def codecs(self, source: str = None) -> tuple:
-        if source is None and hasattr(self.streams, 'video'):
-            return self.streams.video.codec_name, self.streams.audio[0].codec_name if len(self.streams.audio) else None
-        else:
-            args = '-i "{}"'.format(source)
-            result = self.cmdExec(self.backends.ffmpeg, args, True)
-            vcodec = re.search(r'Stream.*Video:\s(\w+)', result).group(1)
-            acodec = re.search(r'Stream.*Audio:\s(\w+)', result).group(1)
-            return vcodec, acodec
+        media = self.probed(source)
+        audio = [stream for stream in media.streams if stream.codec_type == 'audio']
+        return self.videoStream(media).codec_name, audio[0].codec_name if len(audio) else None
+
+    def probed(self, source: str = None) -> Munch:
+        """
+        Probe of source, of the current media when source is None. Every file is probed once per session, see probe.
+        """
+        if source is None or (self.media is not None and QDir.toNativeSeparators(source) == self.source):
+            return self.media
+        identity = fileIdentity(source)
+        media = self.probes.get(identity)
+        if media is None:
+            media = self.probe(source)
+            if identity is not None:
+                self.probes[identity] = media
+        return media
+
+    @staticmethod
+    def videoStream(media: Munch) -> Munch:
+        for stream in media.streams:
+            if stream.codec_type == 'video':
+                return stream
+        raise InvalidMediaException('No video stream in probed media')
 
     def parseMappings(self, allstreams: bool = True) -> str:
         if not len(self.mappings) or (self.parent is not None and self.parent.hasExternals()):
@@ -472,8 +613,7 @@ class VideoService(QObject):
         ffmetadata = FFMetadata()
         pos = 0
         for index, scene in enumerate(scenes):
-            duration = self.duration(scene)
-            end = pos + duration.msecsSinceStartOfDay()
+            end = pos + self.durationMSecs(scene)
             ffmetadata.add_chapter(pos, end, titles[index])
             pos = end
         ffmetafile = os.path.normpath(os.path.join(os.path.dirname(scenes[0]), 'ffmetadata.txt'))
@@ -545,10 +685,24 @@ class VideoService(QObject):
             self.filterproc.kill()
 
     def probe(self, source: str) -> Munch:
+        """
+        ffprobe streams and format of source, unchanged files are read from the metadata cache instead of probed again
+        """
+        cache = VideoService.metadataStore()
+        cached = cache.get('ffprobe', source)
+        if cached is not None:
+            try:
+                return Munch.fromDict(loads(cached))
+            except JSONDecodeError:
+                self.logger.warning('Dropped corrupt cached probe of {}'.format(source))
         try:
             args = '-v error -show_streams -show_format -of json "{}"'.format(source)
-            json_data = self.cmdExec(self.backends.ffprobe, args, output=True, mergechannels=False)
-            return Munch.fromDict(loads(json_data))
+            json_data = self.cmdExec(self.backends.ffprobe, args, output=True, mergechannels=False,
+                                     timeout=VideoService.queryTimeout)
+            data = loads(json_data)
+            if 'streams' in data and 'format' in data:
+                cache.put('ffprobe', source, dumps(data, separators=(',', ':')))
+            return Munch.fromDict(data)
         except FileNotFoundError:
             self.logger.exception('FFprobe could not find media file: {}'.format(source), exc_info=True)
             raise
@@ -556,53 +710,58 @@ class VideoService(QObject):
             self.logger.exception('FFprobe JSON decoding error', exc_info=True)
             raise
 
-    def getKeyframes(self, source: str, formatted_time: bool = False) -> list:
-        if len(self.keyframes) and source == self.source:
+    def getKeyframes(self, source: str, formatted_time: bool = False) -> Union[np.ndarray, List[str]]:
+        """
+        Keyframe times of source in seconds followed by its duration, from the persistent keyframe index; as
+        h:mm:ss.zzz strings when formatted_time is set
+        """
+        if len(self.keyframes) and source == self.source and not formatted_time:
             return self.keyframes
-        timecode = '0:00:00.000000' if formatted_time else 0
-        args = '-v error -show_packets -select_streams v -show_entries packet=pts_time,flags ' \
-               '{0}-of csv "{1}"'.format('-sexagesimal ' if formatted_time else '', source)
-        result = self.cmdExec(self.backends.ffprobe, args, output=True, suppresslog=True, mergechannels=False)
-        keyframe_times = []
-        for line in result.split('\n'):
-            if line.split(',')[1] != 'N/A':
-                timecode = line.split(',')[1]
-            if re.search(',K', line):
-                if formatted_time:
-                    keyframe_times.append(timecode[:-3])
-                else:
-                    keyframe_times.append(float(timecode))
-        last_keyframe = self.duration().toString('h:mm:ss.zzz')
-        if keyframe_times[-1] != last_keyframe:
-            keyframe_times.append(last_keyframe)
-        if source == self.source and not formatted_time:
+        last_keyframe = self.durationMSecs(source) / 1000
+        keyframe_times = self.withLastKeyframe(VideoService.keyframeIndex().times(self.backends.ffprobe, source,
+                                                                                  last_keyframe), last_keyframe)
+        if formatted_time:
+            return [QTime(0, 0).addMSecs(round(keyframe_time * 1000)).toString('h:mm:ss.zzz')
+                    for keyframe_time in keyframe_times.tolist()]
+        if source == self.source:
             self.keyframes = keyframe_times
         return keyframe_times
 
+    @staticmethod
+    def withLastKeyframe(keyframe_times: np.ndarray, last_keyframe: float) -> np.ndarray:
+        if not len(keyframe_times) or round(float(keyframe_times[-1]), 3) != last_keyframe:
+            return np.append(keyframe_times, last_keyframe)
+        return keyframe_times
+
+    @staticmethod
+    def keyframeTimes(ffprobe: str, source: str) -> List[float]:
+        """
+        Sorted keyframe times in seconds of the first video stream. Unlike getKeyframes it does not touch the
+        VideoService instance, so it can run on worker threads.
+        """
+        return VideoService.keyframeIndex().times(ffprobe, source).tolist()
+
     def getGOPbisections(self, source: str, start: float, end: float) -> dict:
-        keyframes = self.getKeyframes(source)
-        start_pos = bisect_left(keyframes, start)
-        end_pos = bisect_left(keyframes, end)
-        return {
-            'start': (
-                keyframes[start_pos - 1] if start_pos > 0 else keyframes[start_pos],
-                keyframes[start_pos],
-                keyframes[start_pos + 1]
-            ),
-            'end': (
-                keyframes[end_pos - 2] if end_pos != (len(keyframes) - 1) else keyframes[end_pos - 1],
-                keyframes[end_pos - 1] if end_pos != (len(keyframes) - 1) else keyframes[end_pos],
-                keyframes[end_pos]
-            )
-        }
+        keyframes = None
+        if not len(self.keyframes) or source != self.source:
+            # while a long file is listed in ranges, only the keyframes around the clip are waited for
+            keyframes = VideoService.keyframeIndex().around(source, start, end)
+        if keyframes is None:
+            keyframes = self.getKeyframes(source)
+        else:
+            keyframes = self.withLastKeyframe(keyframes, self.durationMSecs(source) / 1000)
+        last_pos = len(keyframes) - 1
+        start_pos, end_pos = np.searchsorted(keyframes, (start, end)).tolist()
+        times = keyframes[[
+            max(start_pos - 1, 0), start_pos, start_pos + 1,
+            end_pos - 2 if end_pos != last_pos else end_pos - 1, end_pos - 1 if end_pos != last_pos else end_pos, end_pos
+        ]].tolist()
+        return {'start': tuple(times[:3]), 'end': tuple(times[3:])}
 
     def isMPEGcodec(self, source: str = None) -> bool:
-        if source is None and hasattr(self.streams, 'video'):
-            codec = self.streams.video.codec_name
-        else:
-            codec = self.codecs(source)[0].lower()
-            if codec == 'mpeg4' and os.path.splitext(source)[1] == '.avi':
-                return False
+        codec = self.codecs(source)[0].lower()
+        if source is not None and codec == 'mpeg4' and os.path.splitext(source)[1] == '.avi':
+            return False
         return codec in VideoService.config.mpeg_formats
 
     # noinspection PyBroadException
@@ -646,47 +805,110 @@ class VideoService(QObject):
 
     def version(self) -> str:
         args = '-version'
-        result = self.cmdExec(self.backends.ffmpeg, args, True)
+        result = self.cmdExec(self.backends.ffmpeg, args, True, timeout=VideoService.queryTimeout)
         return re.search(r'ffmpeg\sversion\s([\S]+)\s', result).group(1)
 
     def mediainfo(self, source: str, output: str = 'HTML') -> str:
+        """
+        mediainfo report of source in one of mediainfoOutputs. Reports are kept in the metadata cache, a report being
+        produced in the background by prefetchMediainfo is waited for instead of produced again.
+        """
+        kind = 'mediainfo.{}'.format(output.lower())
+        cached = VideoService.metadataStore().get(kind, source)
+        if cached is not None:
+            return cached
+        job = self.reports.get((kind, fileIdentity(source)))
+        if job is not None and job.result().ok:
+            return job.result().text()
         args = '--output={0} "{1}"'.format(output, source)
-        return self.cmdExec(self.backends.mediainfo, args, True, True)
+        report = self.cmdExec(self.backends.mediainfo, args, True, True, timeout=VideoService.queryTimeout)
+        if len(report):
+            VideoService.metadataStore().put(kind, source, report)
+        return report
+
+    def mediainfoData(self, source: str) -> Optional[Munch]:
+        """
+        Structured mediainfo report of source, the media object of its JSON output, None when it is not readable
+        """
+        try:
+            return Munch.fromDict(loads(self.mediainfo(source, 'JSON'))).media
+        except (JSONDecodeError, AttributeError):
+            self.logger.exception('Could not read mediainfo JSON report of {}'.format(source))
+            return None
+
+    def mediainfoVersion(self) -> str:
+        """
+        Version line of mediainfo, cached with the identity of the mediainfo binary
+        """
+        cache = VideoService.metadataStore()
+        version = cache.get('mediainfo.version', self.backends.mediainfo)
+        if version is None:
+            result = self.cmdExec(self.backends.mediainfo, '--version', True, timeout=VideoService.queryTimeout)
+            lines = result.split('\n')
+            version = lines[1].strip() if len(lines) >= 2 else ''
+            if len(version):
+                cache.put('mediainfo.version', self.backends.mediainfo, version)
+        return version
+
+    def prefetchMediainfo(self, source: str) -> None:
+        """
+        Produce the mediainfo reports of source in the background, so the media information dialog opens at once
+        """
+        if not self.backends.mediainfo:
+            return
+        cache = VideoService.metadataStore()
+        self.reports.clear()
+        for output in VideoService.mediainfoOutputs:
+            kind = 'mediainfo.{}'.format(output.lower())
+            if cache.get(kind, source) is None:
+                job = self.runner.submit(self.backends.mediainfo, ['--output={}'.format(output), source],
+                                         workdir=VideoService.getAppPath(), timeout=VideoService.queryTimeout)
+                job.future.add_done_callback(partial(VideoService.storeReport, kind, source))
+                self.reports[(kind, fileIdentity(source))] = job
+
+    @staticmethod
+    def storeReport(kind: str, source: str, future: Future) -> None:
+        if future.cancelled():
+            return
+        result = future.result()
+        if result.ok and len(result.output):
+            VideoService.metadataStore().put(kind, source, result.text())
 
     def cmdExec(self, cmd: str, args: str=None, output: bool=False, suppresslog: bool=False, workdir: str=None,
-                mergechannels: bool=True):
-        if self.proc.state() == QProcess.NotRunning:
-            if cmd == self.backends.mediainfo or not mergechannels:
-                self.proc.setProcessChannelMode(QProcess.SeparateChannels)
-            if cmd in {self.backends.ffmpeg, self.backends.ffprobe}:
-                args = '-hide_banner {}'.format(args)
-            if os.getenv('DEBUG', False) or getattr(self.parent, 'verboseLogs', False):
-                self.logger.info('{0} {1}'.format(cmd, args if args is not None else ''))
-            self.proc.setWorkingDirectory(workdir if workdir is not None else VideoService.getAppPath())
-            self.proc.start(cmd, shlex.split(args))
-            self.proc.readyReadStandardOutput.connect(
-                partial(self.cmdOut, self.proc.readAllStandardOutput().data().decode().strip()))
-            self.proc.waitForFinished(-1)
-            if cmd == self.backends.mediainfo or not mergechannels:
-                self.proc.setProcessChannelMode(QProcess.MergedChannels)
-            if output:
-                cmdoutput = self.proc.readAllStandardOutput().data().decode().strip()
-                if getattr(self.parent, 'verboseLogs', False) and not suppresslog:
-                    self.logger.info('cmd output: {}'.format(cmdoutput))
-                return cmdoutput
-            return self.proc.exitStatus() == QProcess.NormalExit and self.proc.exitCode() == 0
-        return False
+                mergechannels: bool=True, timeout: float=None):
+        """
+        Run cmd on the process runner and wait for it, other commands may run at the same time. Returns the stdout
+        text with output, whether the command succeeded otherwise.
+        """
+        if cmd in {self.backends.ffmpeg, self.backends.ffprobe}:
+            args = '-hide_banner {}'.format(args)
+        verbose = os.getenv('DEBUG', False) or getattr(self.parent, 'verboseLogs', False)
+        if verbose:
+            self.logger.info('{0} {1}'.format(cmd, args if args is not None else ''))
+        result = self.runner.run(cmd, shlex.split(args) if args is not None else [],
+                                 workdir=workdir if workdir is not None else VideoService.getAppPath(),
+                                 timeout=timeout, mergeChannels=mergechannels and cmd != self.backends.mediainfo,
+                                 onStdout=self.cmdOut if verbose and not output else None)
+        if result.timedOut:
+            self.logger.error('{0} timed out after {1} s'.format(cmd, timeout))
+        elif result.error is not None:
+            self.cmdError(result.error, result.errorString)
+        if output:
+            cmdoutput = result.text()
+            if getattr(self.parent, 'verboseLogs', False) and not suppresslog:
+                self.logger.info('cmd output: {}'.format(cmdoutput))
+            return cmdoutput
+        return result.ok
 
-    @pyqtSlot(str)
     def cmdOut(self, output: str) -> None:
+        output = output.strip()
         if len(output):
             self.logger.info(output)
 
-    @pyqtSlot(QProcess.ProcessError)
-    def cmdError(self, error: QProcess.ProcessError) -> None:
+    def cmdError(self, error: QProcess.ProcessError, message: str) -> None:
         if error != QProcess.Crashed:
             QMessageBox.critical(self.parent, 'Error alert',
-                                 '<h4>{0} Error:</h4><p>{1}</p>'.format(self.backends.ffmpeg, self.proc.errorString()),
+                                 '<h4>{0} Error:</h4><p>{1}</p>'.format(self.backends.ffmpeg, message),
                                  buttons=QMessageBox.Close)
 
     # noinspection PyUnresolvedReferences, PyProtectedMember
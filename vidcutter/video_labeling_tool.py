@@ -3,16 +3,14 @@
 import logging
 import os
 import sys
-import pickle
-import shutil
 from datetime import timedelta
 from functools import partial
 from typing import Callable, List, Optional, Union
-from sortedcontainers import SortedList
+from sortedcontainers import SortedKeyList
 
 import sip
 from PyQt5.QtCore import (pyqtSignal, pyqtSlot, QBuffer, QByteArray, QDir, QFile, QFileInfo, QPoint, QSize, Qt, QTime, QTimer, QUrl)
-from PyQt5.QtGui import QDesktopServices, QFont, QFontDatabase, QIcon, QKeyEvent, QPixmap, QShowEvent
+from PyQt5.QtGui import QDesktopServices, QFont, QFontDatabase, QIcon, QImage, QKeyEvent, QPixmap, QShowEvent
 from PyQt5.QtWidgets import (QAction, qApp, QApplication, QDialog, QFileDialog, QFrame, QGroupBox, QHBoxLayout, QLabel, QListWidgetItem, QMainWindow, QMenu, QMessageBox, QPushButton, QSizePolicy, QStyleFactory,
                              QVBoxLayout, QWidget, QScrollArea)
 
@@ -23,23 +21,38 @@ from vidcutter.widgets.dialogs.change_log import Changelog
 from vidcutter.widgets.dialogs.media_info import MediaInfo
 from vidcutter.media_stream import StreamSelector
 from vidcutter.widgets.dialogs.settings import SettingsDialog
+from vidcutter.widgets.dialogs.statistics_dialog import StatisticsDialog
 from vidcutter.widgets.dialogs.updater import Updater
 from vidcutter.widgets.video_clips_list_widget import VideoClipsListWidget
 from vidcutter.data_structures.video_style import VideoStyleDark, VideoStyleLight
 
 from vidcutter.libs.config import Config, InvalidMediaException, VideoFilter
+from vidcutter.libs.filmstrip import Filmstrip
+from vidcutter.libs.mediaindex import MediaIndex
 from vidcutter.libs.mpvwidget import mpvWidget
 from vidcutter.libs.notifications import JobCompleteNotification
+from vidcutter.libs.projectsaver import ProjectSaver
+from vidcutter.libs.spritesheet import SpriteSheet
 from vidcutter.libs.taskbarprogress import TaskbarProgress
+from vidcutter.libs.thumbnailworkers import ThumbnailRequest, ThumbnailWorkers
 from vidcutter.libs.videoservice import VideoService
 from vidcutter.libs.widgets import (VCBlinkText, VCDoubleInputDialog, VCFilterMenuAction, VCFrameCounter, VCMessageBox,
                                     VCProgressDialog, VCTimeCounter, VCToolBarButton, VCToolBarComboBox, VCVolumeSlider, VCConfirmDialog)
 
+from vidcutter.data_structures.dataset_statistics import DatasetStatistics
 from vidcutter.data_structures.video_item_clip import VideoItemClip
+from vidcutter.data_structures.video_item import sortedClips
+try:
+    from vidcutter.data_structures.clip_table import ClipTable
+except ImportError:
+    ClipTable = None
+from vidcutter.data_structures.project_database import ProjectDatabase
+from vidcutter.data_structures.project_journal import ProjectJournal
+from vidcutter.data_structures.qt_adapter import msecsToQTime, qtimeToMsecs
+from vidcutter.data_structures.thumbnail_pack import ThumbnailPack
 
 from vidcutter.widgets.video_list_widget import VideoListWidget
 from vidcutter.widgets.scalable_timeline_widget import ScalableTimeLine
-from vidcutter.data_structures.qpixmap_pickle import QPixmapPickle
 from vidcutter.widgets.dialogs.video_info_dialog import VideoDescriptionDialog
 
 
@@ -47,6 +60,7 @@ class VideoLabelingTool(QWidget):
     errorOccurred = pyqtSignal(str)
     timeformat = 'hh:mm:ss.zzz'
     runtimeformat = 'hh:mm:ss'
+    autosaveInterval = 5000  # msecs
 
     def __init__(self, parent: QMainWindow):
         super(VideoLabelingTool, self).__init__(parent)
@@ -63,7 +77,6 @@ class VideoLabelingTool(QWidget):
         self.fonts = []
         self._dataFolder = ''
         self._dataFilename = 'data.pickle'
-        self._dataFilenameTemp = 'data.pickle.tmp'
         self.folderOpened = False
         self.duration = 0
 
@@ -73,12 +86,29 @@ class VideoLabelingTool(QWidget):
         self.videoListWidget = VideoListWidget(parent=self)
         self.videoListWidget.itemDoubleClicked.connect(self.loadMedia)
         self.videoListWidget.itemClicked.connect(self.editVideoDescription)
+        self.mediaIndex = MediaIndex(self.settings, self)
+        self.videoListWidget.setMediaIndex(self.mediaIndex)
 
         self.videoList = None
+        self.projectStore = None
+        self.statistics = None
+        self.thumbnailPack = None
+        self.projectSaver = ProjectSaver()
+        self.projectSaver.finished.connect(self.on_projectSaverFinished)
+        self.projectSaver.progress.connect(lambda value: self.taskbar.setProgress(value / 100, value < 100))
+        self.thumbnailWorkers = ThumbnailWorkers(self.settings, self)
+        self.thumbnailWorkers.thumbnailReady.connect(self.on_thumbnailReady)
+        self.filmstrip = Filmstrip(self.settings, self)
+        self.spriteSheet = SpriteSheet(self.settings, self)
+        self.autosaveTimer = QTimer(self)
+        self.autosaveTimer.setInterval(self.autosaveInterval)
+        self.autosaveTimer.timeout.connect(self.autosaveProject)
 
         self.scalableTimeline = ScalableTimeLine(self)
         self.scalableTimeline.initAttributes()
         self.scalableTimeline.timeline.sliderMoved.connect(self.setPosition)
+        self.scalableTimeline.setFilmstrip(self.filmstrip)
+        self.scalableTimeline.setSpriteSheet(self.spriteSheet)
 
         self.sliderWidgetScroll = QScrollArea()
         self.sliderWidgetScroll.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
@@ -326,7 +356,7 @@ class VideoLabelingTool(QWidget):
     def setTimelineSize(self):
         windowSize = self.parent.size()
         self.scalableTimeline.setFixedWidth(windowSize.width() - 20)
-        self.scalableTimeline.setFixedHeight(101)
+        self.scalableTimeline.setFixedHeight(140)
 
     def clip(self, val, min_, max_):
         return min_ if val < min_ else max_ if val > max_ else val
@@ -474,6 +504,7 @@ class VideoLabelingTool(QWidget):
         self.aboutAction = QAction('About {}'.format(qApp.applicationName()), self, triggered=self.aboutApp, statusTip='About {}'.format(qApp.applicationName()))
         self.keyRefAction = QAction(self.keyRefIcon, 'Keyboard shortcuts', self, triggered=self.showKeyRef, statusTip='View shortcut key bindings')
         self.settingsAction = QAction(self.settingsIcon, 'Settings', self, triggered=self.showSettings, statusTip='Configure application settings')
+        self.statisticsAction = QAction(self.mediaInfoIcon, 'Dataset statistics', self, triggered=self.showStatistics, statusTip='View annotation statistics of the dataset', enabled=False)
         self.fullscreenAction = QAction(self.changelogIcon, 'Toggle fullscreen', self, triggered=self.toggleFullscreen, statusTip='Toggle fullscreen display mode', enabled=False)
         self.toggleConsoleAction = QAction(self.changelogIcon, 'Toggle console', self, triggered=self.toggleConsole, statusTip='Toggle console', enabled=True)
         self.quitAction = QAction(self.quitIcon, 'Quit', self, triggered=self.parent.close, statusTip='Quit the application')
@@ -493,6 +524,7 @@ class VideoLabelingTool(QWidget):
         return menu
 
     def _initMenus(self) -> None:
+        self.applicationMenu.addAction(self.statisticsAction)
         self.applicationMenu.addAction(self.settingsAction)
         self.applicationMenu.addSeparator()
         self.applicationMenu.addMenu(self.helpMenu)
@@ -598,14 +630,21 @@ class VideoLabelingTool(QWidget):
         self.clipIndexContextmenu.exec_(globalPos)
 
 
-    def on_editChapter(self, index: int, timeStart: QTime, timeEnd: QTime, clipName: str) -> None:
+    def on_editChapter(self, index: int, timeStart: int, timeEnd: int, clipName: str) -> None:
         if timeEnd < timeStart:
-            timeEnd = timeStart.addSecs(1)
-        self.videoList.setCurrentVideoClipIndex(index)
-        self.videoList.setCurrentVideoClipStartTime(timeStart)
-        self.videoList.setCurrentVideoClipEndTime(timeEnd)
-        self.videoList.setCurrentVideoClipName(clipName)
-        self.videoList.setCurrentVideoClipThumbnail(self.captureImage(self.currentMedia, timeStart))
+            timeEnd = timeStart + 1000
+        video = self.videoList.videos[self.videoList.currentVideoIndex]
+        # clips are sorted by start time, edit the clip out of the list and re-add it, as the timeline does on release
+        clip = video.clips.pop(index)
+        clip.timeStart = timeStart
+        clip.timeEnd = timeEnd
+        clip.name = clipName
+        clipIndex = video.clips.bisect_right(clip)
+        video.clips.add(clip)
+        self.videoList.setCurrentVideoClipIndex(clipIndex)
+        # stores take the index before the change and look the re-sorted clip up, so they are told after re-adding
+        self.projectStore.clipUpdated(self.videoList.currentVideoIndex, index, timeStart=timeStart, timeEnd=timeEnd, name=clipName)
+        self.requestThumbnail(self.videoList.currentVideoIndex, video.clips[clipIndex])
         self.renderVideoClips()
 
     def moveItemUp(self) -> None:
@@ -633,7 +672,12 @@ class VideoLabelingTool(QWidget):
         elif len(self.videoList.videos[self.videoList.currentVideoIndex].clips) == 0:
             self.initMediaControls(False)
 
+        # cancel with the clip as requested, a ClipTable pops a copy of its row
+        self.thumbnailWorkers.cancel(self.videoList.videos[self.videoList.currentVideoIndex].clips[index],
+                                     self.videoList.currentVideoIndex)
         self.videoList.videos[self.videoList.currentVideoIndex].clips.pop(index)
+        self.videoList.videos[self.videoList.currentVideoIndex].markDirty()
+        self.projectStore.clipRemoved(self.videoList.currentVideoIndex, index)
         self.videoClipsList.takeItem(index)
         self.renderVideoClips()
 
@@ -642,26 +686,29 @@ class VideoLabelingTool(QWidget):
         dialog.accepted.connect(lambda: self.on_clearList())
         dialog.exec_()
 
-    def toggleClipsVisibility(self) -> None:
-        for index_clip in range(len(self.videoList.videos[self.videoList.currentVideoIndex].clips)):
-            new_visibility = 2 - self.videoList.videos[self.videoList.currentVideoIndex].clips[index_clip].visibility
-            self.videoList.videos[self.videoList.currentVideoIndex].clips[index_clip].visibility = new_visibility
+    def setClipsVisibility(self, visibility: Optional[int]) -> None:
+        # one record for all clips of the video, None inverts the visibility of every clip
+        self.videoList.videos[self.videoList.currentVideoIndex].setClipsVisibility(visibility)
+        self.projectStore.clipsVisibilityChanged(self.videoList.currentVideoIndex, visibility)
         self.renderVideoClips()
 
+    def toggleClipsVisibility(self) -> None:
+        self.setClipsVisibility(None)
+
     def turnClipsVisibilityOn(self) -> None:
-        for index_clip in range(len(self.videoList.videos[self.videoList.currentVideoIndex].clips)):
-            self.videoList.videos[self.videoList.currentVideoIndex].clips[index_clip].visibility = 2
-        self.renderVideoClips()
+        self.setClipsVisibility(2)
 
     def turnClipsVisibilityOff(self) -> None:
-        for index_clip in range(len(self.videoList.videos[self.videoList.currentVideoIndex].clips)):
-            self.videoList.videos[self.videoList.currentVideoIndex].clips[index_clip].visibility = 0
-        self.renderVideoClips()
+        self.setClipsVisibility(0)
 
     def on_clearList(self) -> None:
         # self.clipTimes.clear()
         self.videoClipsList.clear()
+        for clip in self.videoList.videos[self.videoList.currentVideoIndex].clips:
+            self.thumbnailWorkers.cancel(clip, self.videoList.currentVideoIndex)
         self.videoList.videos[self.videoList.currentVideoIndex].clips.clear()
+        self.videoList.videos[self.videoList.currentVideoIndex].markDirty()
+        self.projectStore.clipsCleared(self.videoList.currentVideoIndex)
 
         if self.mediaAvailable:
             self.inCut = False
@@ -700,15 +747,28 @@ class VideoLabelingTool(QWidget):
                 return
 
         self._dataFolder = QFileDialog.getExistingDirectory(parent=self.parent, caption='Select Folder', directory=QDir.currentPath())
-        filepath = os.path.join(self._dataFolder, self._dataFilename)
-        with open(filepath, 'rb') as f:
-            self.videoList = pickle.load(f)
-            self.scalableTimeline.timeline.videoListRef = self.videoList
+        self.closeProject()
+        if ProjectDatabase.exists(self._dataFolder):
+            self.projectStore = ProjectDatabase(self._dataFolder)
+        else:
+            self.projectStore = ProjectJournal(self._dataFolder, self._dataFilename, self.projectSaver)
+        self.thumbnailPack = ThumbnailPack(self._dataFolder)
+        self.videoList = self.projectStore.load()
+        self.scalableTimeline.timeline.videoListRef = self.videoList
+        # projects saved before the thumbnail pack existed carry pixel data, move it out once and rewrite the snapshot
+        if self.thumbnailPack.migrate(self.videoList) or self.projectStore.needsCompaction():
+            self.projectStore.compact(self.videoList)
+        self.videoList.clearDirty(range(len(self.videoList.videos)))
+        self.statistics = DatasetStatistics(self.videoList, self.projectStore)
+        self.projectStore.statistics = self.statistics
+        self.statisticsAction.setEnabled(True)
+        self.autosaveTimer.start()
 
         self.scalableTimeline.setUpdatesEnabled(True)
         self.videoClipsList.clear()
 
         self.videoListWidget.renderList(self.videoList)
+        self.mediaIndex.open(self._dataFolder, [video.filename for video in self.videoList.videos])
         self.videoLayout.replaceWidget(self.videoPlayerWidget, self.novideoWidget)
         self.frameCounter.hide()
         self.timeCounter.hide()
@@ -721,8 +781,22 @@ class VideoLabelingTool(QWidget):
         if self._dataFolder is not None:
             self.lastFolder = QFileInfo(self._dataFolder).absolutePath()
 
+    def closeProject(self) -> None:
+        self.thumbnailWorkers.cancelAll()
+        self.autosaveTimer.stop()
+        self.autosaveProject()
+        if self.projectStore is not None:
+            self.projectStore.close()
+            self.projectStore = None
+        self.statistics = None
+        self.statisticsAction.setEnabled(False)
+        if self.thumbnailPack is not None:
+            self.thumbnailPack.close()
+            self.thumbnailPack = None
+
     def loadMedia(self, item) -> None:
-        item_index = self.videoListWidget.row(item)
+        # rows may be sorted and filtered, the video index is item data
+        item_index = item.data(Qt.UserRole + 1) - 1
         # self.videoList.deleteCurrentVideoClipsThumbs()
         self.videoList.currentVideoIndex = item_index
         if not self.folderOpened:
@@ -736,6 +810,7 @@ class VideoLabelingTool(QWidget):
         filepath = self.videoList.currentVideoFilepath(self._dataFolder)
         if not os.path.isfile(filepath):
             return
+        self.mediaIndex.refresh(self.videoList.videos[item_index].filename)
         self.currentMedia = filepath
         self.projectDirty, self.projectSaved = False, False
         self.scalableTimeline.setEnabled(False)
@@ -747,7 +822,14 @@ class VideoLabelingTool(QWidget):
         # self.parent.setWindowTitle('{0} - {1}'.format(str(item_index), os.path.basename(self.currentMedia)))
 
         try:
-            self.videoList.videos[self.videoList.currentVideoIndex].clips = SortedList(self.videoList.videos[self.videoList.currentVideoIndex].clips)
+            self.projectStore.loadClips(self.videoList, self.videoList.currentVideoIndex)
+            clips = self.videoList.videos[self.videoList.currentVideoIndex].clips
+            if ClipTable is not None and len(clips) >= ClipTable.minimumClips:
+                # long annotated videos, vectorized timeline and statistics queries
+                clips = ClipTable(clips) if not isinstance(clips, ClipTable) else clips
+            else:
+                clips = sortedClips(clips)
+            self.videoList.videos[self.videoList.currentVideoIndex].clips = clips
             self.mpvWidget.setEnabled(True)
             self.mpvWidget.play(self.currentMedia)
             self.videoService.setMedia(self.currentMedia)
@@ -778,32 +860,53 @@ class VideoLabelingTool(QWidget):
 
         # self.mpvWidget.mpv.playbackSpeed(4.0)
 
-    def buildClipsThumbnails(self, clips: SortedList[VideoItemClip]):
-        for clip in clips:
-            clip.thumbnail = self.captureImage(self.currentMedia, clip.timeStart)
+    def buildClipsThumbnails(self, clips: SortedKeyList[VideoItemClip]):
+        thumbnailKeys = self.captureThumbnails(self.currentMedia, [clip.timeStart for clip in clips])
+        for clip, thumbnailKey in zip(clips, thumbnailKeys):
+            clip.thumbnailKey = thumbnailKey
+
+    def autosaveProject(self) -> None:
+        """
+        Persist videos changed since the last autosave, called by autosaveTimer and before the project is closed.
+        """
+        if self.projectStore is None or self.videoList is None:
+            return
+        dirtyVideosIndexes = self.videoList.dirtyVideosIndexes()
+        if not len(dirtyVideosIndexes):
+            return
+        try:
+            self.projectStore.saveVideos(self.videoList, dirtyVideosIndexes)
+            self.videoList.clearDirty(dirtyVideosIndexes)
+        except OSError:
+            self.logger.exception('Autosave failed')
+            self.showText('project autosave failed')
 
     def saveProject(self, reboot: bool = False) -> None:
-        if self.projectSaved:
+        # every edit is already appended to the project journal, saving only folds a long journal into data.pickle
+        if self.projectSaved or self.projectStore is None:
             return
-        self.parent.setEnabled(False)
-        data_filepath_temporary = os.path.join(self._dataFolder, self._dataFilenameTemp)
-        data_filepath = os.path.join(self._dataFolder, self._dataFilename)
         try:
-            with open(data_filepath_temporary, 'wb') as f:
-                pickle.dump(self.videoList, f)
-            shutil.copy(data_filepath_temporary, data_filepath)
+            self.autosaveProject()
+            if self.projectStore.needsCompaction():
+                self.projectStore.compact(self.videoList)
             if not reboot:
                 self.showText('project file saved')
             self.projectSaved = True
         except OSError:
             self.showText('project save failed')
-        self.parent.setEnabled(True)
-        qApp.restoreOverrideCursor()
+
+    @pyqtSlot(bool, str)
+    def on_projectSaverFinished(self, saved: bool, message: str) -> None:
+        if saved:
+            self.logger.info('project snapshot written to {}'.format(message))
+        else:
+            self.showText('project save failed')
 
     def editVideoDescription(self):
-        index = self.videoListWidget.currentRow()
+        item = self.videoListWidget.currentItem()
         modifierPressed = QApplication.keyboardModifiers()
-        if (modifierPressed & Qt.ControlModifier) == Qt.ControlModifier:
+        if item is not None and (modifierPressed & Qt.ControlModifier) == Qt.ControlModifier:
+            index = item.data(Qt.UserRole + 1) - 1
             self.videoList.setCurrentVideoIndex(index)
             issueClasses = self.videoList.video_issues_classes
             checkedIssues = self.videoList.videos[index].issues
@@ -815,6 +918,8 @@ class VideoLabelingTool(QWidget):
     def on_editVideoDescription(self, index, issuesList, description):
         self.videoList.videos[index].issues = issuesList
         self.videoList.videos[index].description = description
+        self.videoList.videos[index].markDirty()
+        self.projectStore.videoUpdated(index, issues=issuesList, description=description)
         self.projectSaved = False
         self.saveProjectAction.setEnabled(True)
         self.toolbarSave.setEnabled(True)
@@ -842,7 +947,7 @@ class VideoLabelingTool(QWidget):
         playState = self.mpvWidget.property('pause')
         self.clipIsPlaying = True
         self.clipIsPlayingIndex = index
-        clipStartSeconds = 1e-3 * self.videoList.videos[self.videoList.currentVideoIndex].clips[index].timeStart.msecsSinceStartOfDay()
+        clipStartSeconds = self.videoList.videos[self.videoList.currentVideoIndex].clips[index].timeStartSeconds
         self.setPosition(clipStartSeconds)
         if playState:
             self.setPlayButton(True)
@@ -868,6 +973,8 @@ class VideoLabelingTool(QWidget):
         else:
             self.scalableTimeline.setValue(0)
             self.scalableTimeline.setDuration(0)
+            self.filmstrip.clear()
+            self.spriteSheet.clear()
             self.timeCounter.reset()
             self.frameCounter.reset()
         self.saveProjectAction.setEnabled(False)
@@ -893,7 +1000,7 @@ class VideoLabelingTool(QWidget):
             self.timeCounter.setTime(self.delta2QTime(round(progress)).toString(self.timeformat))
             self.frameCounter.setFrame(frame)
             if self.clipIsPlayingIndex >= 0:
-                currentClipEnd = QTime(0, 0, 0).msecsTo(self.videoList.videos[self.videoList.currentVideoIndex].clips[self.clipIsPlayingIndex].timeEnd)
+                currentClipEnd = self.videoList.videos[self.videoList.currentVideoIndex].clips[self.clipIsPlayingIndex].timeEnd or 0
                 if progress > currentClipEnd:
                     self.playMedia()
                     self.clipIsPlaying = False
@@ -904,6 +1011,8 @@ class VideoLabelingTool(QWidget):
         self.duration = duration
         self.scalableTimeline.setDuration(duration)
         self.scalableTimeline.factor = 1
+        self.filmstrip.setSource(self.currentMedia, duration)
+        self.spriteSheet.setSource(self.currentMedia, duration)
         self.setPosition(0.0)
         self.timeCounter.setDuration(self.delta2QTime(round(duration * 1000)).toString(self.timeformat))
         self.frameCounter.setFrameCount(frames)
@@ -916,6 +1025,7 @@ class VideoLabelingTool(QWidget):
             itemIndex = self.videoClipsList.row(item)
             itemState = item.checkState()
             self.videoList.videos[self.videoList.currentVideoIndex].clips[itemIndex].visibility = itemState
+            self.projectStore.clipUpdated(self.videoList.currentVideoIndex, itemIndex, visibility=itemState)
             self.renderVideoClips()
         except Exception:
             self.doPass()
@@ -927,6 +1037,7 @@ class VideoLabelingTool(QWidget):
             itemIndex = self.videoClipsList.row(item)
             itemState = item.checkState()
             self.videoList.videos[self.videoList.currentVideoIndex].clips[itemIndex].visibility = itemState
+            self.projectStore.clipUpdated(self.videoList.currentVideoIndex, itemIndex, visibility=itemState)
             self.scalableTimeline.setRegionVizivility(itemIndex, itemState)
             self.scalableTimeline.repaint()
 
@@ -937,8 +1048,7 @@ class VideoLabelingTool(QWidget):
             modifierPressed = QApplication.keyboardModifiers()
             row = self.videoClipsList.currentRow()
             if (modifierPressed & Qt.ShiftModifier) == Qt.ShiftModifier:
-                clipQTimeStart = self.videoList.videos[self.videoList.currentVideoIndex].clips[row].timeStart
-                clipStartSeconds = 1e-3 * clipQTimeStart.msecsSinceStartOfDay()
+                clipStartSeconds = self.videoList.videos[self.videoList.currentVideoIndex].clips[row].timeStartSeconds
                 self.setPosition(clipStartSeconds)
             elif (modifierPressed & Qt.AltModifier) == Qt.AltModifier:
                 self.playMediaTimeClip(row)
@@ -951,8 +1061,7 @@ class VideoLabelingTool(QWidget):
         indexRow = self.videoClipsList.currentRow()
         modifierPressed = QApplication.keyboardModifiers()
         if (modifierPressed & Qt.ShiftModifier) == Qt.ShiftModifier:
-            clipQTimeEnd = self.videoList.videos[self.videoList.currentVideoIndex].clips[indexRow].timeEnd
-            clipEndSeconds = 1e-3 * clipQTimeEnd.msecsSinceStartOfDay()
+            clipEndSeconds = self.videoList.videos[self.videoList.currentVideoIndex].clips[indexRow].timeEndSeconds
             self.setPosition(clipEndSeconds)
 
     def muteAudio(self) -> None:
@@ -994,8 +1103,15 @@ class VideoLabelingTool(QWidget):
 
     @pyqtSlot(list)
     def addScenes(self, scenes: List[list]) -> None:
+        # scenes are QTime intervals detected by VideoService.blackdetect
+        scenes = [[qtimeToMsecs(time) for time in scene] for scene in scenes if len(scene)]
         if len(scenes):
-            [self.videoList.videos[self.videoList.currentVideoIndex].clipAppend(VideoItemClip(scene[0], scene[1], self.captureImage(self.currentMedia, scene[0]), '', 2)) for scene in scenes if len(scene)]
+            thumbnailKeys = self.captureThumbnails(self.currentMedia, [scene[0] for scene in scenes])
+            for scene, thumbnailKey in zip(scenes, thumbnailKeys):
+                clip = VideoItemClip(scene[0], scene[1], thumbnailKey, '', 2)
+                self.videoList.videos[self.videoList.currentVideoIndex].clips.add(clip)
+                self.videoList.videos[self.videoList.currentVideoIndex].markDirty()
+                self.projectStore.clipAdded(self.videoList.currentVideoIndex, clip)
             self.renderVideoClips()
         self.filterProgressBar.done(VCProgressDialog.Accepted)
 
@@ -1036,16 +1152,20 @@ class VideoLabelingTool(QWidget):
         self.filterProgressBar.show()
 
     def clipStart(self) -> None:
-        startTime = self.delta2QTime(self.scalableTimeline.value())
+        startTime = round(self.scalableTimeline.value() * 1000)
         clipsNumber = len(self.videoList.videos[self.videoList.currentVideoIndex].clips)
         defaultClipName = 'Other'
 
-        clip = VideoItemClip(startTime, QTime(), self.captureImage(self.currentMedia, startTime), defaultClipName, 0)
+        # the thumbnail is captured in the background, the clips list shows a placeholder until it arrives
+        clip = VideoItemClip(startTime, None, '', defaultClipName, 0)
         bisect_index = self.videoList.videos[self.videoList.currentVideoIndex].clips.bisect_right(clip)
         self.videoList.videos[self.videoList.currentVideoIndex].bisect_index = bisect_index
         self.videoList.videos[self.videoList.currentVideoIndex].clips.add(clip)
+        self.videoList.videos[self.videoList.currentVideoIndex].markDirty()
+        self.projectStore.clipAdded(self.videoList.currentVideoIndex, clip)
+        self.requestThumbnail(self.videoList.currentVideoIndex, self.videoList.videos[self.videoList.currentVideoIndex].clips[bisect_index])
 
-        self.timeCounter.setMinimum(startTime.toString(self.timeformat))
+        self.timeCounter.setMinimum(msecsToQTime(startTime).toString(self.timeformat))
         self.frameCounter.lockMinimum()
 
         self.toolbarStart.setDisabled(True)
@@ -1063,9 +1183,10 @@ class VideoLabelingTool(QWidget):
         # item = self.clipTimes[len(self.clipTimes) - 1]
         # clip_item_last = self.videoList.videos[self.videoList.currentVideoIndex].bisect_index  # .clipsLast()
         bisect_index = self.videoList.videos[self.videoList.currentVideoIndex].bisect_index
-        time_end = self.delta2QTime(self.scalableTimeline.value())
+        time_end = round(self.scalableTimeline.value() * 1000)
         self.videoList.videos[self.videoList.currentVideoIndex].clips[bisect_index].timeEnd = time_end
         self.videoList.videos[self.videoList.currentVideoIndex].clips[bisect_index].visibility = 2
+        self.projectStore.clipUpdated(self.videoList.currentVideoIndex, bisect_index, timeEnd=time_end, visibility=2)
 
         self.toolbarStart.setEnabled(True)
         self.toolbarEnd.setDisabled(True)
@@ -1110,7 +1231,7 @@ class VideoLabelingTool(QWidget):
         if len(self.videoList.videos[self.videoList.currentVideoIndex].clips) and not self.inCut:
             self.toolbarSave.setEnabled(True)
             self.saveProjectAction.setEnabled(True)
-        if self.inCut or len(self.videoList.videos[self.videoList.currentVideoIndex].clips) == 0 or self.videoList.videos[self.videoList.currentVideoIndex].clips[0].timeEnd.isNull():
+        if self.inCut or len(self.videoList.videos[self.videoList.currentVideoIndex].clips) == 0 or self.videoList.videos[self.videoList.currentVideoIndex].clips[0].timeEnd is None:
             self.toolbarSave.setEnabled(False)
             self.saveProjectAction.setEnabled(False)
         # self.setRunningTime(self.delta2QTime(self.totalRuntime).toString(self.runtimeformat))
@@ -1133,10 +1254,69 @@ class VideoLabelingTool(QWidget):
         else:
             return '%f' % (td.days * 86400 + td.seconds + td.microseconds / 1000000.)
 
-    def captureImage(self, source: str, frametime: QTime, external: bool = False) -> QPixmapPickle:
-        thumbnail = VideoService.captureFrame(self.settings, source, frametime.toString(self.timeformat),
-                                              external=external, thumbsize=QSize(64, 64))
-        return QPixmapPickle(thumbnail)
+    def captureImage(self, source: str, frametime: QTime, external: bool = False) -> QPixmap:
+        return VideoService.captureFrame(self.settings, source, frametime.toString(self.timeformat),
+                                         external=external, thumbsize=QSize(64, 64))
+
+    def captureThumbnail(self, source: str, frametime: int) -> str:
+        """
+        Capture a clip thumbnail at frametime milliseconds into the project thumbnail pack and return its key
+        """
+        return self.thumbnailPack.add(self.captureImage(source, msecsToQTime(frametime)))
+
+    def requestThumbnail(self, videoIndex: int, clip: VideoItemClip) -> None:
+        """
+        Capture the thumbnail of a clip at its start time without blocking, see on_thumbnailReady. When the clip starts
+        at the frame on screen, the frame decoded by mpv is used and ffmpeg is not started at all.
+        """
+        if self.isCurrentFrame(clip.timeStart):
+            image = self.mpvWidget.grabFrame(QSize(64, 64))
+            if not image.isNull():
+                self.thumbnailWorkers.cancel(clip, videoIndex)
+                self.on_thumbnailReady(ThumbnailRequest(clip, videoIndex, clip.timeStart), image, True)
+                return
+        self.thumbnailWorkers.request(clip, videoIndex, clip.timeStart, self.currentMedia,
+                                      msecsToQTime(clip.timeStart).toString(self.timeformat), QSize(64, 64))
+
+    def isCurrentFrame(self, msecs: int) -> bool:
+        if not self.mediaAvailable:
+            return False
+        try:
+            position = self.mpvWidget.property('time-pos')
+        except self.mpvWidget.mpvError:
+            return False
+        return position is not None and abs(round(position * 1000) - msecs) <= 1
+
+    @pyqtSlot(ThumbnailRequest, QImage, bool)
+    def on_thumbnailReady(self, request: ThumbnailRequest, image: QImage, exact: bool) -> None:
+        """
+        Store a captured clip thumbnail. A keyframe preview is stored like the exact image, the exact one replaces it
+        when it arrives.
+        """
+        if self.videoList is None or self.thumbnailPack is None or request.videoIndex >= len(self.videoList.videos):
+            return
+        clip = request.target
+        if clip.timeStart != request.msecs:
+            return
+        try:
+            clipIndex = self.videoList.videos[request.videoIndex].clips.index(clip)
+        except ValueError:
+            # the clip was deleted meanwhile
+            return
+        thumbnailKey = self.thumbnailPack.add(image)
+        clip.thumbnailKey = thumbnailKey
+        self.projectStore.clipUpdated(request.videoIndex, clipIndex, thumbnailKey=thumbnailKey)
+        if request.videoIndex == self.videoList.currentVideoIndex:
+            self.videoClipsList.setClipThumbnail(clipIndex, thumbnailKey)
+
+    def captureThumbnails(self, source: str, frametimes: List[int]) -> List[str]:
+        """
+        Batched captureThumbnail, frametimes are milliseconds
+        """
+        pixmaps = VideoService.captureFrames(self.settings, source,
+                                             [msecsToQTime(frametime).toString(self.timeformat) for frametime in frametimes],
+                                             thumbsize=QSize(64, 64))
+        return [self.thumbnailPack.add(pixmap) for pixmap in pixmaps]
 
     def complete(self, rename: bool = True, filename: str = None) -> None:
         if rename and filename is not None:
@@ -1180,6 +1360,12 @@ class VideoLabelingTool(QWidget):
     def saveSetting(self, setting: str, checked: bool) -> None:
         self.settings.setValue(setting, 'on' if checked else 'off')
 
+    @pyqtSlot()
+    def showStatistics(self) -> None:
+        if self.statistics is not None:
+            statisticsDialog = StatisticsDialog(self.statistics, self)
+            statisticsDialog.show()
+
     @pyqtSlot()
     def mediaInfo(self) -> None:
         if self.mediaAvailable:
@@ -93,10 +93,8 @@ class MediaInfo(QDialog):
         okButton = QDialogButtonBox(QDialogButtonBox.Ok)
         okButton.accepted.connect(self.close)
         button_layout = QHBoxLayout()
-        mediainfo_version = self.parent.videoService.cmdExec(self.parent.videoService.backends.mediainfo,
-                                                             '--version', True)
-        if len(mediainfo_version) >= 2:
-            mediainfo_version = mediainfo_version.split('\n')[1]
+        mediainfo_version = self.parent.videoService.mediainfoVersion()
+        if len(mediainfo_version):
             mediainfo_label = QLabel('<div style="font-size:11px;"><b>Media information by:</b><br/>%s @ '
                                      % mediainfo_version + '<a href="https://mediaarea.net" target="_blank">' +
                                      'mediaarea.net</a></div>')
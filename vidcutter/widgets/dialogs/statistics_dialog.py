@@ -0,0 +1,102 @@
+import logging
+
+from PyQt5.QtCore import QSize, Qt
+from PyQt5.QtWidgets import (QAbstractItemView, QDialog, QDialogButtonBox, QHeaderView, QLabel, QTableWidget,
+                             QTableWidgetItem, QTabWidget, QVBoxLayout, QWidget)
+
+from vidcutter.data_structures.dataset_statistics import DatasetStatistics
+import vidcutter.widgets.dialogs.video_info_dialog_style_sheet as styleSheet
+
+
+class NumericTableWidgetItem(QTableWidgetItem):
+    """
+    Table cell showing a formatted value and sorting on the value itself
+    """
+    def __init__(self, value, text: str):
+        super(NumericTableWidgetItem, self).__init__(text)
+        self.value = value
+        self.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+
+    def __lt__(self, other):
+        if isinstance(other, NumericTableWidgetItem):
+            return self.value < other.value
+        return super().__lt__(other)
+
+
+class StatisticsDialog(QDialog):
+    """
+    Annotation statistics of the open dataset, one tab per action classes, issues and videos
+    """
+    def __init__(self, statistics: DatasetStatistics, parent: QWidget):
+        super(StatisticsDialog, self).__init__(parent)
+        self.parent = parent
+        self.logger = logging.getLogger(__name__)
+        self.statistics = statistics
+        self.setContentsMargins(0, 0, 0, 0)
+        self.setWindowFlags(Qt.Window | Qt.Dialog | Qt.WindowCloseButtonHint)
+        self.setAttribute(Qt.WA_DeleteOnClose, True)
+        self.setWindowTitle('Dataset statistics')
+
+        clipCounts = statistics.clipCounts()
+        annotatedSeconds = statistics.annotatedSeconds()
+        videos = statistics.videoList.videos
+        self.summaryLabel = QLabel('{0} videos, {1} clips, {2} annotated'.format(
+            len(videos), sum(clipCounts.values()), self.formatSeconds(sum(annotatedSeconds.values()))))
+
+        actionsTable = self.table(['Action class', 'Clips', 'Annotated'], [
+            [label, (count, str(count)), (annotatedSeconds[label], self.formatSeconds(annotatedSeconds[label]))]
+            for label, count in clipCounts.items()])
+        issuesTable = self.table(['Issue', 'Videos'], [
+            [label, (count, str(count))] for label, count in statistics.issueCounts().items()])
+        videoClipCounts = statistics.videoClipCounts().tolist()
+        videoAnnotatedSeconds = statistics.videoAnnotatedSeconds().tolist()
+        coverage = statistics.coverage().tolist()
+        videosTable = self.table(['Video', 'Clips', 'Annotated', 'Duration', 'Coverage'], [
+            [video.filename, (clips, str(clips)), (seconds, self.formatSeconds(seconds)),
+             (video.duration, self.formatSeconds(video.duration / 1000)), (share, '{:.1%}'.format(share))]
+            for video, clips, seconds, share in zip(videos, videoClipCounts, videoAnnotatedSeconds, coverage)])
+
+        self.tabs = QTabWidget(self)
+        self.tabs.addTab(actionsTable, 'Action classes')
+        self.tabs.addTab(issuesTable, 'Issues')
+        self.tabs.addTab(videosTable, 'Videos')
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok)
+        buttons.accepted.connect(self.close)
+
+        layout = QVBoxLayout()
+        layout.addWidget(self.summaryLabel)
+        layout.addWidget(self.tabs)
+        layout.addWidget(buttons)
+        self.setLayout(layout)
+        self.setMinimumSize(QSize(600, 500))
+
+        if parent.theme == 'dark':
+            self.setStyleSheet(styleSheet.video_info_style_sheet_dark)
+        else:
+            self.setStyleSheet(styleSheet.video_info_style_sheet_light)
+
+    def table(self, headers: list[str], rows: list[list]) -> QTableWidget:
+        """
+        Read only sortable table, a cell is a text or a (value, text) pair sorted on the value
+        """
+        table = QTableWidget(len(rows), len(headers), self)
+        table.setHorizontalHeaderLabels(headers)
+        table.verticalHeader().setVisible(False)
+        table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        for rowIndex, row in enumerate(rows):
+            for columnIndex, cell in enumerate(row):
+                item = NumericTableWidgetItem(*cell) if isinstance(cell, tuple) else QTableWidgetItem(cell)
+                table.setItem(rowIndex, columnIndex, item)
+        table.setSortingEnabled(True)
+        table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        for columnIndex in range(1, len(headers)):
+            table.horizontalHeader().setSectionResizeMode(columnIndex, QHeaderView.ResizeToContents)
+        return table
+
+    @staticmethod
+    def formatSeconds(seconds: float) -> str:
+        minutes, seconds = divmod(int(round(seconds)), 60)
+        hours, minutes = divmod(minutes, 60)
+        return '{0:d}:{1:02d}:{2:02d}'.format(hours, minutes, seconds)
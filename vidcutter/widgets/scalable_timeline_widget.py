@@ -98,13 +98,15 @@ class ScalableTimeLine(QScrollArea):
         self.timeline.repaint()
         super().repaint()
 
+    def setFilmstrip(self, filmstrip) -> None:
+        self.timeline.filmstrip = filmstrip
+        filmstrip.tileReady.connect(self.timeline.on_filmstripTileReady)
+
+    def setSpriteSheet(self, spriteSheet) -> None:
+        self.timeline.spriteSheet = spriteSheet
+
     def renderVideoClips(self, clips: list[VideoItemClip]) -> None:
-        self.timeline.clearClips()
-        for videoClip in clips:
-            clipStart = videoClip.timeStart.msecsSinceStartOfDay()
-            clipEnd = videoClip.timeEnd.msecsSinceStartOfDay()
-            clipVisibility = videoClip.visibility
-            self.addClip(clipStart * 1e-3, clipEnd * 1e-3, clipVisibility)
+        self.timeline.setClips(clips)
         self.update()
 
     def setClipVisibility(self, index: int, state) -> None:
@@ -6,9 +6,11 @@ from copy import copy
 from enum import Enum
 
 from PyQt5.QtWidgets import QApplication
-from PyQt5.QtCore import Qt, QPoint, QLine, QRect, pyqtSignal, QTime
-from PyQt5.QtGui import QPainter, QMouseEvent, QWheelEvent, QColor, QFont, QBrush, QPalette, QPen, QPolygon
-from PyQt5.QtWidgets import QStylePainter, QWidget, QStyleOptionSlider
+from PyQt5.QtCore import Qt, QPoint, QLine, QRect, pyqtSignal
+from PyQt5.QtGui import QPainter, QMouseEvent, QWheelEvent, QColor, QFont, QBrush, QPalette, QPen, QPixmap, QPolygon
+from PyQt5.QtWidgets import QLabel, QStylePainter, QWidget, QStyleOptionSlider
+
+from vidcutter.libs.filmstrip import Filmstrip
 
 
 class TimeLine(QWidget):
@@ -39,7 +41,10 @@ class TimeLine(QWidget):
         self.sliderAreaTicksGap = 15
         self.majorTicksHeight = 20
         self.minorTicksHeight = 10
-        self.timeLineHeight = 85
+        self.regionTopOffset = self.sliderAreaTopOffset + 4
+        self.filmstripTopOffset = self.sliderAreaTopOffset + self.sliderAreaHeight + 3
+        self.filmstripHeight = Filmstrip.laneHeight
+        self.timeLineHeight = 85 + self.filmstripHeight + 3
         self.setObjectName('timeline')
 
         # Set variables
@@ -68,6 +73,9 @@ class TimeLine(QWidget):
         self.numberGradientSteps = 50
         self.regionOutlineWidth = 4
         self.videoListRef = None
+        self.filmstrip = None
+        self.spriteSheet = None
+        self.scrubPreview = None
 
         self.progressbars_ = []
         self.clipsRectangles_ = []
@@ -91,16 +99,32 @@ class TimeLine(QWidget):
         self.update()
 
     def updateClips(self):
-        self.clearClips()
-        videoClipsList = self.videoListRef[self.videoListRef.currentVideoIndex].clips
-        for itemIndex, videoClip in enumerate(videoClipsList):
-            self.addClip(videoClip.timeStart.msecsSinceStartOfDay() * 1e-3, videoClip.timeEnd.msecsSinceStartOfDay() * 1e-3, videoClip.visibility)
+        self.setClips(self.videoListRef[self.videoListRef.currentVideoIndex].clips)
+
+    def setClips(self, clips) -> None:
+        """
+        Replace clips rectangles with the given video clips, pixel positions are computed in one pass for a ClipTable
+        """
+        self.clipsRectangles_.clear()
+        self.clipsVisibility_.clear()
+        self.regionSelected_ = -1
+        if hasattr(clips, 'pixelSpans'):
+            starts, ends, visibilities = clips.pixelSpans(self.getScale(), self.sliderAreaHorizontalOffset)
+        else:
+            starts = [self._secondsToPixelPosition(clip.timeStartSeconds) for clip in clips]
+            ends = [self._secondsToPixelPosition(clip.timeEndSeconds) for clip in clips]
+            visibilities = [clip.visibility for clip in clips]
+        y = self.regionTopOffset
+        height = self.regionHeight_
+        self.clipsRectangles_.extend(QRect(start, y, end - start, height) for start, end in zip(starts, ends))
+        self.clipsVisibility_.extend(visibilities)
+        self.update()
 
     def addClip(self, start: float, end: float, visibility=2) -> None:
         startPixelPosition = self._secondsToPixelPosition(start)
         endPixelPosition = self._secondsToPixelPosition(end)
         width = endPixelPosition - startPixelPosition
-        y = int((self.height() - self.regionHeight_) / 2)
+        y = self.regionTopOffset
         height = self.regionHeight_
         self.clipsRectangles_.append(QRect(startPixelPosition, y, width, height))
         self.clipsVisibility_.append(visibility)
@@ -127,6 +151,7 @@ class TimeLine(QWidget):
         if self.isEnabled():
             painter.setFont(self.font)
             self._drawCutSegment(painter)
+            self._drawFilmstrip(painter)
             self._drawTicks(painter)
             self._drawSlider(painter)
             self._drawClips(painter, opt)
@@ -147,7 +172,7 @@ class TimeLine(QWidget):
 
     def _drawTicks(self, painter: QStylePainter):
         scale = self.getScale()
-        y = self.rect().top() + self.sliderAreaTopOffset + self.sliderAreaHeight + 8
+        y = self.rect().top() + self.filmstripTopOffset + self.filmstripHeight + 5
         tickStep = 20
         timeTickStep = tickStep * 5
         tickColor = QColor('#8F8F8F' if self.parent.theme == 'dark' else '#444')
@@ -169,6 +194,36 @@ class TimeLine(QWidget):
             painter.setPen(pen)
             painter.drawLine(x, y, x, y + h)
 
+    def _drawFilmstrip(self, painter):
+        """
+        Paint the filmstrip tiles in the visible part of the scroll area and ask for them, tiles out of view are never
+        decoded
+        """
+        if self.filmstrip is None or self.filmstrip.source is None:
+            return
+        width = self.width() - 2 * self.sliderAreaHorizontalOffset
+        visibleRegion = self.visibleRegion().boundingRect()
+        if visibleRegion.isEmpty():
+            return
+        first = max(visibleRegion.left() - self.sliderAreaHorizontalOffset, 0) // Filmstrip.tileWidth
+        last = max(visibleRegion.right() - self.sliderAreaHorizontalOffset, 0) // Filmstrip.tileWidth
+        indexes = range(first, min(last, Filmstrip.tilesCount(width) - 1) + 1)
+        self.filmstrip.request(self.parent.factor, width, indexes)
+        for index in indexes:
+            x = self.sliderAreaHorizontalOffset + index * Filmstrip.tileWidth
+            tileWidth = min(Filmstrip.tileWidth, width - index * Filmstrip.tileWidth)
+            pixmap = self.filmstrip.tile(self.parent.factor, width, index)
+            if pixmap is None:
+                painter.fillRect(x, self.filmstripTopOffset, tileWidth, self.filmstripHeight,
+                                 QColor(Filmstrip.backgroundColor))
+            else:
+                painter.drawPixmap(x, self.filmstripTopOffset, pixmap, 0, 0, tileWidth, self.filmstripHeight)
+
+    def on_filmstripTileReady(self, factor: int, index: int) -> None:
+        if factor == self.parent.factor:
+            self.update(self.sliderAreaHorizontalOffset + index * Filmstrip.tileWidth, self.filmstripTopOffset,
+                        Filmstrip.tileWidth, self.filmstripHeight)
+
     def _drawSlider(self, painter):
         # print('self.pointerPixelPosition', self.pointerPixelPosition)
         if self.position is not None and self.isIn:
@@ -209,7 +264,7 @@ class TimeLine(QWidget):
                 for index, (clipRectangle, clipVisibility) in enumerate(zip(self.clipsRectangles_, self.clipsVisibility_)):
                     if clipVisibility == 0:
                         continue
-                    clipRectangle.setY(int((self.height() - self.regionHeight_) / 2) - 13)
+                    clipRectangle.setY(self.regionTopOffset)
                     clipRectangle.setHeight(self.regionHeight_)
                     rectClass = clipRectangle.adjusted(0, 0, 0, 0)
                     brushColor = QColor(150, 190, 78, 150) if self.clipsRectangles_.index(clipRectangle) == self.regionSelected_ else QColor(237, 242, 255, 150)
@@ -284,20 +339,9 @@ class TimeLine(QWidget):
     def _pixelPositionToSeconds(self, pixelPosition: int) -> float:
         return (pixelPosition - self.sliderAreaHorizontalOffset) * self.getScale()
 
-    def _pixelPositionToQTime(self, pixelPosition: int) -> QTime:
+    def _pixelPositionToMsecs(self, pixelPosition: int) -> int:
         seconds = self._pixelPositionToSeconds(pixelPosition)
-
-        milliseconds = int(round(1e3 * (seconds - int(seconds))))
-        hours = int(seconds / 3600)
-        minutes = int((seconds % 3600) / 60)
-        seconds = int((seconds % 3600) % 60)
-
-        # minutes = int(int(seconds) / 60)
-        # hours = int(minutes / 60)
-        # minutes -= minutes * 1
-        # seconds -= minutes * 60
-        time = QTime(hours, minutes, seconds, milliseconds)
-        return time
+        return int(round(1e3 * seconds))
 
     def _secondsToPixelPosition(self, seconds: float) -> int:
         return round(seconds / self.getScale() + self.sliderAreaHorizontalOffset)
@@ -319,6 +363,10 @@ class TimeLine(QWidget):
         mousePressed = QApplication.mouseButtons()
         self.position = event.pos()
         x = event.pos().x()
+        if mousePressed == Qt.NoButton:
+            self._showScrubPreview(x)
+        else:
+            self._hideScrubPreview()
         if self.clicking and x:
             self.pointerPixelPosition = self._eventPositionToPointerPixelPosition(x)
 
@@ -345,6 +393,25 @@ class TimeLine(QWidget):
 
         self.repaint()
 
+    def _showScrubPreview(self, x: int) -> None:
+        """
+        Show the frame under the cursor above the timeline, from the sprite sheet of the video, so no seek is needed
+        """
+        if self.spriteSheet is None or not self.spriteSheet.isReady() or not self.isEnabled():
+            return
+        x = self._eventPositionToPointerPixelPosition(x)
+        image = self.spriteSheet.frame(self._pixelPositionToSeconds(x))
+        if self.scrubPreview is None:
+            self.scrubPreview = QLabel(self, Qt.ToolTip)
+        self.scrubPreview.setFixedSize(image.size())
+        self.scrubPreview.setPixmap(QPixmap.fromImage(image))
+        self.scrubPreview.move(self.mapToGlobal(QPoint(x - image.width() // 2, -image.height() - 4)))
+        self.scrubPreview.show()
+
+    def _hideScrubPreview(self) -> None:
+        if self.scrubPreview is not None:
+            self.scrubPreview.hide()
+
     def _mousePressControlEvent(self, event: QMouseEvent):
         self.dragPosition = event.pos()
         self.dragRectPosition = self.clipsRectangles_[self.currentRectangleIndex].topLeft()
@@ -362,7 +429,7 @@ class TimeLine(QWidget):
         index = self.mousePositionToClipIndex(event.pos())
         if index != -1:
             clip = self.videoListRef.videos[self.videoListRef.currentVideoIndex].clips[index]
-            clipStartSeconds = 1e-3 * clip.timeStart.msecsSinceStartOfDay()
+            clipStartSeconds = clip.timeStartSeconds
             self.setPositionFromSeconds(clipStartSeconds)
             self.parent.parent.playMediaTimeClip(index)
             self.clicking = False
@@ -371,7 +438,7 @@ class TimeLine(QWidget):
         index = self.mousePositionToClipIndex(event.pos())
         if index != -1:
             clip = self.videoListRef.videos[self.videoListRef.currentVideoIndex].clips[index]
-            clipStartSeconds = 1e-3 * clip.timeStart.msecsSinceStartOfDay()
+            clipStartSeconds = clip.timeStartSeconds
             self.setPositionFromSeconds(clipStartSeconds)
 
     def _mousePressLeftButtonEvent(self, event: QMouseEvent):
@@ -381,6 +448,7 @@ class TimeLine(QWidget):
         self.clicking = True
 
     def mousePressEvent(self, event: QMouseEvent):
+        self._hideScrubPreview()
         if not self.parent.parent.mediaAvailable or not self.isIn or not self.isEnabled():
             super().mousePressEvent(event)
             return
@@ -410,13 +478,15 @@ class TimeLine(QWidget):
             self.applyEvent(event)
             self.unsetCursor()
             currentVideoIndex = self.videoListRef.currentVideoIndex
-            thumbnail = self.parent.parent.captureImage(self.parent.parent.currentMedia, self.videoListRef.currentVideoClipTimeStart(self.currentRectangleIndex))
-            self.videoListRef.videos[currentVideoIndex].clips[self.currentRectangleIndex].thumbnail = thumbnail
-
-            clip = self.videoListRef.videos[currentVideoIndex].clips[self.currentRectangleIndex]
-            self.videoListRef.videos[currentVideoIndex].clips.pop(self.currentRectangleIndex)
+            dragStartIndex = self.currentRectangleIndex
+            clip = self.videoListRef.videos[currentVideoIndex].clips.pop(dragStartIndex)
             self.currentRectangleIndex = self.videoListRef.videos[currentVideoIndex].clips.bisect_right(clip)
             self.videoListRef.videos[currentVideoIndex].clips.add(clip)
+            self.videoListRef.setCurrentVideoClipIndex(self.currentRectangleIndex)
+            # stores take the index before the change and look the re-sorted clip up, so they are told after re-adding
+            self.parent.parent.projectStore.clipUpdated(currentVideoIndex, dragStartIndex, timeStart=clip.timeStart, timeEnd=clip.timeEnd)
+            self.videoListRef.videos[currentVideoIndex].markDirty()
+            self.parent.parent.requestThumbnail(currentVideoIndex, self.videoListRef.videos[currentVideoIndex].clips[self.currentRectangleIndex])
 
             self.parent.parent.renderVideoClips()
             self.state = self.RectangleEditState.freeState
@@ -439,7 +509,7 @@ class TimeLine(QWidget):
             index = self.mousePositionToClipIndex(event.pos())
             if index != -1:
                 clip = self.videoListRef.videos[self.videoListRef.currentVideoIndex].clips[index]
-                clipEndSeconds = 1e-3 * clip.timeEnd.msecsSinceStartOfDay()
+                clipEndSeconds = clip.timeEndSeconds
                 self.setPositionFromSeconds(clipEndSeconds)
 
 
@@ -483,16 +553,12 @@ class TimeLine(QWidget):
         if self.state == self.RectangleEditState.beginSideEdit:
             rectangleLeftValue = max(event.x(), 0)
             self.clipsRectangles_[self.currentRectangleIndex].setLeft(rectangleLeftValue)
-            timeStart = self._pixelPositionToQTime(rectangleLeftValue)
-            self.videoListRef.setCurrentVideoClipIndex(self.currentRectangleIndex)
-            self.videoListRef.setCurrentVideoClipStartTime(timeStart)
+            self.draggedClip().timeStart = self._pixelPositionToMsecs(rectangleLeftValue)
 
         elif self.state == self.RectangleEditState.endSideEdit:
             rectangleRightValue = min(event.x(), self.width() - 1)
             self.clipsRectangles_[self.currentRectangleIndex].setRight(rectangleRightValue)
-            timeEnd = self._pixelPositionToQTime(rectangleRightValue)
-            self.videoListRef.setCurrentVideoClipIndex(self.currentRectangleIndex)
-            self.videoListRef.setCurrentVideoClipEndTime(timeEnd)
+            self.draggedClip().timeEnd = self._pixelPositionToMsecs(rectangleRightValue)
 
         elif self.state == self.RectangleEditState.rectangleMove:
             delta_value = event.x() - self.dragPosition.x()
@@ -501,12 +567,14 @@ class TimeLine(QWidget):
 
             rectangleLeftValue = max(self.clipsRectangles_[self.currentRectangleIndex].left(), 0)
             rectangleRightValue = min(self.clipsRectangles_[self.currentRectangleIndex].right(), self.width() - 1)
-            timeStart = self._pixelPositionToQTime(rectangleLeftValue)
-            timeEnd = self._pixelPositionToQTime(rectangleRightValue)
+            clip = self.draggedClip()
+            clip.timeStart = self._pixelPositionToMsecs(rectangleLeftValue)
+            clip.timeEnd = self._pixelPositionToMsecs(rectangleRightValue)
 
-            self.videoListRef.setCurrentVideoClipIndex(self.currentRectangleIndex)
-            self.videoListRef.setCurrentVideoClipStartTime(timeStart)
-            self.videoListRef.setCurrentVideoClipEndTime(timeEnd)
+    def draggedClip(self):
+        # the clip is edited in place while dragging, so it keeps the index of its rectangle, and is re-sorted once on
+        # release
+        return self.videoListRef.videos[self.videoListRef.currentVideoIndex].clips[self.currentRectangleIndex]
 
     def enterEvent(self, event):
         self.isIn = True
@@ -514,6 +582,7 @@ class TimeLine(QWidget):
     # Leave
     def leaveEvent(self, event):
         self.isIn = False
+        self._hideScrubPreview()
         self.update()
 
     def timeToPixelPosition(self, time: float):
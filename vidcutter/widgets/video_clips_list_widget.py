@@ -2,15 +2,18 @@
 # -*- coding: utf-8 -*-
 
 import copy
+from functools import partial
 
-from PyQt5.QtCore import pyqtSlot, Qt, QEvent, QModelIndex, QRect, QSize, QTime
-from PyQt5.QtGui import QColor, QFont, QMouseEvent, QPainter, QPixmap, QPainterPath
+from PyQt5.QtCore import pyqtSlot, Qt, QEvent, QModelIndex, QRect, QSize
+from PyQt5.QtGui import QColor, QFont, QMouseEvent, QPainter, QPixmap
 from PyQt5.QtWidgets import (QAbstractItemView, QListWidget, QSizePolicy, QStyle, QWidget, QComboBox, QListWidgetItem, QHBoxLayout, QVBoxLayout, QTimeEdit, QAbstractSpinBox,
                              QStyledItemDelegate, QStyleOptionViewItem, QCheckBox, QStyleOptionButton, QApplication, QLabel, QLayout)
 
 # from PySide2 import QtGui, QtCore, QtWidgets
 
 from vidcutter.libs.graphicseffects import OpacityEffect
+from vidcutter.libs.rendercache import RoundedPixmapCache
+from vidcutter.data_structures.qt_adapter import msecsToQTime, qtimeToMsecs
 from vidcutter.data_structures.video_item_clip import VideoItemClip
 
 
@@ -56,6 +59,9 @@ class ClipsListWidgetItem(QWidget):
         self.layoutTime.addWidget(self.timeEnd, 0, Qt.AlignLeft)
         self.layoutTime.addWidget(self.clipNumber, 0, Qt.AlignLeft)
 
+        self.thumbnailKey = ''
+        self.thumbnailLoaded = False
+
         self.image_label = QLabel()
         self.image_label.setScaledContents(True)
         # self.image_label.setStyleSheet("""border-radius: 10px; background-color: transparent;""")
@@ -71,23 +77,6 @@ class ClipsListWidgetItem(QWidget):
         self.layoutGlobal.setSizeConstraint(QLayout.SetFixedSize)
         self.widget.setLayout(self.layoutGlobal)
 
-    def roundedPixmap(self, pixmap, radius=20):
-        target = QPixmap(pixmap.size())
-        target.fill(Qt.transparent)
-        painter = QPainter(target)
-
-        painter.setRenderHint(QPainter.Antialiasing, True)
-        painter.setRenderHint(QPainter.HighQualityAntialiasing, True)
-        painter.setRenderHint(QPainter.SmoothPixmapTransform, True)
-
-        path = QPainterPath()
-        path.addRoundedRect(0, 0, pixmap.width(), pixmap.height(), radius, radius)
-
-        painter.setClipPath(path)
-        painter.drawPixmap(0, 0, pixmap)
-
-        return target
-
     def setComboBoxItems(self, items: list[str]) -> None:
         self.comboBox.addItems(items)
 
@@ -95,14 +84,16 @@ class ClipsListWidgetItem(QWidget):
         self.checkBox.setChecked(checked)
 
     def setThumbnail(self, pixmap: QPixmap):
-        pixmap = pixmap.scaled(QSize(100, 100), Qt.KeepAspectRatio)
-        self.image_label.setPixmap(self.roundedPixmap(pixmap, 10))
+        """
+        Show pixmap as is, it is scaled and rounded by RoundedPixmapCache
+        """
+        self.image_label.setPixmap(pixmap)
 
-    def setTimeStart(self, timeStart: QTime):
-        self.timeStart.setTime(timeStart)
+    def setTimeStart(self, timeStart: int):
+        self.timeStart.setTime(msecsToQTime(timeStart))
 
-    def setTimeEnd(self, timeEnd: QTime):
-        self.timeEnd.setTime(timeEnd)
+    def setTimeEnd(self, timeEnd: int):
+        self.timeEnd.setTime(msecsToQTime(timeEnd))
 
     def setNumber(self, number: int):
         self.clipNumber.setText('clip # ' + str(number))
@@ -111,6 +102,9 @@ class ClipsListWidgetItem(QWidget):
 
 
 class VideoClipsListWidget(QListWidget):
+    thumbnailSize = QSize(100, 100)
+    thumbnailRadius = 10
+
     def __init__(self, parent=None):
         super(VideoClipsListWidget, self).__init__(parent)
         # self.itemClicked.connect(self.on_item_clicked)
@@ -139,7 +133,9 @@ class VideoClipsListWidget(QListWidget):
         self.opacityEffect.setEnabled(False)
         self.setGraphicsEffect(self.opacityEffect)
         self.clipsHasRendered = False
+        self.clipsListItems: list[ClipsListWidgetItem] = []
         self.viewport().setAttribute(Qt.WA_Hover)
+        self.verticalScrollBar().valueChanged.connect(self.loadVisibleThumbnails)
 
     def mousePressEvent(self, event):
         self._mouseButton = event.button()
@@ -147,10 +143,7 @@ class VideoClipsListWidget(QListWidget):
 
     def renderTimelineVideoCLips(self, videoClipItems: list[VideoItemClip]) -> None:
         self.clipsHasRendered = False
-        self.parent.scalableTimeline.clearRegions()
-
-        for itemIndex, videoClip in enumerate(videoClipItems):
-            self.parent.scalableTimeline.addClip(videoClip.timeStart.msecsSinceStartOfDay() * 1e-3, videoClip.timeEnd.msecsSinceStartOfDay() * 1e-3, videoClip.visibility)
+        self.parent.scalableTimeline.renderVideoClips(videoClipItems)
         self.clipsHasRendered = True
 
     def renderClips(self, videoClipItems: list[VideoItemClip]) -> None:
@@ -160,15 +153,15 @@ class VideoClipsListWidget(QListWidget):
         scrollBarValue = self.verticalScrollBar().value()
         self.clipsHasRendered = False
         self.clear()
+        self.clipsListItems.clear()
         self.parent.scalableTimeline.clearRegions()
 
         for itemIndex, videoClip in enumerate(videoClipItems):
             briefInfo = 'Here should ba a tooltip'
             listItem = ClipsListWidgetItem()
-            if QPixmap.isNull(videoClip.thumbnail):
-                listItem.setThumbnail(QPixmap(100, 100))
-            else:
-                listItem.setThumbnail(videoClip.thumbnail)
+            # placeholder until the row is scrolled into view, see loadVisibleThumbnails
+            listItem.setThumbnail(self.thumbnail(''))
+            listItem.thumbnailKey = videoClip.thumbnailKey
             listItem.setToolTip(briefInfo)
             listItem.setComboBoxItems(actionClasses)
             listItem.setVisibility(bool(videoClip.visibility))
@@ -181,13 +174,50 @@ class VideoClipsListWidget(QListWidget):
             listItem.comboBox.setCurrentIndex(currentClassIndex)
             listItem.comboBox.currentIndexChanged.connect(lambda value, index=itemIndex: self.comboBoxIndexChanged(value, index))
             listItem.checkBox.stateChanged.connect(lambda state, index=itemIndex: self.checkBoxStateChanged(state, index))
-            listItem.timeStart.timeChanged.connect(lambda time, index=itemIndex: self.timeStartChanged(time, index))
-            listItem.timeEnd.timeChanged.connect(lambda time, index=itemIndex: self.timeEndChanged(time, index))
+            listItem.timeStart.timeChanged.connect(lambda time, index=itemIndex: self.timeStartChanged(qtimeToMsecs(time), index))
+            listItem.timeEnd.timeChanged.connect(lambda time, index=itemIndex: self.timeEndChanged(qtimeToMsecs(time), index))
             self.addItem(listItem.item)
             self.setItemWidget(listItem.item, listItem.widget)
-            self.parent.scalableTimeline.addClip(videoClip.timeStart.msecsSinceStartOfDay() * 1e-3, videoClip.timeEnd.msecsSinceStartOfDay() * 1e-3, videoClip.visibility)
+            self.clipsListItems.append(listItem)
+        self.parent.scalableTimeline.renderVideoClips(videoClipItems)
         self.verticalScrollBar().setValue(scrollBarValue)
         self.clipsHasRendered = True
+        self.loadVisibleThumbnails()
+
+    def loadVisibleThumbnails(self) -> None:
+        """
+        Decode thumbnails of the rows currently in the viewport (and one row around it), the rest keep a placeholder.
+        """
+        if not len(self.clipsListItems) or self.parent.thumbnailPack is None:
+            return
+        viewportRect = self.viewport().rect()
+        firstIndex = self.indexAt(viewportRect.topLeft())
+        lastIndex = self.indexAt(viewportRect.bottomLeft())
+        firstRow = firstIndex.row() if firstIndex.isValid() else 0
+        lastRow = lastIndex.row() if lastIndex.isValid() else len(self.clipsListItems) - 1
+        for row in range(max(firstRow - 1, 0), min(lastRow + 2, len(self.clipsListItems))):
+            listItem = self.clipsListItems[row]
+            if listItem.thumbnailLoaded:
+                continue
+            listItem.setThumbnail(self.thumbnail(listItem.thumbnailKey))
+            listItem.thumbnailLoaded = True
+
+    def thumbnail(self, thumbnailKey: str) -> QPixmap:
+        load = partial(self.parent.thumbnailPack.pixmap, thumbnailKey) if thumbnailKey else QPixmap
+        return RoundedPixmapCache.shared().pixmap(thumbnailKey, self.thumbnailSize, self.thumbnailRadius, self.theme,
+                                                  load)
+
+    def setClipThumbnail(self, clipIndex: int, thumbnailKey: str) -> None:
+        if clipIndex >= len(self.clipsListItems):
+            return
+        listItem = self.clipsListItems[clipIndex]
+        listItem.thumbnailKey = thumbnailKey
+        listItem.thumbnailLoaded = False
+        self.loadVisibleThumbnails()
+
+    def resizeEvent(self, event) -> None:
+        super(VideoClipsListWidget, self).resizeEvent(event)
+        self.loadVisibleThumbnails()
 
     def comboBoxIndexChanged(self, value, clipIndex):
         videoIndex = self.parent.videoList.currentVideoIndex
@@ -195,11 +225,14 @@ class VideoClipsListWidget(QListWidget):
             self.parent.videoList[videoIndex].clips[clipIndex].actionClassIndex = -1
         else:
             self.parent.videoList[videoIndex].clips[clipIndex].actionClassIndex = value
+        self.parent.videoList[videoIndex].clips[clipIndex].markDirty()
+        self.parent.projectStore.clipUpdated(videoIndex, clipIndex, actionClassIndex=self.parent.videoList[videoIndex].clips[clipIndex].actionClassIndex)
         self.parent.scalableTimeline.renderVideoClips(self.parent.videoList[videoIndex].clips)
 
     def checkBoxStateChanged(self, state, clipIndex: int):
         indexVideo = self.parent.videoList.currentVideoIndex
         self.parent.videoList[indexVideo].clips[clipIndex].visibility = state
+        self.parent.projectStore.clipUpdated(indexVideo, clipIndex, visibility=state)
         self.parent.scalableTimeline.setClipVisibility(clipIndex, state)
 
     def timeStartChanged(self, time, clipIndex):
@@ -210,9 +243,10 @@ class VideoClipsListWidget(QListWidget):
         clip.timeStart = time
         newClipIndex = self.parent.videoList.videos[videoIndex].clips.bisect_right(clip)
         self.parent.videoList.videos[videoIndex].clips.add(clip)
+        self.parent.videoList.videos[videoIndex].markDirty()
 
-        thumbnail = self.parent.captureImage(self.parent.currentMedia, time)
-        self.parent.videoList.videos[videoIndex].clips[newClipIndex].thumbnail = thumbnail
+        self.parent.projectStore.clipUpdated(videoIndex, clipIndex, timeStart=time)
+        self.parent.requestThumbnail(videoIndex, self.parent.videoList.videos[videoIndex].clips[newClipIndex])
 
         if clipIndex != newClipIndex:
             self.renderClips(self.parent.videoList.videos[videoIndex].clips)
@@ -227,6 +261,7 @@ class VideoClipsListWidget(QListWidget):
     def timeEndChanged(self, time, clipIndex):
         videoIndex = self.parent.videoList.currentVideoIndex
         self.parent.videoList[videoIndex].clips[clipIndex].timeEnd = time
+        self.parent.projectStore.clipUpdated(videoIndex, clipIndex, timeEnd=time)
         self.parent.scalableTimeline.renderVideoClips(self.parent.videoList[videoIndex].clips)
 
     @pyqtSlot()
@@ -1,15 +1,52 @@
 import sys
+import time
+from functools import partial
 
-from PyQt5.QtCore import Qt, QModelIndex, QSize
-from PyQt5.QtGui import QColor, QFont, QIcon, QPainter, QPen, QPixmap, QPainterPath
-from PyQt5.QtWidgets import (QAbstractItemView, QListWidget, QListWidgetItem, QSizePolicy, QStyle, QStyledItemDelegate, QStyleOptionViewItem)
+from PyQt5.QtCore import pyqtSlot, Qt, QModelIndex, QPoint, QSize, QTimer
+from PyQt5.QtGui import QColor, QFont, QPainter, QPen
+from PyQt5.QtWidgets import (QAbstractItemView, QActionGroup, QListWidget, QListWidgetItem, QMenu, QSizePolicy, QStyle,
+                             QStyledItemDelegate, QStyleOptionViewItem)
 
 # import PyQt5.QtCore.
 
+from vidcutter.data_structures.qt_adapter import msecsToQTime
 from vidcutter.libs.graphicseffects import OpacityEffect
+from vidcutter.libs.rendercache import RoundedPixmapCache
+
+
+class VideoListItem(QListWidgetItem):
+    """
+    Row of a video, ordered by the sort value of VideoListWidget.sortKey, then by video number
+    """
+    def __lt__(self, other: QListWidgetItem) -> bool:
+        value, otherValue = self.data(VideoListWidget.sortRole), other.data(VideoListWidget.sortRole)
+        if value != otherValue:
+            # rows not indexed yet go last
+            if value is None or otherValue is None:
+                return otherValue is None
+            return value < otherValue
+        return self.data(Qt.UserRole + 1) < other.data(Qt.UserRole + 1)
 
 
 class VideoListWidget(QListWidget):
+    sortRole = Qt.UserRole + 3
+    # sort key name: (menu label, value of a MediaRecord)
+    sortKeys = {
+        'index': ('Dataset order', None),
+        'duration': ('Duration', lambda record: record.duration),
+        'resolution': ('Resolution', lambda record: (record.width or 0) * (record.height or 0)),
+        'fps': ('Frame rate', lambda record: record.fps),
+        'bitrate': ('Bitrate', lambda record: record.bitrate),
+        'size': ('File size', lambda record: record.size),
+        'keyframeInterval': ('Keyframe interval', lambda record: record.keyframeInterval),
+    }
+    # filter name: (menu label, value of a MediaRecord the rows are filtered on)
+    filterKeys = {
+        'resolution': ('Resolution', lambda record: record.resolution),
+        'videoCodec': ('Video codec', lambda record: record.videoCodec),
+        'audioCodec': ('Audio codec', lambda record: record.audioCodec or 'none'),
+    }
+
     def __init__(self, parent=None):
         super(VideoListWidget, self).__init__(parent)
         # self.itemClicked.connect(self.on_item_clicked)
@@ -36,51 +73,149 @@ class VideoListWidget(QListWidget):
         self.opacityEffect.setEnabled(False)
         self.setGraphicsEffect(self.opacityEffect)
         self.videosHasRendered = False
+        self.mediaIndex = None
+        self.videoList = None
+        self.sortKey = 'index'
+        self.filters = {}
+        self.itemsByFilename = {}
+        self.customContextMenuRequested.connect(self.showViewMenu)
+        # records arrive one by one while the index is built, rows are re-sorted at most once per interval
+        self.sortTimer = QTimer(self)
+        self.sortTimer.setSingleShot(True)
+        self.sortTimer.setInterval(250)
+        self.sortTimer.timeout.connect(self.applyView)
+
+    def setMediaIndex(self, mediaIndex) -> None:
+        self.mediaIndex = mediaIndex
+        mediaIndex.recordChanged.connect(self.on_recordChanged)
 
     def renderList(self, video_list) -> None:
         self.clear()
+        self.videoList = video_list
+        self.itemsByFilename.clear()
         for index, video in enumerate(video_list.videos):
-            list_item = QListWidgetItem(self)
-            tooltip_string = ''.join(['FILENAME: \n', video.filename, '\n',
-                                      'DURATION:\n', video.duration.toString(self.parent.timeformat), '\n',
-                                      '----------------------------------------\n',
-                                      'Double click to load video'])
-            list_item.setToolTip(tooltip_string)
+            list_item = VideoListItem(self)
             list_item.setStatusTip('Reorder clips with mouse drag & drop or right-click menu on the clip to be moved')
             list_item.setTextAlignment(Qt.AlignVCenter)
-            list_item.setData(Qt.DecorationRole + 1, video.thumbnail)
+            list_item.setData(Qt.DecorationRole + 1, video.thumbnailKey)
             list_item.setData(Qt.UserRole + 1, index + 1)
             # list_item.setData(Qt.UserRole + 2, video.duration.toString(self.parent.timeformat))
             list_item.setFlags(Qt.ItemIsSelectable | Qt.ItemIsEnabled)
             self.addItem(list_item)
+            if self.filters or self.sortKey != 'index':
+                self.updateItem(list_item)
+            else:
+                list_item.setToolTip(self.videoTooltip(video, self.mediaIndex.record(video.filename)
+                                                       if self.mediaIndex is not None else None))
+            self.itemsByFilename[video.filename] = list_item
 
+        if self.sortKey != 'index':
+            self.applyView()
         self.videosHasRendered = True
 
+    def videoTooltip(self, video, record=None) -> str:
+        lines = ['FILENAME: \n', video.filename, '\n',
+                 'DURATION:\n', msecsToQTime(record.duration if record is not None and record.duration is not None
+                                             else video.duration).toString(self.parent.timeformat), '\n']
+        if record is not None:
+            lines += ['RESOLUTION: ', record.resolution, '\n',
+                      'FRAME RATE: ', '{:.3f}'.format(record.fps) if record.fps else '', '\n',
+                      'CODECS: ', record.videoCodec or '', ' / ', record.audioCodec or 'no audio', '\n',
+                      'BITRATE: ', '{:.0f} kb/s'.format(record.bitrate / 1000) if record.bitrate else '', '\n',
+                      'SIZE: ', '{:.1f} MB'.format(record.size / (1 << 20)), '\n',
+                      'KEYFRAME INTERVAL: ', '{:.2f} s'.format(record.keyframeInterval) if record.keyframeInterval
+                      else '', '\n']
+        lines += ['----------------------------------------\n',
+                  'Double click to load video']
+        return ''.join(lines)
 
-class VideoListItemStyle(QStyledItemDelegate):
-    def __init__(self, parent: VideoListWidget=None):
-        super(VideoListItemStyle, self).__init__(parent)
-        self.parent = parent
-        self.theme = self.parent.theme
+    def record(self, item: QListWidgetItem):
+        if self.mediaIndex is None or self.videoList is None:
+            return None
+        return self.mediaIndex.record(self.videoList.videos[item.data(Qt.UserRole + 1) - 1].filename)
 
-    def roundedPixmap(self, pixmap, radius=20):
-        target = QPixmap(pixmap.size())
-        target.fill(Qt.transparent)
-        painter = QPainter(target)
+    def updateItem(self, item: QListWidgetItem) -> None:
+        """
+        Refresh tooltip, sort value and visibility of a row from the media index
+        """
+        record = self.record(item)
+        video = self.videoList.videos[item.data(Qt.UserRole + 1) - 1]
+        item.setToolTip(self.videoTooltip(video, record))
+        sortValue = self.sortKeys[self.sortKey][1]
+        item.setData(self.sortRole, None if sortValue is None or record is None else sortValue(record))
+        item.setHidden(any(record is None or self.filterKeys[name][1](record) != value
+                           for name, value in self.filters.items()))
 
-        painter.setRenderHint(QPainter.Antialiasing, True)
-        painter.setRenderHint(QPainter.HighQualityAntialiasing, True)
-        painter.setRenderHint(QPainter.SmoothPixmapTransform, True)
+    @pyqtSlot()
+    def applyView(self) -> None:
+        if self.sortKeys[self.sortKey][1] is None:
+            for row in range(self.count()):
+                self.item(row).setData(self.sortRole, None)
+        self.sortItems(Qt.AscendingOrder)
 
-        path = QPainterPath()
-        path.addRoundedRect(0, 0, pixmap.width(), pixmap.height(), radius, radius)
+    def setSortKey(self, sortKey: str) -> None:
+        self.sortKey = sortKey
+        for row in range(self.count()):
+            self.updateItem(self.item(row))
+        self.applyView()
 
-        painter.setClipPath(path)
-        painter.drawPixmap(0, 0, pixmap)
+    def setFilter(self, name: str, value=None) -> None:
+        if value is None:
+            self.filters.pop(name, None)
+        else:
+            self.filters[name] = value
+        for row in range(self.count()):
+            self.updateItem(self.item(row))
 
-        return target
+    @pyqtSlot(str)
+    def on_recordChanged(self, filename: str) -> None:
+        item = self.itemsByFilename.get(filename)
+        if item is None:
+            return
+        self.updateItem(item)
+        if self.sortKeys[self.sortKey][1] is not None and not self.sortTimer.isActive():
+            self.sortTimer.start()
+
+    @pyqtSlot(QPoint)
+    def showViewMenu(self, pos: QPoint) -> None:
+        if self.mediaIndex is None or self.videoList is None:
+            return
+        menu = QMenu(self)
+        sortMenu = menu.addMenu('Sort by')
+        sortGroup = QActionGroup(sortMenu)
+        for sortKey, (label, _) in self.sortKeys.items():
+            action = sortMenu.addAction(label)
+            action.setCheckable(True)
+            action.setChecked(sortKey == self.sortKey)
+            action.triggered.connect(lambda checked, key=sortKey: self.setSortKey(key))
+            sortGroup.addAction(action)
+        records = list(self.mediaIndex.records.values())
+        for name, (label, value) in self.filterKeys.items():
+            filterMenu = menu.addMenu(label)
+            filterGroup = QActionGroup(filterMenu)
+            for option in [None] + sorted({value(record) for record in records if value(record)}):
+                action = filterMenu.addAction('All' if option is None else option)
+                action.setCheckable(True)
+                action.setChecked(self.filters.get(name) == option)
+                action.triggered.connect(lambda checked, filterName=name, filterValue=option:
+                                         self.setFilter(filterName, filterValue))
+                filterGroup.addAction(action)
+        menu.exec_(self.mapToGlobal(pos))
+
+
+class VideoListItemStyle(QStyledItemDelegate):
+    thumbnailSize = QSize(64, 64)
+    thumbnailRadius = 12
+
+    def __init__(self, parent: VideoListWidget=None):
+        super(VideoListItemStyle, self).__init__(parent)
+        self.parent = parent
+        self.theme = self.parent.theme
+        self.paintCount = 0
+        self.paintSeconds = 0.0
 
     def paint(self, painter: QPainter, option: QStyleOptionViewItem, index: QModelIndex) -> None:
+        start = time.perf_counter()
         r = option.rect
         pencolor = Qt.white if self.theme == 'dark' else Qt.black
         if self.parent.isEnabled():
@@ -95,19 +230,21 @@ class VideoListItemStyle(QStyledItemDelegate):
         painter.setPen(Qt.NoPen)
         painter.drawRect(r)
 
-        pixmap = index.data(Qt.DecorationRole + 1)
-        pixmap = pixmap.scaled(64, 64, Qt.KeepAspectRatio)
-        pixmap = self.roundedPixmap(pixmap, 12)
-        thumbnail_icon = QIcon(pixmap)
+        # thumbnails are decoded from the project thumbnail pack and rounded only on the first paint of a row
+        thumbnailKey = index.data(Qt.DecorationRole + 1)
+        pixmap = RoundedPixmapCache.shared().pixmap(thumbnailKey, self.thumbnailSize, self.thumbnailRadius, self.theme,
+                                                    partial(self.parent.parent.thumbnailPack.pixmap, thumbnailKey))
         video_index = str(index.data(Qt.UserRole + 1))
 
         painter.setPen(QPen(pencolor, 1, Qt.SolidLine))
         r = option.rect.adjusted(5, 5, -5, -5)
-        thumbnail_icon.paint(painter, r, Qt.AlignTop | Qt.AlignRight)
+        painter.drawPixmap(QStyle.alignedRect(Qt.LeftToRight, Qt.AlignTop | Qt.AlignRight, pixmap.size(), r), pixmap)
 
         r = option.rect.adjusted(15, 0, 0, 0)
         painter.setFont(QFont('Arial', 13 if sys.platform == 'darwin' else 11, QFont.Bold))
         painter.drawText(r, Qt.AlignLeft | Qt.AlignVCenter, video_index)
+        self.paintCount += 1
+        self.paintSeconds += time.perf_counter() - start
 
 
     def clipText(self, text: str, painter: QPainter, chapter: bool=False) -> str: